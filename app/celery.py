@@ -6,16 +6,16 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 app = Celery("app")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
-# Descubre tasks.py en todas las apps instaladas
-app.autodiscover_tasks()
-
-# 🔒 Importa explícitamente tus tasks para registrar el nombre exacto
-app.conf.imports = app.conf.imports or []
-if "flash_promo.tasks" not in app.conf.imports:
-    app.conf.imports.append("flash_promo.tasks")
+# Solo flash_promo tiene tareas: se importa explicitamente al arrancar el worker
+# (sin autodiscover, que recorre todas las apps instaladas)
+app.conf.imports = ["flash_promo.tasks"]
 
 # Beat schedule
 app.conf.beat_schedule = {
+    "schedule-upcoming-promo-events": {
+        "task": "flash_promo.tasks.schedule_upcoming_promo_events",
+        "schedule": 60.0,
+    },
     "activate-and-notify-promos": {
         "task": "flash_promo.tasks.activate_and_notify_promos",
         "schedule": 30.0,
@@ -24,4 +24,20 @@ app.conf.beat_schedule = {
         "task": "flash_promo.tasks.notify_active_promos",
         "schedule": 30.0,
     },
+    "expire-holds": {
+        "task": "flash_promo.tasks.expire_holds",
+        "schedule": 30.0,
+    },
+    "relay-outbox": {
+        "task": "flash_promo.tasks.relay_outbox",
+        "schedule": 1.0,
+    },
+    "reconcile-stock": {
+        "task": "flash_promo.tasks.reconcile_stock",
+        "schedule": 300.0,
+    },
+    "maintain-partitioned-tables": {
+        "task": "flash_promo.tasks.maintain_partitioned_tables",
+        "schedule": 3600.0,
+    },
 }
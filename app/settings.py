@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,14 +24,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY", "dev")
 BASE_DIR = Path(__file__).resolve().parent.parent
-DEBUG = os.getenv("DEBUG", "True") == "True"
-ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "*").split(",")
-TIME_ZONE = os.getenv("TIME_ZONE", "UTC")
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
+# (docker-compose.prod.yml define DEBUG=False)
+DEBUG = (os.getenv("DEBUG") or "True") == "True"
+# Vacio: con DEBUG solo se aceptan localhost / 127.0.0.1
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
+TIME_ZONE = os.getenv("TIME_ZONE", "UTC")
 
 
 # Application definition
@@ -44,11 +43,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.gis',
     'rest_framework',
+    'django_filters',
     'flash_promo',
     'drf_spectacular',
 ]
 
 MIDDLEWARE = [
+    # Primero: una request descartada no paga el resto de la cadena
+    'flash_promo.bulkheads.BulkheadMiddleware',
+    'flash_promo.tracing.TracingMiddleware',
+    # Mide tambien las queries de sesion/auth
+    'flash_promo.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,10 +94,50 @@ DATABASES = {
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
-        "PORT": int(os.getenv("POSTGRES_PORT")),
+        "PORT": int(os.getenv("POSTGRES_PORT", "5432")),
     }
 }
 
+# ---- Connection pool (psycopg_pool) ----
+# Un pool por proceso: API -> workers de gunicorn x DB_POOL_MAX_SIZE,
+# Celery -> procesos prefork x DB_POOL_MAX_SIZE (usar un valor chico en los workers)
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "False") == "True"
+if DB_POOL_ENABLED:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "8")),
+            # Segundos esperando una conexion libre antes de fallar
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            # Health check al entregar la conexion: descarta las que murieron
+            "check": ConnectionPool.check_connection,
+        },
+    }
+else:
+    # Sin pool: conexiones persistentes por hilo
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("CONN_MAX_AGE", "0"))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# ---- Read replica ----
+# Solo las lecturas que aceptan datos con segundos de atraso usan la replica
+# (flash_promo.routers.use_replica); si el lag supera REPLICA_MAX_LAG_SECONDS
+# o la replica no responde se lee del primario
+if os.getenv("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+        "PORT": int(os.getenv("POSTGRES_REPLICA_PORT", "5432")),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["flash_promo.routers.ReplicaRouter"]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+# Tras una escritura, el usuario lee del primario durante este tiempo
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
 # ---- Cache: Redis ----
 CACHES = {
     "default": {
@@ -148,6 +193,12 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.BasicAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    # search_fields -> SearchFilter (icontains, backed by trigram indexes)
+    # filterset_fields -> DjangoFilterBackend
+    "DEFAULT_FILTER_BACKENDS": [
+        "django_filters.rest_framework.DjangoFilterBackend",
+        "rest_framework.filters.SearchFilter",
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
@@ -156,10 +207,156 @@ CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TASK_TIME_LIMIT = 60
 CELERY_TASK_SOFT_TIME_LIMIT = 55
+# Las tareas son fire-and-forget: no se guardan resultados en el backend.
+# Las que los necesitan (p. ej. el header de un chord) declaran ignore_result=False
+CELERY_TASK_IGNORE_RESULT = True
+# send_push_batch recibe los user_ids empaquetados (flash_promo.codecs). Apagado por
+# defecto: un worker viejo no entiende el string. Activarlo recien cuando todos los
+# workers corren una version que acepta ids empaquetados
+NOTIFY_PACK_USER_IDS = os.getenv("NOTIFY_PACK_USER_IDS", "False") == "True"
+# notify_promo divide el radio de la tienda en N x N tiles, cada uno una tarea del chord
+# (sin CELERY_RESULT_BACKEND los tiles salen como group, sin callback)
+NOTIFY_TILES_PER_SIDE = int(os.getenv("NOTIFY_TILES_PER_SIDE", "4"))
+
+# Solo se encolan con ETA los eventos de activacion/fin a menos de este horizonte; los
+# demas los encola schedule_upcoming_promo_events. Debe quedar bien por debajo del
+# visibility_timeout del broker (Redis: 1 hora), o el evento se reentrega cada hora
+PROMO_EVENT_HORIZON = timedelta(minutes=int(os.getenv("PROMO_EVENT_HORIZON_MINUTES", "10")))
+
+# ---- Leases / deduplication (Redis) ----
+# Periodic tasks hold a lease while running; a run can not outlive the time limit
+TASK_LEASE_SECONDS = CELERY_TASK_TIME_LIMIT
+# Marker of a queued/running notify_promo per promo
+TASK_INFLIGHT_SECONDS = int(os.getenv("TASK_INFLIGHT_SECONDS", "300"))
+BEAT_LEADER_LEASE_SECONDS = int(os.getenv("BEAT_LEADER_LEASE_SECONDS", "15"))
+
+# ---- NotificationLog bulk writer ----
+# COPY + ON CONFLICT DO NOTHING per send_push_batch call (written before the ack)
+NOTIFICATION_LOG_COPY_ENABLED = os.getenv("NOTIFICATION_LOG_COPY_ENABLED", "True") == "True"
+
+# ---- Transactional outbox ----
+# Change feed: Redis stream (ordered) + pub/sub channel per event type
+OUTBOX_STREAM = os.getenv("OUTBOX_STREAM", "flash_promo:events")
+OUTBOX_STREAM_MAXLEN = int(os.getenv("OUTBOX_STREAM_MAXLEN", "100000"))
+OUTBOX_CHANNEL_PREFIX = os.getenv("OUTBOX_CHANNEL_PREFIX", "flash_promo:events:")
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "500"))
+OUTBOX_RELAY_MAX_BATCHES = int(os.getenv("OUTBOX_RELAY_MAX_BATCHES", "50"))
+
+# ---- Bulk catalog import ----
+CATALOG_IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "5000"))
+CATALOG_IMPORT_MAX_ERRORS = int(os.getenv("CATALOG_IMPORT_MAX_ERRORS", "1000"))
+# Tope del archivo por HTTP (se importa dentro del request, con el timeout de gunicorn);
+# los catalogos mas grandes van por `manage.py import_catalog`
+CATALOG_IMPORT_MAX_BYTES = int(os.getenv("CATALOG_IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# ---- Bulk flash promo scheduling ----
+PROMO_BATCH_MAX_SIZE = int(os.getenv("PROMO_BATCH_MAX_SIZE", "5000"))
+
+# ---- Streaming exports ----
+# Filas por fetch del cursor del lado del servidor
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+EXPORT_MAX_DAYS = int(os.getenv("EXPORT_MAX_DAYS", "93"))
+
+# ---- Cart rate limits (Redis, ventana deslizante) ----
+# "N/<periodo>" por endpoint y scope (user = credenciales, ip, promo = promo_id
+# del body). Un scope ausente no se limita; si Redis falla se deja pasar
+CART_RATE_LIMITS = {
+    "reserve": {
+        "user": os.getenv("RATE_LIMIT_RESERVE_USER", "10/10s"),
+        "ip": os.getenv("RATE_LIMIT_RESERVE_IP", "60/10s"),
+        "promo": os.getenv("RATE_LIMIT_RESERVE_PROMO", "500/1s"),
+    },
+    "checkout": {
+        "user": os.getenv("RATE_LIMIT_CHECKOUT_USER", "10/10s"),
+        "ip": os.getenv("RATE_LIMIT_CHECKOUT_IP", "60/10s"),
+    },
+    "cancel": {
+        "user": os.getenv("RATE_LIMIT_CANCEL_USER", "10/10s"),
+        "ip": os.getenv("RATE_LIMIT_CANCEL_IP", "60/10s"),
+    },
+}
+
+# ---- Bulkheads / load shedding ----
+# Limite de requests concurrentes por proceso (y por compartimento). Con gunicorn
+# gthread la suma no tiene que ser <= GUNICORN_THREADS; lo importante es que
+# reserve solo no pueda ocupar todos los hilos. Se compara por prefijo del path,
+# en orden: el primer compartimento que coincide gana. Apagado por defecto: con
+# runserver o pocos hilos solo agrega 503; el perfil de produccion lo activa.
+# Los limites por defecto salen de los hilos de gunicorn (la mitad por compartimento)
+BULKHEADS_ENABLED = os.getenv("BULKHEADS_ENABLED", "False") == "True"
+BULKHEAD_RETRY_AFTER_SECONDS = int(os.getenv("BULKHEAD_RETRY_AFTER_SECONDS", "1"))
+_BULKHEAD_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+_BULKHEAD_HALF = str(max(1, _BULKHEAD_THREADS // 2))
+BULKHEADS = {
+    "reserve": {
+        "paths": ["/cart/reserve"],
+        "limit": int(os.getenv("BULKHEAD_RESERVE_LIMIT", _BULKHEAD_HALF)),
+        # Espera corta: un hilo bloqueado aca es un hilo que no atiende checkout
+        "max_wait_ms": int(os.getenv("BULKHEAD_RESERVE_MAX_WAIT_MS", "20")),
+        "max_queue_ms": int(os.getenv("BULKHEAD_RESERVE_MAX_QUEUE_MS", "500")),
+    },
+    "checkout": {
+        "paths": ["/cart/checkout", "/cart/cancel"],
+        "limit": int(os.getenv("BULKHEAD_CHECKOUT_LIMIT", _BULKHEAD_HALF)),
+        "max_wait_ms": int(os.getenv("BULKHEAD_CHECKOUT_MAX_WAIT_MS", "200")),
+        "max_queue_ms": int(os.getenv("BULKHEAD_CHECKOUT_MAX_QUEUE_MS", "2000")),
+    },
+    "active_promos": {
+        "paths": ["/promos/active"],
+        "limit": int(os.getenv("BULKHEAD_ACTIVE_PROMOS_LIMIT", _BULKHEAD_HALF)),
+        "max_wait_ms": int(os.getenv("BULKHEAD_ACTIVE_PROMOS_MAX_WAIT_MS", "50")),
+        "max_queue_ms": int(os.getenv("BULKHEAD_ACTIVE_PROMOS_MAX_QUEUE_MS", "1000")),
+    },
+    "crud": {
+        "paths": ["/api/", "/promos"],
+        "limit": int(os.getenv("BULKHEAD_CRUD_LIMIT", str(_BULKHEAD_THREADS))),
+        "max_wait_ms": int(os.getenv("BULKHEAD_CRUD_MAX_WAIT_MS", "200")),
+        "max_queue_ms": int(os.getenv("BULKHEAD_CRUD_MAX_QUEUE_MS", "2000")),
+    },
+}
+
+# ---- Query budgets ----
+# Con True una vista que supera su query_budget lanza QueryBudgetExceeded (tests/CI);
+# con False solo se registra un warning
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "False") == "True"
+
+# ---- Metrics (Prometheus) ----
+# Deshabilitado: las metricas son no-ops. Con gunicorn / celery prefork definir
+# PROMETHEUS_MULTIPROC_DIR (directorio vacio y escribible) para agregar los procesos
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False") == "True"
+METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", "9808"))
+
+# ---- Tracing (OpenTelemetry) ----
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False") == "True"
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "flash-promo-api")
+# Fraccion de trazas raiz muestreadas (0.0 - 1.0); las hijas siguen al padre
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+# console | file
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "console")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces/{service}-{pid}.jsonl")
+
+# ---- Partitioning / retention ----
+# NotificationLog (sent_date) y Reservation (created_at) tienen particiones diarias
+PARTITION_PREMAKE_DAYS = int(os.getenv("PARTITION_PREMAKE_DAYS", "7"))
+PARTITION_DROP_DETACHED = os.getenv("PARTITION_DROP_DETACHED", "False") == "True"
+NOTIFICATION_LOG_RETENTION_DAYS = int(os.getenv("NOTIFICATION_LOG_RETENTION_DAYS", "30"))
+RESERVATION_RETENTION_DAYS = int(os.getenv("RESERVATION_RETENTION_DAYS", "90"))
+# How far back the expire_holds sweep looks for stale HOLD reservations
+HOLD_SWEEP_WINDOW = timedelta(hours=int(os.getenv("HOLD_SWEEP_WINDOW_HOURS", "24")))
+
+# ---- Stock reconciliation ----
+# Reservas mas viejas que esto ya no cambian de estado y se acumulan en StockAudit
+STOCK_RECONCILE_SETTLE = timedelta(minutes=int(os.getenv("STOCK_RECONCILE_SETTLE_MINUTES", "60")))
+# Con True la tarea periodica corrige el stock con drift (si no, solo reporta)
+STOCK_RECONCILE_REPAIR = os.getenv("STOCK_RECONCILE_REPAIR", "False") == "True"
 
 
 # ---- Swagger config ----
 
+# Artefacto generado con build_openapi_schema (en el build de la imagen);
+# /api/schema/ lo sirve desde memoria. Con DEBUG se genera al primer request
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", str(BASE_DIR / "openapi-schema.json"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Flash Promo API",
     "DESCRIPTION": "This API show services related to flash promo products",
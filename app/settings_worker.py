@@ -0,0 +1,25 @@
+"""
+Lean settings for the Celery worker and beat.
+
+Same configuration as app.settings without the apps only the web
+process needs (admin, sessions, messages, static files, DRF and
+drf-spectacular), so a new worker does not import them on startup.
+Usage: DJANGO_SETTINGS_MODULE=app.settings_worker
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+WEB_ONLY_APPS = {
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "rest_framework",
+    "django_filters",
+    "drf_spectacular",
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]  # noqa: F405
+
+# El worker no atiende HTTP
+MIDDLEWARE = []
@@ -18,10 +18,9 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
+from flash_promo.metrics import metrics_view
+from flash_promo.schema import CachedSpectacularAPIView
 from flash_promo.views import (
     ActivePromosView,
     ReservePromoView,
@@ -30,7 +29,10 @@ from flash_promo.views import (
     StoreViewSet,
     StoreProductViewSet,
     ProductViewSet,
-    FlashPromoCreateView
+    FlashPromoCreateView,
+    FlashPromoBatchCreateView,
+    ReservationExportView,
+    NotificationExportView,
 )
 
 router = DefaultRouter()
@@ -43,14 +45,20 @@ urlpatterns = [
 
     # --- API ---
     path("promos", FlashPromoCreateView.as_view()),
+    path("promos/batch", FlashPromoBatchCreateView.as_view()),
     path("promos/active", ActivePromosView.as_view()),
     path("cart/reserve", ReservePromoView.as_view()),
     path("cart/checkout", ConfirmReservationView.as_view()),
     path("cart/cancel", CancelReservationView.as_view()),
+    path("exports/reservations", ReservationExportView.as_view()),
+    path("exports/notifications", NotificationExportView.as_view()),
     path("api/", include(router.urls)),
 
+    # --- Prometheus ---
+    path("metrics", metrics_view, name="metrics"),
+
     # --- OpenAPI / Swagger ---
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(
         url_name='schema'
     ), name='swagger-ui'),
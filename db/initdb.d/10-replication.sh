@@ -0,0 +1,16 @@
+#!/bin/sh
+# Rol y pg_hba para la replica de streaming (docker-compose.replica.yml).
+# Solo corre al inicializar un volumen nuevo y solo si hay password de replicacion.
+set -e
+
+if [ -z "$POSTGRES_REPLICATION_PASSWORD" ]; then
+    exit 0
+fi
+
+REPLICATION_USER="${POSTGRES_REPLICATION_USER:-replicator}"
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-SQL
+    CREATE ROLE "$REPLICATION_USER" WITH REPLICATION LOGIN PASSWORD '$POSTGRES_REPLICATION_PASSWORD';
+SQL
+
+echo "host replication $REPLICATION_USER all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,20 @@
+#!/bin/sh
+# Replica de streaming: con el volumen vacio clona el primario con
+# pg_basebackup (-R escribe standby.signal + primary_conninfo) y arranca en hot standby.
+set -e
+
+PRIMARY_HOST="${PRIMARY_HOST:-postgres}"
+REPLICATION_USER="${POSTGRES_REPLICATION_USER:-replicator}"
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$PRIMARY_HOST" -p 5432 -q; do
+        echo "waiting for primary $PRIMARY_HOST"
+        sleep 1
+    done
+    PGPASSWORD="$POSTGRES_REPLICATION_PASSWORD" pg_basebackup \
+        -h "$PRIMARY_HOST" -p 5432 -U "$REPLICATION_USER" \
+        -D "$PGDATA" -Fp -Xs -P -R
+    chmod 0700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on
@@ -1,12 +1,34 @@
 from django.contrib import admin
 from django.contrib.gis import admin as geoadmin
+from django.db import transaction
 from django.utils import timezone
 
 from .models import (
     Profile, Store, Product, StoreProduct,
-    FlashPromo, NotificationLog, Reservation
+    FlashPromo, NotificationLog, Reservation, StockAudit, WaitlistEntry
 )
 from .constants import FlashPromoStatus, ReservationStatus
+from .services import (
+    activate_due_promos,
+    cancel_or_expire_reservation,
+    drain_waitlist,
+    finish_due_promos,
+)
+from .tasks import on_promos_activated, schedule_promo_events
+from . import outbox, reconciliation
+
+
+def _record_stock_change(store_product: StoreProduct, previous_stock: int | None):
+    # Cambios de stock hechos a mano tambien van al outbox
+    if previous_stock != store_product.stock:
+        outbox.record(outbox.stock_event(
+            store_product.pk, store_product.stock - (previous_stock or 0), store_product.stock
+        ))
+        # El valor cargado a mano pasa a ser la linea base de la reconciliacion
+        reconciliation.rebaseline([store_product.pk])
+        # Las unidades repuestas van primero a la lista de espera
+        if drain_waitlist([store_product.pk]):
+            store_product.refresh_from_db(fields=["stock"])
 
 
 # ---------- Inlines ----------
@@ -41,6 +63,19 @@ class StoreAdmin(geoadmin.GISModelAdmin):
     default_lat = 10.9685
     default_lon = -74.8069
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not StoreProduct:
+            return super().save_formset(request, form, formset, change)
+        previous = {
+            obj.pk: obj.stock
+            for obj in StoreProduct.objects.filter(
+                pk__in=[f.instance.pk for f in formset.forms if f.instance.pk]
+            )
+        }
+        super().save_formset(request, form, formset, change)
+        for store_product in formset.new_objects + [obj for obj, _ in formset.changed_objects]:
+            _record_stock_change(store_product, previous.get(store_product.pk))
+
 
 # ---------- Catálogo ----------
 @admin.register(Product)
@@ -50,6 +85,17 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ("brand", "category")
 
 
+@admin.register(StockAudit)
+class StockAuditAdmin(admin.ModelAdmin):
+    # Lo escribe la reconciliacion: solo lectura
+    list_display = ("store_product", "drift", "supply", "consumed_frozen", "frozen_until")
+    list_select_related = ("store_product", "store_product__store", "store_product__product")
+    readonly_fields = ("store_product", "supply", "consumed_frozen", "frozen_until", "drift")
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(StoreProduct)
 class StoreProductAdmin(admin.ModelAdmin):
     list_display = ("id", "store", "product", "stock", "base_price")
@@ -58,17 +104,29 @@ class StoreProductAdmin(admin.ModelAdmin):
     autocomplete_fields = ("store", "product")
     list_select_related = ("store", "product")
 
+    def save_model(self, request, obj, form, change):
+        previous_stock = form.initial.get("stock") if change else None
+        super().save_model(request, obj, form, change)
+        _record_stock_change(obj, previous_stock)
+
 
 # ---------- Promos ----------
+# Mismo camino que los eventos y el barrido: activated_at, outbox y notify_promo
 @admin.action(description="Activar promos seleccionadas (status → active)")
 def make_active(modeladmin, request, queryset):
-    count = queryset.update(status=FlashPromoStatus.ACTIVE)
-    modeladmin.message_user(request, f"{count} promo(s) activadas.")
+    selected = list(queryset.values_list("id", flat=True))
+    activated = activate_due_promos(promo_ids=selected)
+    on_promos_activated(activated, source="admin")
+    skipped = len(selected) - len(activated)
+    message = f"{len(activated)} promo(s) activadas."
+    if skipped:
+        message += f" {skipped} omitida(s): no estaban agendadas o estan fuera de su ventana."
+    modeladmin.message_user(request, message)
 
 @admin.action(description="Finalizar promos seleccionadas (status → finished)")
 def make_finished(modeladmin, request, queryset):
-    count = queryset.update(status=FlashPromoStatus.FINISHED)
-    modeladmin.message_user(request, f"{count} promo(s) finalizadas.")
+    finished = finish_due_promos(promo_ids=list(queryset.values_list("id", flat=True)))
+    modeladmin.message_user(request, f"{len(finished)} promo(s) finalizadas.")
 
 @admin.register(FlashPromo)
 class FlashPromoAdmin(admin.ModelAdmin):
@@ -85,6 +143,12 @@ class FlashPromoAdmin(admin.ModelAdmin):
     list_select_related = ("store_product", "store_product__store", "store_product__product")
     actions = [make_active, make_finished]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Reprograma los eventos de activacion/finalizacion si cambio la ventana
+        if not change or {"starts_at", "ends_at", "status"} & set(form.changed_data):
+            transaction.on_commit(lambda: schedule_promo_events(obj))
+
     @admin.display(boolean=True, description="Activa ahora")
     def is_active_now(self, obj: FlashPromo):
         now = timezone.now()
@@ -106,14 +170,11 @@ class NotificationLogAdmin(admin.ModelAdmin):
 @admin.action(description="Marcar reservas seleccionadas como expiradas (restaura stock)")
 def expire_reservations(modeladmin, request, queryset):
 
-    to_expire = queryset.select_related("store_product").filter(status=ReservationStatus.HOLD)
+    to_expire = queryset.filter(status=ReservationStatus.HOLD)
     count = 0
     for res in to_expire:
-        sp = res.store_product
-        sp.stock = sp.stock + 1
-        sp.save(update_fields=["stock"])
-        res.status = ReservationStatus.EXPIRED
-        res.save(update_fields=["status"])
+        # Mismo camino que el API: lock del StoreProduct + evento en el outbox
+        cancel_or_expire_reservation(res)
         count += 1
     modeladmin.message_user(request, f"{count} reserva(s) expiradas y stock restaurado.")
 
@@ -127,3 +188,14 @@ class ReservationAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     list_select_related = ("user", "store_product", "store_product__store", "store_product__product")
     actions = [expire_reservations]
+
+
+# ---------- Lista de espera ----------
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "promo", "user", "status", "created_at", "served_at")
+    list_filter = ("status",)
+    search_fields = ("user__username", "user__email", "reservation_token")
+    autocomplete_fields = ("user", "promo")
+    readonly_fields = ("created_at", "served_at", "reservation_token")
+    list_select_related = ("user", "promo")
@@ -0,0 +1,63 @@
+import logging
+import os
+import socket
+import uuid
+
+from celery.beat import PersistentScheduler
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Renueva el lease si ya es nuestro, si no intenta tomarlo
+ACQUIRE_OR_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('expire', KEYS[1], ARGV[2])
+    return 1
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+
+class LeaderElectedScheduler(PersistentScheduler):
+    """
+    Celery beat scheduler for running several beat replicas:
+    only the replica holding the leader lease in Redis sends
+    the periodic tasks, the others stay on standby.
+    Usage: celery -A app beat -S flash_promo.beat:LeaderElectedScheduler
+    """
+
+    lease_key = "flash_promo:beat:leader"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_ttl = settings.BEAT_LEADER_LEASE_SECONDS
+        self.is_leader = False
+        self._acquire_or_renew = get_redis_connection("default").register_script(
+            ACQUIRE_OR_RENEW
+        )
+
+    def _refresh_leadership(self) -> bool:
+        try:
+            leader = bool(self._acquire_or_renew(
+                keys=[self.lease_key], args=[self.identity, self.lease_ttl]
+            ))
+        except Exception:
+            logger.exception("beat leader election failed")
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info("beat %s leader=%s", self.identity, leader)
+        self.is_leader = leader
+        return leader
+
+    def tick(self, *args, **kwargs):
+        if not self._refresh_leadership():
+            # Standby: vuelve a intentar antes de que expire el lease del lider
+            return self.lease_ttl / 3
+        # Nunca dormir mas que lo necesario para renovar el lease
+        return min(super().tick(*args, **kwargs), self.lease_ttl / 3)
@@ -0,0 +1,86 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from flash_promo.models import NotificationLog
+
+
+def copy_rows(cursor, table: str, columns: list[str], rows) -> None:
+    """Streams the given rows into `table`
+    using psycopg 3 COPY FROM STDIN"""
+
+    quote = connection.ops.quote_name
+    statement = "COPY {} ({}) FROM STDIN".format(
+        quote(table), ", ".join(quote(column) for column in columns)
+    )
+    with cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def merge_rows(
+    table: str,
+    columns: list[str],
+    rows,
+    conflict_columns: list[str],
+    update_columns: list[str] | None = None,
+    returning: list[str] | None = None,
+):
+    """This function COPY the rows into a temporary
+    staging table and merge them into `table` with
+    ON CONFLICT (DO NOTHING or DO UPDATE)"""
+
+    quote = connection.ops.quote_name
+    stage = f"{table}_stage"
+    column_list = ", ".join(quote(column) for column in columns)
+
+    if update_columns:
+        on_conflict = "DO UPDATE SET " + ", ".join(
+            f"{quote(column)} = EXCLUDED.{quote(column)}" for column in update_columns
+        )
+    else:
+        on_conflict = "DO NOTHING"
+
+    returning_sql = ""
+    if returning:
+        returning_sql = " RETURNING " + ", ".join(quote(column) for column in returning)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ON COMMIT DROP: el staging vive solo dentro de esta transaccion
+        cursor.execute(f"DROP TABLE IF EXISTS {quote(stage)}")
+        cursor.execute(
+            f"CREATE TEMP TABLE {quote(stage)} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {quote(table)} WITH NO DATA"
+        )
+        copy_rows(cursor, stage, columns, rows)
+        cursor.execute(
+            f"INSERT INTO {quote(table)} ({column_list}) "
+            f"SELECT {column_list} FROM {quote(stage)} "
+            f"ON CONFLICT ({', '.join(quote(c) for c in conflict_columns)}) {on_conflict}"
+            f"{returning_sql}"
+        )
+        if returning:
+            return cursor.fetchall()
+        return cursor.rowcount
+
+
+NOTIFICATION_LOG_COLUMNS = ["user_id", "promo_id", "sent_at", "sent_date"]
+NOTIFICATION_LOG_CONFLICT = ["user_id", "promo_id", "sent_date"]
+
+
+def write_notification_logs(promo_id: int, user_ids: list[int]) -> list[int]:
+    """Writes the NotificationLog rows of one push
+    batch with COPY + ON CONFLICT DO NOTHING. Runs
+    inside the task: the rows are persisted before
+    the task is acked. Returns the user ids actually
+    inserted (the ones not notified today yet)"""
+
+    sent_at = timezone.now()
+    sent_date = timezone.localdate(sent_at)
+    inserted = merge_rows(
+        NotificationLog._meta.db_table,
+        NOTIFICATION_LOG_COLUMNS,
+        ((user_id, promo_id, sent_at, sent_date) for user_id in user_ids),
+        conflict_columns=NOTIFICATION_LOG_CONFLICT,
+        returning=["user_id"],
+    )
+    return [user_id for user_id, in inserted]
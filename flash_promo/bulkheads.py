@@ -0,0 +1,111 @@
+import json
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from flash_promo import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Compartment:
+    """Concurrency cap of a group of endpoints inside this process"""
+
+    def __init__(self, name: str, paths, limit: int, max_wait_ms: int, max_queue_ms: int):
+        self.name = name
+        self.paths = tuple(paths)
+        self.limit = limit
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_ms = max_queue_ms
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def matches(self, path: str) -> bool:
+        return path.startswith(self.paths)
+
+    def acquire(self) -> bool:
+        started = time.perf_counter()
+        acquired = self._semaphore.acquire(timeout=self.max_wait)
+        metrics.BULKHEAD_WAIT_SECONDS.labels(compartment=self.name).observe(
+            time.perf_counter() - started
+        )
+        return acquired
+
+    def release(self):
+        self._semaphore.release()
+
+
+def request_queue_ms(request, now: float | None = None) -> float | None:
+    """
+    Time the request spent queued in front of the app, from the
+    X-Request-Start header of the proxy ("t=<epoch>" in seconds,
+    milliseconds or microseconds). None if missing or unparseable.
+    """
+    header = request.META.get("HTTP_X_REQUEST_START")
+    if not header:
+        return None
+    try:
+        started = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    if not math.isfinite(started):
+        return None
+    # nginx manda segundos con decimales; otros proxies ms o us
+    if started > 1e14:
+        started /= 1_000_000
+    elif started > 1e11:
+        started /= 1000
+    now = time.time() if now is None else now
+    return max(0.0, (now - started) * 1000)
+
+
+def _shed(compartment: Compartment, reason: str) -> HttpResponse:
+    metrics.BULKHEAD_REJECTED.labels(compartment=compartment.name, reason=reason).inc()
+    response = HttpResponse(
+        json.dumps({"detail": "Service overloaded, retry later."}),
+        status=503,
+        content_type="application/json",
+    )
+    response["Retry-After"] = str(settings.BULKHEAD_RETRY_AFTER_SECONDS)
+    return response
+
+
+class BulkheadMiddleware:
+    """
+    Bulkheads per group of endpoints (BULKHEADS): each compartment
+    has its own concurrency cap per process, so a reserve burst can
+    not take every thread and DB connection away from checkout or the
+    CRUD. A request is shed with a fast 503 (+ Retry-After) when it
+    already waited more than max_queue_ms in front of the app or its
+    compartment stays full for max_wait_ms. Paths outside every
+    compartment are not limited.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.compartments = [
+            Compartment(name, **config) for name, config in settings.BULKHEADS.items()
+        ] if settings.BULKHEADS_ENABLED else []
+
+    def __call__(self, request):
+        compartment = next((c for c in self.compartments if c.matches(request.path)), None)
+        if compartment is None:
+            return self.get_response(request)
+
+        queue_ms = request_queue_ms(request)
+        if queue_ms is not None and queue_ms > compartment.max_queue_ms:
+            # El cliente probablemente ya se rindio: no gastar un hilo en el
+            return _shed(compartment, "queue_time")
+
+        if not compartment.acquire():
+            return _shed(compartment, "full")
+        in_flight = metrics.BULKHEAD_IN_FLIGHT.labels(compartment=compartment.name)
+        in_flight.inc()
+        try:
+            return self.get_response(request)
+        finally:
+            in_flight.dec()
+            compartment.release()
@@ -0,0 +1,244 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from flash_promo import outbox, reconciliation
+from flash_promo.bulk import merge_rows
+from flash_promo.models import Product, Store, StoreProduct
+from flash_promo.services import drain_waitlist
+
+FORMATS = ("csv", "ndjson")
+
+MAX_STOCK = 2147483647  # PositiveIntegerField
+MAX_PRICE = Decimal("9999999999.99")  # DecimalField(max_digits=12, decimal_places=2)
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    upserted: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line: int, errors: dict, max_errors: int):
+        self.failed += 1
+        # Solo guardamos los primeros max_errors para mantener la memoria acotada
+        if len(self.errors) < max_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+
+def guess_format(filename: str) -> str:
+    return "ndjson" if filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def read_rows(stream, fmt: str):
+    """Yields (line, row) from a text stream in
+    CSV (with header) or NDJSON; a row that can
+    not be parsed is yielded as an Exception"""
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Each line must be a JSON object.")
+            continue
+        yield line_number, row
+
+
+def _batches(rows, size: int):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _text(row: dict, name: str, max_length: int, required: bool, errors: dict) -> str:
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        errors[name] = "This field is required."
+    elif len(value) > max_length:
+        errors[name] = f"Ensure this field has no more than {max_length} characters."
+    return value
+
+
+def _integer(row: dict, name: str, errors: dict, minimum: int = 0, maximum: int = MAX_STOCK):
+    value = row.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        errors[name] = "A valid integer is required."
+        return None
+    if not minimum <= value <= maximum:
+        errors[name] = f"Must be between {minimum} and {maximum}."
+        return None
+    return value
+
+
+def _price(row: dict, name: str, errors: dict):
+    value = row.get(name)
+    if value in (None, ""):
+        errors[name] = "This field is required."
+        return None
+    try:
+        value = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        errors[name] = "A valid number is required."
+        return None
+    if not value.is_finite() or not Decimal(0) <= value <= MAX_PRICE:
+        errors[name] = f"Must be between 0 and {MAX_PRICE}."
+        return None
+    return value.quantize(Decimal("0.01"))
+
+
+def _parse_error(line, row, report, max_errors) -> bool:
+    if isinstance(row, Exception):
+        report.add_error(line, {"row": str(row)}, max_errors)
+        return True
+    return False
+
+
+def import_products(stream, fmt: str, batch_size: int | None = None, max_errors: int | None = None):
+    """Upserts products by sku with COPY + ON CONFLICT"""
+
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    # 0 es valido: se cuentan los errores sin devolver el detalle
+    if max_errors is None:
+        max_errors = settings.CATALOG_IMPORT_MAX_ERRORS
+    report = ImportReport()
+
+    for batch in _batches(read_rows(stream, fmt), batch_size):
+        valid = {}
+        for line, row in batch:
+            report.processed += 1
+            if _parse_error(line, row, report, max_errors):
+                continue
+            errors = {}
+            sku = _text(row, "sku", 64, True, errors)
+            name = _text(row, "name", 120, True, errors)
+            brand = _text(row, "brand", 64, False, errors)
+            category = _text(row, "category", 64, False, errors)
+            if errors:
+                report.add_error(line, errors, max_errors)
+                continue
+            # ON CONFLICT no puede tocar la misma fila dos veces: gana la ultima
+            valid[sku] = (name, sku, brand, category)
+
+        if valid:
+            report.upserted += merge_rows(
+                Product._meta.db_table,
+                ["name", "sku", "brand", "category"],
+                valid.values(),
+                conflict_columns=["sku"],
+                update_columns=["name", "brand", "category"],
+            )
+    return report
+
+
+def import_store_products(
+    stream, fmt: str, batch_size: int | None = None, max_errors: int | None = None
+):
+    """Upserts store products by (store, product). The product
+    can be referenced by product_id or sku; foreign keys are
+    validated with one query per batch and table"""
+
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    # 0 es valido: se cuentan los errores sin devolver el detalle
+    if max_errors is None:
+        max_errors = settings.CATALOG_IMPORT_MAX_ERRORS
+    report = ImportReport()
+
+    for batch in _batches(read_rows(stream, fmt), batch_size):
+        parsed = []
+        for line, row in batch:
+            report.processed += 1
+            if _parse_error(line, row, report, max_errors):
+                continue
+            errors = {}
+            store_id = _integer(row, "store_id", errors, minimum=1, maximum=2**63 - 1)
+            product_id = _integer(row, "product_id", errors, minimum=1, maximum=2**63 - 1)
+            sku = _text(row, "sku", 64, False, errors)
+            stock = _integer(row, "stock", errors)
+            base_price = _price(row, "base_price", errors)
+            if store_id is None and "store_id" not in errors:
+                errors["store_id"] = "This field is required."
+            if product_id is None and not sku and "product_id" not in errors:
+                errors["product_id"] = "product_id or sku is required."
+            if stock is None and "stock" not in errors:
+                errors["stock"] = "This field is required."
+            if errors:
+                report.add_error(line, errors, max_errors)
+                continue
+            parsed.append((line, store_id, product_id, sku, stock, base_price))
+
+        # Validacion de FKs por conjunto: una consulta por tabla y batch
+        store_ids = set(
+            Store.objects
+            .filter(pk__in={store_id for _, store_id, *_ in parsed})
+            .values_list("pk", flat=True)
+        )
+        product_ids = set(
+            Product.objects
+            .filter(pk__in={product_id for _, _, product_id, *_ in parsed if product_id})
+            .values_list("pk", flat=True)
+        )
+        product_by_sku = dict(
+            Product.objects
+            .filter(sku__in={sku for _, _, product_id, sku, *_ in parsed if not product_id})
+            .values_list("sku", "pk")
+        )
+
+        valid = {}
+        for line, store_id, product_id, sku, stock, base_price in parsed:
+            errors = {}
+            if store_id not in store_ids:
+                errors["store_id"] = "Store does not exist."
+            if product_id:
+                if product_id not in product_ids:
+                    errors["product_id"] = "Product does not exist."
+            else:
+                product_id = product_by_sku.get(sku)
+                if product_id is None:
+                    errors["sku"] = "Product does not exist."
+            if errors:
+                report.add_error(line, errors, max_errors)
+                continue
+            valid[(store_id, product_id)] = (store_id, product_id, stock, base_price)
+
+        if valid:
+            with transaction.atomic():
+                upserted = merge_rows(
+                    StoreProduct._meta.db_table,
+                    ["store_id", "product_id", "stock", "base_price"],
+                    valid.values(),
+                    conflict_columns=["store_id", "product_id"],
+                    update_columns=["stock", "base_price"],
+                    returning=["id", "stock"],
+                )
+                # Stock absoluto: no conocemos el delta de cada fila
+                outbox.record(*[
+                    outbox.stock_event(store_product_id, None, stock)
+                    for store_product_id, stock in upserted
+                ])
+                reconciliation.rebaseline(store_product_id for store_product_id, _ in upserted)
+                # Las unidades repuestas van primero a la lista de espera
+                drain_waitlist(store_product_id for store_product_id, _ in upserted)
+            report.upserted += len(upserted)
+    return report
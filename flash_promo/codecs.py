@@ -0,0 +1,66 @@
+import base64
+import zlib
+
+# Primer byte del payload
+FORMAT_VARINT = 0x01
+FORMAT_VARINT_ZLIB = 0x02
+
+# Por debajo de esto zlib no suele ganar y solo agrega CPU
+COMPRESS_MIN_BYTES = 256
+
+
+def _encode_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def pack_ids(ids, compress: bool = True) -> str:
+    """
+    Compact, JSON-safe encoding of a set of positive ids (order and
+    duplicates are not kept): sorted, delta-encoded as varints,
+    zlib-compressed when it helps, base64 text. Consecutive ids cost
+    one byte before compression and almost nothing after it.
+    """
+    out = bytearray()
+    previous = 0
+    for value in sorted(set(ids)):
+        if value < 0:
+            raise ValueError("ids must be positive")
+        _encode_varint(value - previous, out)
+        previous = value
+
+    payload = bytes([FORMAT_VARINT]) + out
+    if compress and len(out) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(bytes(out), 6)
+        if len(compressed) < len(out):
+            payload = bytes([FORMAT_VARINT_ZLIB]) + compressed
+    return base64.b64encode(payload).decode("ascii")
+
+
+def unpack_ids(packed: str) -> list[int]:
+    """Inverse of pack_ids: sorted list of ids"""
+
+    payload = base64.b64decode(packed)
+    if not payload:
+        raise ValueError("empty payload")
+    kind, data = payload[0], payload[1:]
+    if kind == FORMAT_VARINT_ZLIB:
+        data = zlib.decompress(data)
+    elif kind != FORMAT_VARINT:
+        raise ValueError(f"unknown payload format {kind}")
+
+    ids = []
+    previous = value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        ids.append(previous)
+        value = shift = 0
+    if shift:
+        raise ValueError("truncated payload")
+    return ids
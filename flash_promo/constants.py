@@ -1,8 +1,12 @@
+from datetime import timedelta
+
 from django.db import models
 
 
 MINIMUM_DISTANCE = 2000 # Represent the  2km distance
 
+HOLD_DURATION = timedelta(minutes=1) # Reservation hold time
+
 
 class FlashPromoStatus(models.TextChoices):
     """This class contain the different
@@ -21,3 +25,21 @@ class ReservationStatus(models.TextChoices):
     CONFIRMED = ("CONFIRMED", "Confirmado")
     CANCELED = ("CANCELED", "Cancelado")
     EXPIRED = ("EXPIRED", "Expirado")
+
+
+class OutboxEventType(models.TextChoices):
+    """Events written to the transactional outbox
+    and relayed to the Redis change feed"""
+
+    PROMO_STATUS_CHANGED = ("promo.status_changed", "Cambio de estado de promo")
+    STOCK_CHANGED = ("stock.changed", "Cambio de stock")
+    RESERVATION_STATUS_CHANGED = ("reservation.status_changed", "Cambio de estado de reserva")
+    WAITLIST_HANDOFF = ("waitlist.handoff", "Reserva asignada desde la lista de espera")
+
+
+class WaitlistStatus(models.TextChoices):
+    """Status of a user in the waitlist of a sold out promo"""
+
+    WAITING = ("WAITING", "En espera")
+    SERVED = ("SERVED", "Con reserva")
+    EXPIRED = ("EXPIRED", "Promo finalizada")
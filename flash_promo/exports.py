@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from flash_promo.models import NotificationLog, Reservation
+from flash_promo.routers import replica_alias
+
+RESERVATION_COLUMNS = (
+    "id", "token", "status", "promo_id", "store_product_id", "user_id", "created_at", "expires_at"
+)
+NOTIFICATION_COLUMNS = ("id", "user_id", "promo_id", "sent_date", "sent_at")
+
+CHUNK_BYTES = 64 * 1024
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def reservations_export(start: date, end: date, promo_id: int | None = None):
+    """Reservations created between start and end (inclusive).
+    The created_at range prunes the Reservation partitions.
+    Read from the replica when it is healthy"""
+
+    queryset = Reservation.objects.using(replica_alias()).filter(
+        created_at__gte=_day_start(start),
+        created_at__lt=_day_start(end + timedelta(days=1)),
+    )
+    if promo_id is not None:
+        queryset = queryset.filter(promo_id=promo_id)
+    return queryset.values_list(*RESERVATION_COLUMNS), RESERVATION_COLUMNS
+
+
+def notifications_export(start: date, end: date, promo_id: int | None = None):
+    """Notifications sent between start and end (inclusive).
+    The sent_date range prunes the NotificationLog partitions"""
+
+    queryset = NotificationLog.objects.using(replica_alias()).filter(
+        sent_date__gte=start, sent_date__lte=end
+    )
+    if promo_id is not None:
+        queryset = queryset.filter(promo_id=promo_id)
+    return queryset.values_list(*NOTIFICATION_COLUMNS), NOTIFICATION_COLUMNS
+
+
+def _rows(queryset):
+    # En autocommit iterator() declara el cursor WITH HOLD y Postgres materializa todo
+    # el resultado al hacer commit. Dentro de atomic() el cursor no es WITH HOLD:
+    # las filas se traen del servidor a medida que se consume la respuesta
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(queryset, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in _rows(queryset):
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def stream_ndjson(queryset, columns):
+    lines = []
+    size = 0
+    for row in _rows(queryset):
+        line = json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    yield "".join(lines).encode()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+STREAMERS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,67 @@
+import logging
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def lease(name: str, ttl: float | None = None):
+    """Non blocking distributed lock in Redis.
+    Yields True when the lease was acquired; it is
+    released on exit or expires after `ttl` seconds"""
+
+    lock = cache.lock(
+        f"flash_promo:lease:{name}",
+        timeout=ttl or settings.TASK_LEASE_SECONDS,
+    )
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                # El lease ya expiro (la tarea corrio mas que el ttl)
+                pass
+
+
+def single_flight(name: str | None = None, ttl: float | None = None):
+    """Decorator for periodic tasks: a run is skipped
+    while another run (in any worker) holds the lease"""
+
+    def decorator(func):
+        lease_name = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with lease(lease_name, ttl) as acquired:
+                if not acquired:
+                    logger.info("skipping %s: previous run still in progress", lease_name)
+                    return None
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _inflight_key(task_name: str, key) -> str:
+    return f"flash_promo:inflight:{task_name}:{key}"
+
+
+def mark_inflight(task_name: str, key, ttl: float | None = None) -> bool:
+    """Return False if a job with the same key
+    is already queued or running"""
+    return cache.add(
+        _inflight_key(task_name, key), 1, timeout=ttl or settings.TASK_INFLIGHT_SECONDS
+    )
+
+
+def clear_inflight(task_name: str, key):
+    cache.delete(_inflight_key(task_name, key))
@@ -0,0 +1,65 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.db import connection
+
+RESULTS_DIR = "bench_results"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def latency_summary(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name: str, results: dict, output_dir: str | None = None, label: str = "") -> str:
+    """Writes the results as JSON with the environment
+    (git revision, Postgres version) so runs can be compared"""
+
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        server_version = cursor.fetchone()[0]
+
+    started = datetime.now(timezone.utc)
+    document = {
+        "benchmark": name,
+        "label": label,
+        "timestamp": started.isoformat(),
+        "git_revision": _git_revision(),
+        "postgres": server_version,
+        "python": platform.python_version(),
+        "results": results,
+    }
+    output_dir = output_dir or RESULTS_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = f"_{label}" if label else ""
+    path = os.path.join(output_dir, f"{name}_{started:%Y%m%dT%H%M%S}{suffix}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=2)
+    return path
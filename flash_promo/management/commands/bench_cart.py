@@ -0,0 +1,275 @@
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from flash_promo.constants import FlashPromoStatus, ReservationStatus
+from flash_promo.models import FlashPromo, Product, Profile, Reservation, Store, StoreProduct
+from flash_promo.services import confirm_reservation, hold_store_product_db
+
+from ._bench import latency_summary, save_results
+
+# Barranquilla; todos los usuarios quedan dentro del radio de la tienda
+BENCH_POINT = Point(-74.7964, 10.9639, srid=4326)
+
+# api con --with-limits: rate limit y bulkheads no son errores del carrito
+REJECTED = {429: "throttled", 503: "shed"}
+
+
+class LockWaitTimer:
+    """execute_wrapper that accumulates the time spent in
+    SELECT ... FOR UPDATE (lock wait + the lookup itself)"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if "FOR UPDATE" not in sql:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def _test_host() -> str:
+    hosts = [
+        host for host in settings.ALLOWED_HOSTS
+        if host not in ("*", "") and not host.startswith(".")
+    ]
+    return hosts[0] if hosts else "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the cart flow: N concurrent users reserve the same promo "
+        "(service or HTTP view) and reports throughput, p50/p95/p99, lock wait "
+        "and the stock invariants. Results are saved as JSON in bench_results/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--mode", choices=("service", "api"), default="service")
+        parser.add_argument(
+            "--confirm-ratio", type=float, default=0.0,
+            help="Fraction of successful holds that are confirmed right away.",
+        )
+        parser.add_argument(
+            "--with-limits", action="store_true",
+            help="api mode: keep the rate limits and bulkheads (429 / 503 are counted "
+                 "as throttled / shed). By default both are off for the run.",
+        )
+        parser.add_argument("--label", default="", help="Tag saved with the results.")
+        parser.add_argument("--output-dir")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data.")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--users and --concurrency must be positive.")
+        if not 0 <= options["confirm_ratio"] <= 1:
+            raise CommandError("--confirm-ratio must be between 0 and 1.")
+
+        prefix = f"bench_cart_{uuid.uuid4().hex[:8]}"
+        promo, users = self._setup(prefix, options["users"], options["stock"])
+        # Todos los usuarios salen de la misma IP hacia la misma promo: con los limites
+        # del carrito y los bulkheads se mediria el rate limit, no el lock de stock
+        overrides = {}
+        if options["mode"] == "api" and not options["with_limits"]:
+            overrides = {"CART_RATE_LIMITS": {}, "BULKHEADS_ENABLED": False}
+        try:
+            with override_settings(**overrides):
+                results = self._run(promo, users, options)
+        finally:
+            if not options["keep"]:
+                self._cleanup(prefix, promo)
+
+        path = save_results("bench_cart", results, options["output_dir"], options["label"])
+        self._print(results)
+        self.stdout.write(f"results: {path}")
+
+    def _setup(self, prefix, total_users, stock):
+        now = timezone.now()
+        store = Store.objects.create(name=prefix, geom=BENCH_POINT)
+        product = Product.objects.create(name=prefix, sku=prefix)
+        store_product = StoreProduct.objects.create(
+            store=store, product=product, stock=stock, base_price=100
+        )
+        # Se crea ACTIVE directamente: no pasa por la programacion de eventos
+        promo = FlashPromo.objects.create(
+            store_product=store_product,
+            promo_price=50,
+            starts_at=now - timedelta(minutes=1),
+            ends_at=now + timedelta(hours=1),
+            status=FlashPromoStatus.ACTIVE,
+            activated_at=now,
+        )
+        User.objects.bulk_create(
+            [User(username=f"{prefix}_{i}") for i in range(total_users)], batch_size=5000
+        )
+        users = list(User.objects.filter(username__startswith=f"{prefix}_").order_by("id"))
+        Profile.objects.bulk_create(
+            [Profile(user=user, geom=BENCH_POINT, is_frequent=True) for user in users],
+            batch_size=5000,
+        )
+        return promo, users
+
+    def _cleanup(self, prefix, promo):
+        store_product = promo.store_product
+        Reservation.objects.filter(promo=promo).delete()
+        promo.delete()
+        store_product.delete()
+        Product.objects.filter(sku=prefix).delete()
+        Store.objects.filter(name=prefix).delete()
+        User.objects.filter(username__startswith=f"{prefix}_").delete()
+
+    def _run(self, promo, users, options):
+        mode = options["mode"]
+        confirm_ratio = options["confirm_ratio"]
+        pending = queue.SimpleQueue()
+        for user in users:
+            pending.put(user)
+        threads_count = min(options["concurrency"], len(users))
+        barrier = threading.Barrier(threads_count)
+        stats_lock = threading.Lock()
+        latencies, lock_wait = [], []
+        outcomes = {
+            "held": 0, "confirmed": 0, "no_stock": 0, "throttled": 0, "shed": 0, "errors": 0,
+        }
+        confirm_credit = [0.0]
+
+        def should_confirm() -> bool:
+            # Determinista: confirma exactamente confirm_ratio de los holds
+            with stats_lock:
+                confirm_credit[0] += confirm_ratio
+                if confirm_credit[0] >= 1:
+                    confirm_credit[0] -= 1
+                    return True
+            return False
+
+        def reserve(user, client) -> str:
+            if mode == "api":
+                client.force_authenticate(user)
+                response = client.post("/cart/reserve", {"promo_id": promo.pk}, format="json")
+                if response.status_code in (400, 202):  # 202: agotado, a la lista de espera
+                    return "no_stock"
+                if response.status_code in REJECTED:
+                    return REJECTED[response.status_code]
+                if response.status_code != 201:
+                    return "errors"
+                token = response.data["reservation_token"]
+            else:
+                try:
+                    token = hold_store_product_db(user, promo).token
+                except ValueError:
+                    return "no_stock"
+
+            if not should_confirm():
+                return "held"
+            if mode == "api":
+                response = client.put(
+                    "/cart/checkout", {"reservation_token": token}, format="json"
+                )
+                if response.status_code in REJECTED:
+                    return REJECTED[response.status_code]
+                return "confirmed" if response.status_code == 200 else "errors"
+            confirm_reservation(token, user)
+            return "confirmed"
+
+        def worker():
+            timer = LockWaitTimer()
+            client = APIClient(SERVER_NAME=_test_host()) if mode == "api" else None
+            try:
+                barrier.wait(timeout=60)
+                while True:
+                    try:
+                        user = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    waited_before = timer.seconds
+                    started = time.perf_counter()
+                    try:
+                        with connection.execute_wrapper(timer):
+                            outcome = reserve(user, client)
+                    except Exception:
+                        outcome = "errors"
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    with stats_lock:
+                        latencies.append(elapsed_ms)
+                        lock_wait.append((timer.seconds - waited_before) * 1000)
+                        outcomes[outcome] += 1
+            finally:
+                # Cada hilo abre su propia conexion
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+        return self._invariants(promo, options, outcomes) | {
+            "mode": mode,
+            "users": len(users),
+            "concurrency": threads_count,
+            "confirm_ratio": confirm_ratio,
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_rps": round(len(users) / wall_seconds, 1),
+            "outcomes": outcomes,
+            "latency": latency_summary(latencies),
+            "lock_wait": latency_summary(lock_wait) | {"total_ms": round(sum(lock_wait), 1)},
+        }
+
+    def _invariants(self, promo, options, outcomes):
+        initial = options["stock"]
+        stock = StoreProduct.objects.get(pk=promo.store_product_id).stock
+        reserved = Reservation.objects.filter(
+            promo=promo,
+            status__in=(ReservationStatus.HOLD, ReservationStatus.CONFIRMED),
+        ).count()
+        return {
+            "initial_stock": initial,
+            "final_stock": stock,
+            "reserved": reserved,
+            # stock + reservas vivas debe conservar el stock inicial
+            "stock_conserved": stock + reserved == initial,
+            "oversell": max(0, reserved - initial),
+            # El stock solo baja durante la corrida: un "sin stock" con stock
+            # restante al final es un usuario rechazado de mas
+            "undersell": min(outcomes["no_stock"], stock),
+        }
+
+    def _print(self, results):
+        self.stdout.write(
+            f"mode={results['mode']} users={results['users']} "
+            f"concurrency={results['concurrency']} wall={results['wall_seconds']}s "
+            f"throughput={results['throughput_rps']} req/s"
+        )
+        self.stdout.write(f"outcomes: {results['outcomes']}")
+        for name in ("latency", "lock_wait"):
+            summary = results[name]
+            self.stdout.write(
+                f"{name}: p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+                f"p99={summary['p99_ms']}ms max={summary['max_ms']}ms"
+            )
+        ok = results["stock_conserved"] and not results["oversell"] and not results["undersell"]
+        line = (
+            f"stock {results['initial_stock']} -> {results['final_stock']}, "
+            f"reserved={results['reserved']} oversell={results['oversell']} "
+            f"undersell={results['undersell']}"
+        )
+        self.stdout.write(self.style.SUCCESS(line) if ok else self.style.ERROR(line))
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import psycopg
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from psycopg_pool import ConnectionPool
+
+from ._bench import latency_summary, save_results
+
+QUERY = "SELECT 1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the per-request cost of the database connection: a new "
+        "connection per request vs a psycopg_pool pool vs the Django "
+        "connection as configured (DB_POOL_ENABLED / CONN_MAX_AGE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2_000)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--modes", nargs="+", choices=("direct", "pool", "django"),
+            default=["direct", "pool", "django"],
+        )
+        parser.add_argument("--label", default="")
+        parser.add_argument("--output-dir")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        # Mismos parametros que usa Django, sin sus adaptadores propios
+        params = connection.get_connection_params()
+        params.pop("cursor_factory", None)
+        params.pop("context", None)
+
+        results = {
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "django_pool_enabled": bool(connection.settings_dict["OPTIONS"].get("pool")),
+            "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+        }
+        for mode in options["modes"]:
+            results[mode] = self._run(mode, params, options["requests"], options["concurrency"])
+            summary = results[mode]
+            self.stdout.write(
+                f"{mode:>6}: {summary['throughput_rps']:>8} req/s "
+                f"p50={summary['latency']['p50_ms']}ms p95={summary['latency']['p95_ms']}ms "
+                f"p99={summary['latency']['p99_ms']}ms"
+            )
+
+        path = save_results("bench_connections", results, options["output_dir"], options["label"])
+        self.stdout.write(f"results: {path}")
+
+    def _run(self, mode, params, total, concurrency):
+        pool = None
+        if mode == "pool":
+            pool = ConnectionPool(
+                kwargs=params, min_size=concurrency, max_size=concurrency, open=True,
+                check=ConnectionPool.check_connection,
+            )
+            pool.wait()
+
+        # Una "request" = obtener conexion + una query + devolverla
+        def direct_request():
+            with psycopg.connect(**params) as conn:
+                conn.execute(QUERY).fetchone()
+
+        def pool_request():
+            with pool.connection() as conn:
+                conn.execute(QUERY).fetchone()
+
+        def django_request():
+            with connection.cursor() as cursor:
+                cursor.execute(QUERY)
+                cursor.fetchone()
+            # Igual que request_finished: cierra o devuelve al pool segun la configuracion
+            connection.close_if_unusable_or_obsolete()
+            if not connection.settings_dict.get("CONN_MAX_AGE"):
+                connection.close()
+
+        request = {"direct": direct_request, "pool": pool_request, "django": django_request}[mode]
+        latencies = []
+        lock = threading.Lock()
+        remaining = [total]
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if remaining[0] == 0:
+                            return
+                        remaining[0] -= 1
+                    started = time.perf_counter()
+                    request()
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed_ms)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+        if pool is not None:
+            pool.close()
+
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_rps": round(len(latencies) / wall_seconds, 1),
+            "latency": latency_summary(latencies),
+        }
@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from flash_promo.bulk import write_notification_logs
+from flash_promo.models import FlashPromo, NotificationLog
+from flash_promo.tasks import BATCH_SIZE
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares NotificationLog write throughput (rows/sec) between "
+        "bulk_create(ignore_conflicts=True) and the COPY bulk writer. "
+        "Everything runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--promo", type=int, help="FlashPromo id (default: first promo)")
+
+    def handle(self, *args, **options):
+        promo = (
+            FlashPromo.objects.filter(pk=options["promo"]).first()
+            if options["promo"] else FlashPromo.objects.order_by("id").first()
+        )
+        if promo is None:
+            raise CommandError("There is no FlashPromo to benchmark against.")
+
+        try:
+            with transaction.atomic():
+                self._run(promo, options["users"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, promo, total_users):
+        prefix = f"bench_nl_{int(time.time())}"
+        User.objects.bulk_create(
+            [User(username=f"{prefix}_{i}") for i in range(total_users)],
+            batch_size=5000,
+        )
+        user_ids = list(
+            User.objects.filter(username__startswith=prefix).values_list("id", flat=True)
+        )
+        batches = [user_ids[i:i + BATCH_SIZE] for i in range(0, len(user_ids), BATCH_SIZE)]
+
+        # bulk_create path (NOTIFICATION_LOG_COPY_ENABLED=False), one INSERT per batch
+        sent_date = timezone.localdate() - timedelta(days=1)
+        started = time.perf_counter()
+        for batch in batches:
+            NotificationLog.objects.bulk_create(
+                [NotificationLog(user_id=uid, promo_id=promo.id, sent_date=sent_date)
+                 for uid in batch],
+                ignore_conflicts=True,
+            )
+        orm_seconds = time.perf_counter() - started
+
+        # COPY path (current send_push_batch), one COPY + merge per batch
+        started = time.perf_counter()
+        for batch in batches:
+            write_notification_logs(promo.id, batch)
+        copy_seconds = time.perf_counter() - started
+
+        rows = len(user_ids)
+        self.stdout.write(f"rows={rows} batches={len(batches)} batch_size={BATCH_SIZE}")
+        self.stdout.write(f"bulk_create: {orm_seconds:.3f}s {rows / orm_seconds:,.0f} rows/sec")
+        self.stdout.write(f"copy:        {copy_seconds:.3f}s {rows / copy_seconds:,.0f} rows/sec")
+        self.stdout.write(self.style.SUCCESS(f"speedup: x{orm_seconds / copy_seconds:.2f}"))
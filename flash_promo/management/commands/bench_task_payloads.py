@@ -0,0 +1,111 @@
+import random
+import time
+import uuid
+
+import redis
+from celery import current_app
+from django.core.management.base import BaseCommand, CommandError
+
+from flash_promo.codecs import pack_ids, unpack_ids
+from flash_promo.models import FlashPromo
+from flash_promo.services import profiles_to_notify_for_promo
+from flash_promo.tasks import BATCH_SIZE, send_push_batch
+
+from ._bench import save_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Broker bytes per notified user of the send_push_batch fan-out, JSON id "
+        "lists vs packed ids: publishes the batches to a private queue of the "
+        "(Redis) broker, measures the stored messages and deletes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--promo-id", type=int, help="Real audience of this promo.")
+        parser.add_argument("--users", type=int, default=100_000, help="Synthetic audience size.")
+        # Audiencia sintetica: ids crecientes con huecos aleatorios de hasta --max-gap
+        parser.add_argument("--max-gap", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--label", default="")
+        parser.add_argument("--output-dir")
+
+    def handle(self, *args, **options):
+        broker_url = current_app.conf.broker_url or ""
+        if not broker_url.startswith(("redis://", "rediss://")):
+            raise CommandError("Only the Redis broker is supported (CELERY_BROKER_URL).")
+
+        user_ids = self._audience(options)
+        if not user_ids:
+            raise CommandError("Empty audience.")
+        batches = [user_ids[i:i + BATCH_SIZE] for i in range(0, len(user_ids), BATCH_SIZE)]
+
+        broker = redis.Redis.from_url(broker_url)
+        results = {
+            "users": len(user_ids),
+            "batches": len(batches),
+            "source": f"promo {options['promo_id']}" if options["promo_id"] else "synthetic",
+            "task_ignore_result": current_app.conf.task_ignore_result,
+        }
+        for mode in ("json", "packed"):
+            results[mode] = self._measure(broker, mode, batches, len(user_ids))
+            summary = results[mode]
+            self.stdout.write(
+                f"{mode:>6}: {summary['broker_bytes']} bytes "
+                f"({summary['bytes_per_user']} B/user, {summary['bytes_per_message']} B/message) "
+                f"encode={summary['encode_ms']}ms decode={summary['decode_ms']}ms"
+            )
+
+        saved = 1 - results["packed"]["broker_bytes"] / results["json"]["broker_bytes"]
+        results["saved_ratio"] = round(saved, 3)
+        self.stdout.write(f"packed saves {saved:.1%} of the broker bytes")
+
+        path = save_results("bench_task_payloads", results, options["output_dir"], options["label"])
+        self.stdout.write(f"results: {path}")
+
+    def _audience(self, options) -> list[int]:
+        if options["promo_id"]:
+            promo = FlashPromo.objects.get(pk=options["promo_id"])
+            return list(profiles_to_notify_for_promo(promo).values_list("user_id", flat=True))
+
+        rng = random.Random(options["seed"])
+        user_ids, current = [], 0
+        for _ in range(options["users"]):
+            current += rng.randint(1, options["max_gap"])
+            user_ids.append(current)
+        return user_ids
+
+    def _measure(self, broker, mode: str, batches, users: int) -> dict:
+        queue = f"bench-payloads-{uuid.uuid4().hex}"
+
+        started = time.perf_counter()
+        payloads = [pack_ids(batch) for batch in batches] if mode == "packed" else batches
+        encode_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        if mode == "packed":
+            for payload in payloads:
+                unpack_ids(payload)
+        decode_ms = (time.perf_counter() - started) * 1000
+
+        with current_app.producer_or_acquire() as producer:
+            for payload in payloads:
+                send_push_batch.apply_async((0, payload), queue=queue, producer=producer)
+
+        # Mensajes tal como quedan en el broker (cuerpo + headers + envelope del transporte)
+        messages = broker.lrange(queue, 0, -1)
+        broker_bytes = sum(len(message) for message in messages)
+        broker.delete(queue, f"_kombu.binding.{queue}")
+        if len(messages) != len(payloads):
+            raise CommandError(
+                f"expected {len(payloads)} messages in {queue}, found {len(messages)} "
+                "(is a worker consuming every queue?)"
+            )
+
+        return {
+            "broker_bytes": broker_bytes,
+            "bytes_per_user": round(broker_bytes / users, 2),
+            "bytes_per_message": round(broker_bytes / len(messages)),
+            "encode_ms": round(encode_ms, 2),
+            "decode_ms": round(decode_ms, 2),
+        }
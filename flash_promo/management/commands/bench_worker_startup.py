@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from celery import shared_task
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from ._bench import latency_summary, save_results
+
+
+@shared_task
+def ping(token: str):
+    # Fuera de flash_promo.tasks: solo la registra el worker que arranca este bench (--include)
+    cache.set(f"flash_promo:ping:{token}", time.time(), timeout=300)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time-to-first-task of a cold Celery worker: queues a ping on a private "
+        "queue, starts a worker consuming only that queue and measures until the "
+        "ping runs. Compares settings profiles (app.settings vs app.settings_worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-modules", nargs="+", default=["app.settings", "app.settings_worker"]
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--pool", default="prefork")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--timeout", type=float, default=60.0)
+        # Mingle / gossip agregan una espera al arrancar; se puede medir con y sin
+        parser.add_argument("--with-mingle", action="store_true")
+        parser.add_argument("--label", default="")
+        parser.add_argument("--output-dir")
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be positive.")
+
+        results = {
+            "pool": options["pool"],
+            "concurrency": options["concurrency"],
+            "mingle_gossip": options["with_mingle"],
+        }
+        for settings_module in options["settings_modules"]:
+            timings = [self._run(settings_module, options) for _ in range(options["runs"])]
+            results[settings_module] = latency_summary(timings)
+            summary = results[settings_module]
+            self.stdout.write(
+                f"{settings_module}: p50={summary['p50_ms']}ms max={summary['max_ms']}ms "
+                f"({options['runs']} cold starts)"
+            )
+
+        path = save_results("bench_worker_startup", results, options["output_dir"], options["label"])
+        self.stdout.write(f"results: {path}")
+
+    def _run(self, settings_module: str, options) -> float:
+        token = uuid.uuid4().hex
+        queue = f"bench-startup-{token}"
+        # Encolada antes de arrancar: mide arranque + primera tarea, no la publicacion
+        ping.apply_async(args=[token], queue=queue)
+
+        command = [
+            sys.executable, "-m", "celery", "-A", "app", "worker",
+            "-Q", queue, "--include", __name__, "--pool", options["pool"],
+            "--concurrency", str(options["concurrency"]),
+            "--hostname", f"bench-{token[:8]}@%h", "-l", "WARNING",
+        ]
+        if not options["with_mingle"]:
+            command += ["--without-mingle", "--without-gossip"]
+
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+        # stderr a un archivo: un pipe sin leer puede bloquear al worker
+        with tempfile.TemporaryFile() as log:
+            started_wall = time.time()
+            worker = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=log)
+            try:
+                while time.time() - started_wall < options["timeout"]:
+                    ran_at = cache.get(f"flash_promo:ping:{token}")
+                    if ran_at is not None:
+                        return (ran_at - started_wall) * 1000
+                    if worker.poll() is not None:
+                        log.seek(0)
+                        raise CommandError(
+                            f"worker exited with {worker.returncode}:\n{log.read().decode()[-2000:]}"
+                        )
+                    time.sleep(0.01)
+                raise CommandError(f"ping not executed after {options['timeout']}s")
+            finally:
+                worker.terminate()
+                try:
+                    worker.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    worker.kill()
+                    worker.wait()
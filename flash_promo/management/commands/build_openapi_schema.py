@@ -0,0 +1,32 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from flash_promo.schema import generate_schema, render_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the OpenAPI schema once and writes it to OPENAPI_SCHEMA_PATH, "
+        "the artifact served from memory by /api/schema/ (run on docker build)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Defaults to OPENAPI_SCHEMA_PATH.")
+
+    def handle(self, *args, **options):
+        path = Path(options["output"] or settings.OPENAPI_SCHEMA_PATH)
+        started = time.perf_counter()
+        content = render_json(generate_schema())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atomica: un proceso que arranca nunca lee un archivo a medias
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"schema written to {path} ({len(content)} bytes, generated in {elapsed_ms:.0f} ms)"
+        ))
@@ -0,0 +1,290 @@
+import random
+import time as clock
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from flash_promo.bulk import copy_rows
+from flash_promo.constants import HOLD_DURATION, FlashPromoStatus, ReservationStatus
+from flash_promo.models import (
+    FlashPromo, NotificationLog, Product, Profile, Reservation, Store, StoreProduct
+)
+from flash_promo.partitions import ensure_partitions
+
+# (ciudad, lat, lon, peso ~ poblacion en millones, dispersion en grados)
+CITIES = (
+    ("Bogota", 4.7110, -74.0721, 7.9, 0.08),
+    ("Medellin", 6.2442, -75.5812, 2.6, 0.06),
+    ("Cali", 3.4516, -76.5320, 2.3, 0.06),
+    ("Barranquilla", 10.9639, -74.7964, 1.3, 0.05),
+    ("Cartagena", 10.3910, -75.4794, 1.0, 0.05),
+    ("Bucaramanga", 7.1193, -73.1227, 0.6, 0.04),
+)
+CATEGORIES = ("Bebidas", "Snacks", "Lacteos", "Aseo", "Panaderia", "Congelados", "Licores")
+BRANDS = ("AquaBrand", "Andina", "Costena", "Del Valle", "Paisa", "Caribe", "Sabana")
+
+PREFIX = "gen"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic city-scale dataset (profiles clustered around "
+        "Colombian cities, stores, store products, promos and NotificationLog / "
+        "Reservation history) loaded with COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=1_000_000)
+        parser.add_argument("--stores", type=int, default=2_000)
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--products-per-store", type=int, default=20)
+        parser.add_argument("--promos", type=int, default=5_000)
+        parser.add_argument("--history-days", type=int, default=14)
+        parser.add_argument("--notifications-per-day", type=int, default=100_000)
+        parser.add_argument("--reservations-per-day", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        for name in ("profiles", "stores", "products", "products_per_store"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+        if User.objects.filter(username__startswith=f"{PREFIX}{options['seed']}_").exists():
+            raise CommandError(f"A dataset with seed {options['seed']} already exists.")
+
+        self.rng = random.Random(options["seed"])
+        self.seed = options["seed"]
+        self.now = timezone.now()
+        self.cum_weights = []
+        total = 0.0
+        for city in CITIES:
+            total += city[3]
+            self.cum_weights.append(total)
+
+        started = clock.perf_counter()
+        user_ids = self._users_and_profiles(options["profiles"])
+        store_ids = self._stores(options["stores"])
+        product_ids = self._products(options["products"])
+        store_products = self._store_products(store_ids, product_ids, options["products_per_store"])
+        past_promos = self._promos(store_products, options["promos"], options["history_days"])
+        if options["history_days"] > 0 and past_promos:
+            self._history(user_ids, past_promos, options)
+        self.stdout.write(self.style.SUCCESS(
+            f"dataset seed={self.seed} generated in {clock.perf_counter() - started:.1f}s"
+        ))
+
+    # ---- helpers ----
+
+    def _point(self, spread: float = 1.0) -> str:
+        _name, lat, lon, _weight, sigma = self.rng.choices(
+            CITIES, cum_weights=self.cum_weights
+        )[0]
+        lat = self.rng.gauss(lat, sigma * spread)
+        lon = self.rng.gauss(lon, sigma * spread)
+        return f"SRID=4326;POINT({lon:.6f} {lat:.6f})"
+
+    def _load(self, model, columns, rows_factory, explicit_ids=True) -> range | int:
+        """COPY the rows of rows_factory(first_id) and, with explicit
+        ids, move the id sequence past them in the same transaction"""
+
+        table = model._meta.db_table
+        started = clock.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(MAX(id), 0) + 1 FROM {connection.ops.quote_name(table)}"
+            )
+            first_id = cursor.fetchone()[0]
+            counter = {"rows": 0}
+
+            def counted(rows):
+                for row in rows:
+                    counter["rows"] += 1
+                    yield row
+
+            copy_rows(cursor, table, columns, counted(rows_factory(first_id)))
+            if explicit_ids:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                    cursor.execute(sql)
+
+        rows = counter["rows"]
+        self.stdout.write(
+            f"{table}: {rows:,} rows in {clock.perf_counter() - started:.1f}s"
+        )
+        return range(first_id, first_id + rows) if explicit_ids else rows
+
+    # ---- catalog and audience ----
+
+    def _users_and_profiles(self, total: int) -> range:
+        def users(first_id):
+            for i in range(total):
+                yield (
+                    first_id + i, "!", False, f"{PREFIX}{self.seed}_{i}", "", "", "",
+                    False, True, self.now,
+                )
+
+        user_ids = self._load(
+            User,
+            ["id", "password", "is_superuser", "username", "first_name", "last_name",
+             "email", "is_staff", "is_active", "date_joined"],
+            users,
+        )
+
+        def profiles(first_id):
+            for i, user_id in enumerate(user_ids):
+                # ~10% nuevos, ~25% frecuentes: el resto no es elegible
+                behavior = self.rng.random()
+                yield (
+                    first_id + i, user_id, self._point(), behavior < 0.10, 0.10 <= behavior < 0.35
+                )
+
+        self._load(Profile, ["id", "user_id", "geom", "is_new_user", "is_frequent"], profiles)
+        return user_ids
+
+    def _stores(self, total: int) -> range:
+        def stores(first_id):
+            for i in range(total):
+                yield first_id + i, f"Tienda {PREFIX}{self.seed}-{i}", self._point(spread=0.8)
+
+        return self._load(Store, ["id", "name", "geom"], stores)
+
+    def _products(self, total: int) -> range:
+        def products(first_id):
+            for i in range(total):
+                category = self.rng.choice(CATEGORIES)
+                yield (
+                    first_id + i, f"{category} {i}", f"GEN{self.seed}-{i:07d}",
+                    self.rng.choice(BRANDS), category,
+                )
+
+        return self._load(Product, ["id", "name", "sku", "brand", "category"], products)
+
+    def _store_products(self, store_ids: range, product_ids: range, per_store: int) -> list:
+        per_store = min(per_store, len(product_ids))
+        base_prices = []
+
+        def store_products(first_id):
+            next_id = first_id
+            for store_id in store_ids:
+                for product_id in self.rng.sample(product_ids, per_store):
+                    base_price = Decimal(self.rng.randrange(1_000, 50_000)) / 100
+                    base_prices.append((next_id, base_price))
+                    yield next_id, store_id, product_id, self.rng.randrange(0, 500), base_price
+                    next_id += 1
+
+        self._load(
+            StoreProduct, ["id", "store_id", "product_id", "stock", "base_price"], store_products
+        )
+        return base_prices
+
+    def _promos(self, store_products: list, total: int, history_days: int) -> list:
+        """~20% active, ~50% scheduled and ~30% finished inside the
+        history window. Return (promo_id, store_product_id) of the
+        promos that already started"""
+
+        chosen = self.rng.sample(store_products, min(total, len(store_products)))
+        started_promos = []
+
+        def promos(first_id):
+            for i, (store_product_id, base_price) in enumerate(chosen):
+                promo_id = first_id + i
+                promo_price = (base_price * Decimal(self.rng.randrange(40, 90)) / 100).quantize(
+                    Decimal("0.01")
+                )
+                kind = self.rng.random()
+                if kind < 0.20:
+                    starts_at = self.now - timedelta(minutes=self.rng.randrange(1, 30))
+                    ends_at = self.now + timedelta(minutes=self.rng.randrange(30, 180))
+                    status = FlashPromoStatus.ACTIVE
+                    activated_at = starts_at + timedelta(seconds=1)
+                elif kind < 0.70 or history_days < 1:
+                    starts_at = self.now + timedelta(minutes=self.rng.randrange(5, 72 * 60))
+                    ends_at = starts_at + timedelta(minutes=self.rng.randrange(30, 180))
+                    status, activated_at = FlashPromoStatus.SCHEDULED, None
+                else:
+                    ago = self.rng.randrange(240, history_days * 1440)
+                    starts_at = self.now - timedelta(minutes=ago)
+                    ends_at = starts_at + timedelta(minutes=self.rng.randrange(30, 180))
+                    status = FlashPromoStatus.FINISHED
+                    activated_at = starts_at + timedelta(seconds=1)
+                if status != FlashPromoStatus.SCHEDULED:
+                    started_promos.append((promo_id, store_product_id))
+                yield (
+                    promo_id, store_product_id, promo_price, starts_at, ends_at, status, activated_at
+                )
+
+        self._load(
+            FlashPromo,
+            ["id", "store_product_id", "promo_price", "starts_at", "ends_at", "status",
+             "activated_at"],
+            promos,
+        )
+        return started_promos
+
+    # ---- history (partitioned tables) ----
+
+    def _history(self, user_ids: range, promos: list, options):
+        today = timezone.localdate()
+        retention = min(settings.NOTIFICATION_LOG_RETENTION_DAYS, settings.RESERVATION_RETENTION_DAYS)
+        if options["history_days"] > retention:
+            self.stderr.write(
+                f"--history-days is above the retention ({retention} days): "
+                "maintain_partitioned_tables will detach the oldest days."
+            )
+        days = [today - timedelta(days=n) for n in range(options["history_days"], 0, -1)]
+        # Un dia de margen a cada lado: las particiones de Reservation van por dia UTC
+        for parent in (NotificationLog._meta.db_table, Reservation._meta.db_table):
+            ensure_partitions(parent, days[0] - timedelta(days=1), today)
+
+        per_day = min(options["notifications_per_day"], len(user_ids) * len(promos))
+
+        def notifications(_first_id):
+            for day in days:
+                day_start = timezone.make_aware(datetime.combine(day, time.min))
+                seen = set()
+                # (user, promo, sent_date) es unico: se descartan las repeticiones
+                while len(seen) < per_day:
+                    user_id = self.rng.choice(user_ids)
+                    promo_id = self.rng.choice(promos)[0]
+                    if (user_id, promo_id) in seen:
+                        continue
+                    seen.add((user_id, promo_id))
+                    yield (
+                        user_id, promo_id, day,
+                        day_start + timedelta(seconds=self.rng.randrange(86_400)),
+                    )
+
+        self._load(
+            NotificationLog, ["user_id", "promo_id", "sent_date", "sent_at"],
+            notifications, explicit_ids=False,
+        )
+
+        statuses = (
+            ReservationStatus.CONFIRMED, ReservationStatus.EXPIRED, ReservationStatus.CANCELED
+        )
+
+        def reservations(_first_id):
+            for day in days:
+                day_start = timezone.make_aware(datetime.combine(day, time.min))
+                for _ in range(options["reservations_per_day"]):
+                    promo_id, store_product_id = self.rng.choice(promos)
+                    created_at = day_start + timedelta(seconds=self.rng.randrange(86_400))
+                    # Sin HOLDs: el historico no debe retener stock
+                    yield (
+                        promo_id, store_product_id, self.rng.choice(user_ids),
+                        self.rng.choices(statuses, weights=(4, 5, 1))[0],
+                        uuid.UUID(int=self.rng.getrandbits(128)).hex,
+                        created_at + HOLD_DURATION, created_at,
+                    )
+
+        self._load(
+            Reservation,
+            ["promo_id", "store_product_id", "user_id", "status", "token", "expires_at",
+             "created_at"],
+            reservations, explicit_ids=False,
+        )
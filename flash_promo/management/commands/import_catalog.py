@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from flash_promo.catalog import FORMATS, guess_format, import_products, import_store_products
+
+IMPORTERS = {
+    "products": import_products,
+    "store-products": import_store_products,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a CSV/NDJSON file into Product or StoreProduct "
+        "(COPY + ON CONFLICT upsert, set-based FK validation)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--max-errors", type=int)
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or guess_format(options["path"])
+        started = time.perf_counter()
+        with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+            report = IMPORTERS[options["kind"]](
+                stream, fmt,
+                batch_size=options["batch_size"],
+                max_errors=options["max_errors"],
+            )
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(
+            f"processed={report.processed} upserted={report.upserted} "
+            f"failed={report.failed} in {elapsed:.1f}s "
+            f"({report.processed / max(elapsed, 1e-9):,.0f} rows/sec)"
+        )
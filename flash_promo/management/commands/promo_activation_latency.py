@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flash_promo.models import FlashPromo
+
+from ._bench import percentile
+
+
+class Command(BaseCommand):
+    help = "Reports the activation latency (activated_at - starts_at) of recent promos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        rows = (
+            FlashPromo.objects
+            .filter(activated_at__isnull=False, starts_at__gte=since)
+            .values_list("starts_at", "activated_at")
+        )
+        latencies = sorted(
+            (activated_at - starts_at).total_seconds() * 1000 for starts_at, activated_at in rows
+        )
+        if not latencies:
+            self.stdout.write("No promos activated in the period.")
+            return
+
+        self.stdout.write(f"promos={len(latencies)} last {options['hours']}h")
+        for pct in (50, 95, 99):
+            self.stdout.write(f"p{pct}: {percentile(latencies, pct):.0f} ms")
+        self.stdout.write(f"max: {latencies[-1]:.0f} ms")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from flash_promo.reconciliation import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the stock of every store product against its reservations "
+        "(incrementally, from the StockAudit baselines) and reports the drift; "
+        "with --repair sets the drifted stock to the expected value."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true")
+
+    def handle(self, *args, **options):
+        report = reconcile_stock(repair=options["repair"])
+        self.stdout.write(
+            f"watermark={report.watermark.isoformat()} audited={report.audited} "
+            f"new_baselines={report.created} repaired={report.repaired}"
+        )
+        for store_product_id, drift in sorted(report.drifted.items()):
+            self.stdout.write(self.style.WARNING(
+                f"store_product_id={store_product_id} drift={drift:+d}"
+            ))
+        if not report.drifted:
+            self.stdout.write(self.style.SUCCESS("no drift"))
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from flash_promo.routers import (
+    REPLICA_DB_ALIAS,
+    replica_alias,
+    replica_configured,
+    replica_lag_seconds,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows the replica state (recovery, lag, routing decision) and, with "
+        "--probe, measures how long a primary WAL position takes to be replayed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--probe", action="store_true")
+        parser.add_argument("--timeout", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("No replica configured (set POSTGRES_REPLICA_HOST).")
+
+        for alias in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS):
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT pg_is_in_recovery()")
+                in_recovery = cursor.fetchone()[0]
+            self.stdout.write(f"{alias}: in_recovery={in_recovery}")
+
+        lag = replica_lag_seconds(force=True)
+        self.stdout.write(
+            f"lag={lag if lag is None else round(lag, 3)}s "
+            f"max={settings.REPLICA_MAX_LAG_SECONDS}s -> reads go to '{replica_alias()}'"
+        )
+        if options["probe"]:
+            self._probe(options["timeout"])
+
+    def _probe(self, timeout: float):
+        # Fuerza un registro WAL en el primario y espera a que la replica lo reproduzca
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            # Transaccional: el COMMIT (autocommit) hace flush del WAL
+            cursor.execute("SELECT pg_logical_emit_message(true, 'flash_promo', 'probe')")
+            target = cursor.fetchone()[0]
+
+        started = time.perf_counter()
+        with connections[REPLICA_DB_ALIAS].cursor() as cursor:
+            while time.perf_counter() - started < timeout:
+                cursor.execute(
+                    "SELECT pg_wal_lsn_diff(pg_last_wal_replay_lsn(), %s) >= 0", [target]
+                )
+                if cursor.fetchone()[0]:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    self.stdout.write(self.style.SUCCESS(
+                        f"probe {target} replayed in {elapsed_ms:.1f} ms"
+                    ))
+                    return
+                time.sleep(0.005)
+        raise CommandError(f"probe {target} not replayed after {timeout}s")
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ._bench import save_results
+
+# settings + modulos que importa cada proceso al arrancar
+PROFILES = {
+    "api": ("app.settings", ["app.wsgi", "app.urls"]),
+    "worker": ("app.settings_worker", ["app.celery", "flash_promo.tasks"]),
+    # El worker con los settings completos, para comparar
+    "worker-full": ("app.settings", ["app.celery", "flash_promo.tasks"]),
+}
+
+STARTUP_CODE = """
+import importlib, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+print(f"{(time.perf_counter() - started) * 1000:.1f}")
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) from the -X importtime report"""
+
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import-time report of the API / worker startup: runs django.setup() plus "
+        "the startup modules of each profile in a fresh interpreter with -X importtime "
+        "and aggregates the time per top-level package."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES)
+        )
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--label", default="")
+        parser.add_argument("--output-dir")
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be positive.")
+
+        results = {}
+        for profile in options["profiles"]:
+            results[profile] = self._profile(profile, options["runs"], options["top"])
+            summary = results[profile]
+            self.stdout.write(
+                f"\n{profile} ({summary['settings']}): "
+                f"best {summary['best_ms']} ms, {summary['modules']} modules"
+            )
+            for package, self_ms in summary["packages"].items():
+                self.stdout.write(f"  {package:<32} {self_ms:>8.1f} ms")
+
+        path = save_results("startup_profile", results, options["output_dir"], options["label"])
+        self.stdout.write(f"\nresults: {path}")
+
+    def _profile(self, profile: str, runs: int, top: int) -> dict:
+        settings_module, modules = PROFILES[profile]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+        timings, report = [], []
+        # Varias corridas: la primera paga el cache de disco; se reporta la mejor
+        for _ in range(runs):
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", STARTUP_CODE, *modules],
+                capture_output=True, text=True, env=env,
+            )
+            if process.returncode != 0:
+                raise CommandError(f"{profile} failed to start:\n{process.stderr[-2000:]}")
+            elapsed_ms = float(process.stdout.strip().splitlines()[-1])
+            if not timings or elapsed_ms < min(timings):
+                report = parse_importtime(process.stderr)
+            timings.append(elapsed_ms)
+
+        by_package = defaultdict(int)
+        for module, self_us, _ in report:
+            by_package[module.split(".")[0]] += self_us
+        packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        slowest = sorted(report, key=lambda row: row[2], reverse=True)[:top]
+
+        return {
+            "settings": settings_module,
+            "modules_imported": modules,
+            "runs_ms": timings,
+            "best_ms": min(timings),
+            "modules": len(report),
+            "packages": {package: round(us / 1000, 1) for package, us in packages},
+            "slowest_cumulative": {module: round(cum / 1000, 1) for module, _, cum in slowest},
+        }
@@ -0,0 +1,205 @@
+import os
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+class _NoopMetric:
+    """Stands in for every metric when METRICS_ENABLED is False:
+    each call is a no-op so the hot paths pay almost nothing"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, amount):
+        pass
+
+    def time(self):
+        return nullcontext()
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 5000, 10_000, 50_000, 100_000, 500_000)
+
+
+def _multiprocess_dir() -> str | None:
+    # Con gunicorn / celery prefork cada proceso escribe sus metricas en este directorio
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+if settings.METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    HOLD_SECONDS = Histogram(
+        "flash_promo_hold_seconds",
+        "Duration of hold_store_product_db (lock + stock update + reservation).",
+        buckets=LATENCY_BUCKETS,
+    )
+    STOCK_LOCK_WAIT_SECONDS = Histogram(
+        "flash_promo_stock_lock_wait_seconds",
+        "Time spent in SELECT ... FOR UPDATE on StoreProduct.",
+        ["operation"],
+        buckets=LATENCY_BUCKETS,
+    )
+    # Sin label por store product: una serie por producto (x procesos) no escala
+    SOLD_OUT = Counter(
+        "flash_promo_sold_out_total",
+        "Holds that took the last unit of a store product.",
+    )
+    SOLD_OUT_PRODUCTS = Gauge(
+        "flash_promo_sold_out_products",
+        "Store products with stock 0 (last reconciliation).",
+        multiprocess_mode="mostrecent",
+    )
+    RESERVATIONS = Counter(
+        "flash_promo_reservations_total",
+        "Reservation outcomes (held, confirmed, expired, no_stock).",
+        ["outcome"],
+    )
+    GEO_QUERY_SECONDS = Histogram(
+        "flash_promo_geo_query_seconds",
+        "Duration of the geospatial eligibility / audience queries.",
+        ["query"],
+        buckets=LATENCY_BUCKETS,
+    )
+    NOTIFY_AUDIENCE = Histogram(
+        "flash_promo_notify_audience_size",
+        "Users to notify per notify_promo run.",
+        buckets=SIZE_BUCKETS,
+    )
+    NOTIFY_BATCH_SIZE = Histogram(
+        "flash_promo_notify_batch_size",
+        "User ids per send_push_batch task.",
+        buckets=SIZE_BUCKETS,
+    )
+    PUSH_SENT = Counter(
+        "flash_promo_push_sent_total",
+        "Notifications processed by send_push_batch.",
+    )
+    PUSH_BATCH_SECONDS = Histogram(
+        "flash_promo_push_batch_seconds",
+        "Duration of send_push_batch.",
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_DB_QUERIES = Histogram(
+        "flash_promo_request_db_queries",
+        "Queries per request.",
+        ["endpoint"],
+        buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    )
+    REQUEST_DB_SECONDS = Histogram(
+        "flash_promo_request_db_seconds",
+        "Database time per request.",
+        ["endpoint"],
+        buckets=LATENCY_BUCKETS,
+    )
+    QUERY_BUDGET_EXCEEDED = Counter(
+        "flash_promo_query_budget_exceeded_total",
+        "Requests that ran more queries than the query_budget of their view.",
+        ["endpoint"],
+    )
+    THROTTLED = Counter(
+        "flash_promo_throttled_total",
+        "Cart requests rejected by the rate limits.",
+        ["endpoint", "scope"],
+    )
+    BULKHEAD_IN_FLIGHT = Gauge(
+        "flash_promo_bulkhead_in_flight",
+        "Requests being served per bulkhead compartment.",
+        ["compartment"],
+        multiprocess_mode="livesum",
+    )
+    BULKHEAD_WAIT_SECONDS = Histogram(
+        "flash_promo_bulkhead_wait_seconds",
+        "Time waiting for a slot of the compartment.",
+        ["compartment"],
+        buckets=LATENCY_BUCKETS,
+    )
+    BULKHEAD_REJECTED = Counter(
+        "flash_promo_bulkhead_rejected_total",
+        "Requests shed with 503 (reason: full, queue_time).",
+        ["compartment", "reason"],
+    )
+    STOCK_DRIFT_PRODUCTS = Gauge(
+        "flash_promo_stock_drift_products",
+        "Store products whose stock does not match their reservations (last reconciliation).",
+        multiprocess_mode="mostrecent",
+    )
+    STOCK_DRIFT_UNITS = Gauge(
+        "flash_promo_stock_drift_units",
+        "Sum of |stock - expected stock| over the drifted store products.",
+        multiprocess_mode="mostrecent",
+    )
+    STOCK_REPAIRED = Counter(
+        "flash_promo_stock_repaired_total",
+        "Store products whose stock was repaired by the reconciliation.",
+    )
+    RECONCILE_SECONDS = Histogram(
+        "flash_promo_stock_reconcile_seconds",
+        "Duration of a stock reconciliation run.",
+        buckets=LATENCY_BUCKETS,
+    )
+    WAITLIST = Counter(
+        "flash_promo_waitlist_total",
+        "Waitlist events (joined, handed_off).",
+        ["event"],
+    )
+else:
+    HOLD_SECONDS = STOCK_LOCK_WAIT_SECONDS = SOLD_OUT = SOLD_OUT_PRODUCTS = _NoopMetric()
+    RESERVATIONS = _NoopMetric()
+    GEO_QUERY_SECONDS = NOTIFY_AUDIENCE = NOTIFY_BATCH_SIZE = _NoopMetric()
+    PUSH_SENT = PUSH_BATCH_SECONDS = REQUEST_DB_QUERIES = REQUEST_DB_SECONDS = _NoopMetric()
+    QUERY_BUDGET_EXCEEDED = _NoopMetric()
+    THROTTLED = BULKHEAD_IN_FLIGHT = BULKHEAD_WAIT_SECONDS = BULKHEAD_REJECTED = _NoopMetric()
+    STOCK_DRIFT_PRODUCTS = STOCK_DRIFT_UNITS = STOCK_REPAIRED = RECONCILE_SECONDS = _NoopMetric()
+    WAITLIST = _NoopMetric()
+
+
+def _registry():
+    from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+    if not _multiprocess_dir():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Prometheus text endpoint of the API"""
+
+    if not settings.METRICS_ENABLED:
+        return HttpResponse("Metrics are disabled.\n", status=404, content_type="text/plain")
+
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def start_worker_exporter():
+    """Serves the worker metrics on METRICS_WORKER_PORT.
+    Runs in the main worker process: with prefork the children
+    record into PROMETHEUS_MULTIPROC_DIR and this process aggregates"""
+
+    if not settings.METRICS_ENABLED:
+        return
+    from prometheus_client import start_http_server
+
+    start_http_server(settings.METRICS_WORKER_PORT, registry=_registry())
+
+
+def mark_process_dead(pid: int):
+    if settings.METRICS_ENABLED and _multiprocess_dir():
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
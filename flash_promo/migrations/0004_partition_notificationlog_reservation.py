@@ -0,0 +1,254 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Congelado al escribir la migracion (settings.PARTITION_PREMAKE_DAYS); el
+# mantenimiento crea las siguientes con flash_promo.partitions
+PREMAKE_DAYS = 7
+
+
+# Postgres requiere que la llave de particion haga parte de PK/UNIQUE:
+#   NotificationLog -> PK (id, sent_date), UNIQUE (user, promo, sent_date)
+#   Reservation     -> PK (id, created_at), UNIQUE (token, created_at)
+
+NOTIFICATION_LOG_CREATE = """
+ALTER TABLE flash_promo_notificationlog RENAME TO flash_promo_notificationlog_legacy;
+CREATE TABLE flash_promo_notificationlog (
+    id bigint NOT NULL,
+    sent_at timestamp with time zone NOT NULL,
+    sent_date date NOT NULL,
+    promo_id bigint NOT NULL,
+    user_id integer NOT NULL
+) PARTITION BY RANGE (sent_date);
+"""
+
+NOTIFICATION_LOG_FILL = """
+INSERT INTO flash_promo_notificationlog (id, sent_at, sent_date, promo_id, user_id)
+    SELECT id, sent_at, sent_date, promo_id, user_id FROM flash_promo_notificationlog_legacy;
+DROP TABLE flash_promo_notificationlog_legacy;
+
+CREATE SEQUENCE flash_promo_notificationlog_id_seq OWNED BY flash_promo_notificationlog.id;
+SELECT setval(
+    'flash_promo_notificationlog_id_seq',
+    COALESCE((SELECT MAX(id) FROM flash_promo_notificationlog), 0) + 1,
+    false
+);
+ALTER TABLE flash_promo_notificationlog
+    ALTER COLUMN id SET DEFAULT nextval('flash_promo_notificationlog_id_seq');
+
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_pkey PRIMARY KEY (id, sent_date);
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_user_promo_date_uniq
+    UNIQUE (user_id, promo_id, sent_date);
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_promo_id_fk
+    FOREIGN KEY (promo_id) REFERENCES flash_promo_flashpromo (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_user_id_fk
+    FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX flash_promo_promo_i_7562a1_idx ON flash_promo_notificationlog (promo_id, sent_at);
+"""
+
+# Reverso: la tabla particionada se borra (con sus particiones y su secuencia)
+# y la tabla original vuelve con el esquema de la migracion 0002
+NOTIFICATION_LOG_RESTORE = """
+DROP TABLE flash_promo_notificationlog;
+ALTER TABLE flash_promo_notificationlog_legacy RENAME TO flash_promo_notificationlog;
+ALTER TABLE flash_promo_notificationlog
+    ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(
+    pg_get_serial_sequence('flash_promo_notificationlog', 'id'),
+    COALESCE((SELECT MAX(id) FROM flash_promo_notificationlog), 0) + 1,
+    false
+);
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_pkey PRIMARY KEY (id);
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_user_promo_date_uniq
+    UNIQUE (user_id, promo_id, sent_date);
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_promo_id_fk
+    FOREIGN KEY (promo_id) REFERENCES flash_promo_flashpromo (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_notificationlog
+    ADD CONSTRAINT flash_promo_notificationlog_user_id_fk
+    FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX flash_promo_promo_i_7562a1_idx ON flash_promo_notificationlog (promo_id, sent_at);
+CREATE INDEX flash_promo_notificationlog_promo_id_idx ON flash_promo_notificationlog (promo_id);
+CREATE INDEX flash_promo_notificationlog_user_id_idx ON flash_promo_notificationlog (user_id);
+"""
+
+NOTIFICATION_LOG_UNFILL = """
+CREATE TABLE flash_promo_notificationlog_legacy (
+    id bigint NOT NULL,
+    sent_at timestamp with time zone NOT NULL,
+    sent_date date NOT NULL,
+    promo_id bigint NOT NULL,
+    user_id integer NOT NULL
+);
+INSERT INTO flash_promo_notificationlog_legacy (id, sent_at, sent_date, promo_id, user_id)
+    SELECT id, sent_at, sent_date, promo_id, user_id FROM flash_promo_notificationlog;
+"""
+
+RESERVATION_CREATE = """
+ALTER TABLE flash_promo_reservation RENAME TO flash_promo_reservation_legacy;
+CREATE TABLE flash_promo_reservation (
+    id bigint NOT NULL,
+    status varchar(12) NOT NULL,
+    token varchar(64) NOT NULL,
+    expires_at timestamp with time zone NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    promo_id bigint NOT NULL,
+    store_product_id bigint NOT NULL,
+    user_id integer NOT NULL
+) PARTITION BY RANGE (created_at);
+"""
+
+RESERVATION_FILL = """
+INSERT INTO flash_promo_reservation
+    (id, status, token, expires_at, created_at, promo_id, store_product_id, user_id)
+    SELECT id, status, token, expires_at, created_at, promo_id, store_product_id, user_id
+    FROM flash_promo_reservation_legacy;
+DROP TABLE flash_promo_reservation_legacy;
+
+CREATE SEQUENCE flash_promo_reservation_id_seq OWNED BY flash_promo_reservation.id;
+SELECT setval(
+    'flash_promo_reservation_id_seq',
+    COALESCE((SELECT MAX(id) FROM flash_promo_reservation), 0) + 1,
+    false
+);
+ALTER TABLE flash_promo_reservation
+    ALTER COLUMN id SET DEFAULT nextval('flash_promo_reservation_id_seq');
+
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_token_created_uniq UNIQUE (token, created_at);
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_promo_id_fk
+    FOREIGN KEY (promo_id) REFERENCES flash_promo_flashpromo (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_store_product_id_fk
+    FOREIGN KEY (store_product_id) REFERENCES flash_promo_storeproduct (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_user_id_fk
+    FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX flash_promo_store_p_c2dd48_idx ON flash_promo_reservation (store_product_id, status);
+CREATE INDEX flash_promo_reservation_promo_id_idx ON flash_promo_reservation (promo_id);
+CREATE INDEX flash_promo_reservation_user_id_idx ON flash_promo_reservation (user_id);
+"""
+
+RESERVATION_RESTORE = """
+DROP TABLE flash_promo_reservation;
+ALTER TABLE flash_promo_reservation_legacy RENAME TO flash_promo_reservation;
+ALTER TABLE flash_promo_reservation
+    ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(
+    pg_get_serial_sequence('flash_promo_reservation', 'id'),
+    COALESCE((SELECT MAX(id) FROM flash_promo_reservation), 0) + 1,
+    false
+);
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_pkey PRIMARY KEY (id);
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_token_key UNIQUE (token);
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_promo_id_fk
+    FOREIGN KEY (promo_id) REFERENCES flash_promo_flashpromo (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_store_product_id_fk
+    FOREIGN KEY (store_product_id) REFERENCES flash_promo_storeproduct (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE flash_promo_reservation
+    ADD CONSTRAINT flash_promo_reservation_user_id_fk
+    FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX flash_promo_reservation_token_like
+    ON flash_promo_reservation (token varchar_pattern_ops);
+CREATE INDEX flash_promo_store_p_c2dd48_idx ON flash_promo_reservation (store_product_id, status);
+CREATE INDEX flash_promo_reservation_promo_id_idx ON flash_promo_reservation (promo_id);
+CREATE INDEX flash_promo_reservation_user_id_idx ON flash_promo_reservation (user_id);
+CREATE INDEX flash_promo_reservation_store_product_id_idx
+    ON flash_promo_reservation (store_product_id);
+"""
+
+RESERVATION_UNFILL = """
+CREATE TABLE flash_promo_reservation_legacy (
+    id bigint NOT NULL,
+    status varchar(12) NOT NULL,
+    token varchar(64) NOT NULL,
+    expires_at timestamp with time zone NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    promo_id bigint NOT NULL,
+    store_product_id bigint NOT NULL,
+    user_id integer NOT NULL
+);
+INSERT INTO flash_promo_reservation_legacy
+    (id, status, token, expires_at, created_at, promo_id, store_product_id, user_id)
+    SELECT id, status, token, expires_at, created_at, promo_id, store_product_id, user_id
+    FROM flash_promo_reservation;
+"""
+
+
+def create_partitions(apps, schema_editor):
+    """Creates the daily partitions for the legacy
+    data plus the premake window. The DDL is frozen
+    here (same naming as flash_promo.partitions) so
+    later changes of that module do not alter it"""
+
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    today = timezone.localdate()
+    for parent, column in (
+        ("flash_promo_notificationlog", "sent_date"),
+        ("flash_promo_reservation", "created_at"),
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT MIN({column})::date, MAX({column})::date FROM {parent}_legacy")
+            first_day, last_day = cursor.fetchone()
+
+            day = min(first_day or today, today - timedelta(days=1))
+            last_day = max(last_day or today, today + timedelta(days=PREMAKE_DAYS))
+            while day <= last_day:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {quote(f'{parent}_p{day:%Y%m%d}')} "
+                    f"PARTITION OF {quote(parent)} FOR VALUES FROM (%s) TO (%s)",
+                    [day.isoformat(), (day + timedelta(days=1)).isoformat()],
+                )
+                day += timedelta(days=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0003_initial_data'),
+    ]
+
+    operations = [
+        migrations.RunSQL(NOTIFICATION_LOG_CREATE, reverse_sql=NOTIFICATION_LOG_RESTORE),
+        migrations.RunSQL(RESERVATION_CREATE, reverse_sql=RESERVATION_RESTORE),
+        # Las particiones se borran con la tabla padre en RESTORE
+        migrations.RunPython(create_partitions, migrations.RunPython.noop),
+        migrations.RunSQL(NOTIFICATION_LOG_FILL, reverse_sql=NOTIFICATION_LOG_UNFILL),
+        migrations.RunSQL(
+            RESERVATION_FILL,
+            reverse_sql=RESERVATION_UNFILL,
+            # La base solo tiene UNIQUE (token, created_at): el estado no puede declarar token unico
+            state_operations=[
+                migrations.AlterField(
+                    model_name='reservation',
+                    name='token',
+                    field=models.CharField(max_length=64),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(
+                condition=models.Q(('status', 'HOLD')),
+                fields=['expires_at'],
+                name='reservation_hold_expires_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0004_partition_notificationlog_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashpromo',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
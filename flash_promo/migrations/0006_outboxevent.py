@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0005_flashpromo_activated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('promo.status_changed', 'Cambio de estado de promo'), ('stock.changed', 'Cambio de stock'), ('reservation.status_changed', 'Cambio de estado de reserva')], max_length=40)),
+                ('aggregate_id', models.BigIntegerField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
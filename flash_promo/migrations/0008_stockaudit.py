@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0007_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supply', models.IntegerField()),
+                ('consumed_frozen', models.IntegerField(default=0)),
+                ('frozen_until', models.DateTimeField()),
+                ('drift', models.IntegerField(default=0)),
+                ('store_product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_audit', to='flash_promo.storeproduct')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0008_stockaudit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='event_type',
+            field=models.CharField(choices=[('promo.status_changed', 'Cambio de estado de promo'), ('stock.changed', 'Cambio de stock'), ('reservation.status_changed', 'Cambio de estado de reserva'), ('waitlist.handoff', 'Reserva asignada desde la lista de espera')], max_length=40),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('WAITING', 'En espera'), ('SERVED', 'Con reserva'), ('EXPIRED', 'Promo finalizada')], default='WAITING', max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('served_at', models.DateTimeField(blank=True, null=True)),
+                ('reservation_token', models.CharField(blank=True, max_length=64)),
+                ('promo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='flash_promo.flashpromo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'WAITING')), fields=['promo', 'created_at'], name='waitlist_waiting_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'WAITING')), fields=('promo', 'user'), name='waitlist_one_waiting_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0009_waitlistentry'),
+    ]
+
+    operations = [
+        # Sobre la tabla particionada: se crea en cada particion y en las futuras
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['token'], name='reservation_token_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+PARENTS = ("flash_promo_notificationlog", "flash_promo_reservation")
+
+# Si el mantenimiento se atrasa mas que PARTITION_PREMAKE_DAYS los inserts caen aca
+# en lugar de fallar; ensure_partitions los mueve al crear la particion del dia
+CREATE_DEFAULTS = "".join(
+    f"CREATE TABLE IF NOT EXISTS {parent}_default PARTITION OF {parent} DEFAULT;\n"
+    for parent in PARENTS
+)
+
+# No se pierden filas: con datos en DEFAULT el reverso falla
+DROP_DEFAULTS = "".join(
+    f"""
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM {parent}_default) THEN
+        RAISE EXCEPTION '{parent}_default has rows: run maintain_partitioned_tables first';
+    END IF;
+END $$;
+DROP TABLE {parent}_default;
+"""
+    for parent in PARENTS
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flash_promo', '0010_reservation_token_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_DEFAULTS, reverse_sql=DROP_DEFAULTS),
+    ]
@@ -1,12 +1,23 @@
 from django.contrib.gis.db import models as gmodels
-from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-from flash_promo.constants import FlashPromoStatus, ReservationStatus
+from flash_promo.constants import (
+    FlashPromoStatus,
+    OutboxEventType,
+    ReservationStatus,
+    WaitlistStatus,
+)
 
 
+def trigram_index(field: str, name: str) -> GinIndex:
+    """GIN trigram index over UPPER(field): matches the
+    UPPER(field::text) LIKE UPPER(%s) that icontains produces"""
+    return GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=name)
+
 
 class Profile(gmodels.Model):
     user = models.OneToOneField(
@@ -34,7 +45,10 @@ class Store(gmodels.Model):
     geom = gmodels.PointField(geography=True)
 
     class Meta:
-        indexes = [GistIndex(fields=["geom"])]
+        indexes = [
+            GistIndex(fields=["geom"]),
+            trigram_index("name", "store_name_trgm"),
+        ]
 
     def __str__(self):
         return self.name
@@ -46,6 +60,14 @@ class Product(models.Model):
     brand = models.CharField(max_length=64, blank=True)
     category = models.CharField(max_length=64, blank=True)
 
+    class Meta:
+        indexes = [
+            trigram_index("name", "product_name_trgm"),
+            trigram_index("sku", "product_sku_trgm"),
+            trigram_index("brand", "product_brand_trgm"),
+            trigram_index("category", "product_category_trgm"),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
@@ -73,6 +95,8 @@ class FlashPromo(models.Model):
         choices=FlashPromoStatus.choices,
         default=FlashPromoStatus.SCHEDULED,
     )
+    # Momento real de activacion, para medir la latencia contra starts_at
+    activated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         constraints = [
@@ -90,6 +114,8 @@ class FlashPromo(models.Model):
         return f"Promo({self.pk}) {self.store_product} - {self.promo_price}"
 
 
+# NotificationLog y Reservation son tablas particionadas por dia en Postgres
+# (ver migracion 0004 y flash_promo/partitions.py)
 class NotificationLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     promo = models.ForeignKey(FlashPromo, on_delete=models.CASCADE)
@@ -113,12 +139,94 @@ class Reservation(models.Model):
         choices=ReservationStatus.choices,
         default=ReservationStatus.HOLD,
     )
-    token = models.CharField(max_length=64, unique=True)
+    # Unico solo por particion: la base garantiza UNIQUE (token, created_at), no
+    # UNIQUE (token). Los tokens son uuid4, una colision entre dias no es realista
+    token = models.CharField(max_length=64)
     expires_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        indexes = [models.Index(fields=["store_product", "status"])]
+        indexes = [
+            models.Index(fields=["store_product", "status"]),
+            # checkout / cancel buscan por token: sin created_at no hay pruning,
+            # pero cada particion resuelve con su indice
+            models.Index(fields=["token"], name="reservation_token_idx"),
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status=ReservationStatus.HOLD),
+                name="reservation_hold_expires_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Res({self.token}) {self.status}"
+
+
+class WaitlistEntry(models.Model):
+    """User waiting for a unit of a sold out promo. When a hold
+    is released the unit goes straight to the oldest WAITING entry"""
+
+    promo = models.ForeignKey(FlashPromo, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=12,
+        choices=WaitlistStatus.choices,
+        default=WaitlistStatus.WAITING,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    served_at = models.DateTimeField(null=True, blank=True)
+    # Token de la reserva creada en el handoff (Reservation es particionada: sin FK)
+    reservation_token = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["promo", "user"],
+                condition=models.Q(status=WaitlistStatus.WAITING),
+                name="waitlist_one_waiting_per_user",
+            )
+        ]
+        indexes = [
+            # FIFO de los que esperan por promo
+            models.Index(
+                fields=["promo", "created_at"],
+                condition=models.Q(status=WaitlistStatus.WAITING),
+                name="waitlist_waiting_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Waitlist({self.promo_id}, {self.user_id}) {self.status}"
+
+
+class StockAudit(models.Model):
+    """Reconciliation baseline of a StoreProduct (see reconciliation.py):
+    expected stock = supply - consumed_frozen - HOLD/CONFIRMED
+    reservations created since frozen_until"""
+
+    store_product = models.OneToOneField(
+        StoreProduct, on_delete=models.CASCADE, related_name="stock_audit"
+    )
+    # Unidades disponibles en total: stock + reservas que lo consumen
+    supply = models.IntegerField()
+    # Reservas que consumen stock creadas antes de frozen_until (ya no cambian de estado)
+    consumed_frozen = models.IntegerField(default=0)
+    frozen_until = models.DateTimeField()
+    # stock - esperado en la ultima corrida
+    drift = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"StockAudit({self.store_product_id}) drift={self.drift}"
+
+
+class OutboxEvent(models.Model):
+    """Change written in the same transaction as the state change.
+    The relay task publishes it to Redis and deletes it"""
+
+    event_type = models.CharField(max_length=40, choices=OutboxEventType.choices)
+    aggregate_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Outbox({self.pk}) {self.event_type} {self.aggregate_id}"
@@ -0,0 +1,113 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from flash_promo.constants import OutboxEventType
+from flash_promo.models import OutboxEvent, Reservation
+
+
+def promo_status_event(promo_id: int, status: str) -> OutboxEvent:
+    return OutboxEvent(
+        event_type=OutboxEventType.PROMO_STATUS_CHANGED,
+        aggregate_id=promo_id,
+        payload={"promo_id": promo_id, "status": status},
+    )
+
+
+def stock_event(store_product_id: int, delta: int | None, stock: int | None = None) -> OutboxEvent:
+    # stock es None cuando el cambio se hizo con F() y no conocemos el valor final;
+    # delta es None cuando se fijo un stock absoluto (importacion masiva)
+    return OutboxEvent(
+        event_type=OutboxEventType.STOCK_CHANGED,
+        aggregate_id=store_product_id,
+        payload={"store_product_id": store_product_id, "delta": delta, "stock": stock},
+    )
+
+
+def reservation_event(reservation: Reservation) -> OutboxEvent:
+    return OutboxEvent(
+        event_type=OutboxEventType.RESERVATION_STATUS_CHANGED,
+        aggregate_id=reservation.pk,
+        payload={
+            "reservation_id": reservation.pk,
+            "token": reservation.token,
+            "promo_id": reservation.promo_id,
+            "store_product_id": reservation.store_product_id,
+            "user_id": reservation.user_id,
+            "status": reservation.status,
+        },
+    )
+
+
+def waitlist_handoff_event(entry, reservation: Reservation) -> OutboxEvent:
+    # El push gateway lo usa para avisar al usuario que ya tiene un HOLD
+    return OutboxEvent(
+        event_type=OutboxEventType.WAITLIST_HANDOFF,
+        aggregate_id=entry.pk,
+        payload={
+            "promo_id": entry.promo_id,
+            "user_id": entry.user_id,
+            "reservation_token": reservation.token,
+            "expires_at": reservation.expires_at.isoformat(),
+        },
+    )
+
+
+def record(*events: OutboxEvent):
+    """Writes the events in the outbox. Must be called
+    inside the transaction that makes the state change"""
+
+    if not events:
+        return
+    if len(events) == 1:
+        events[0].save()
+    else:
+        OutboxEvent.objects.bulk_create(events)
+
+
+def _message(event: OutboxEvent) -> str:
+    return json.dumps(
+        {
+            "id": event.pk,
+            "type": event.event_type,
+            "aggregate_id": event.aggregate_id,
+            "payload": event.payload,
+            "created_at": event.created_at,
+        },
+        cls=DjangoJSONEncoder,
+    )
+
+
+def relay_batch(batch_size: int | None = None) -> int:
+    """Publishes the oldest outbox events to the Redis
+    stream (ordered feed) and pub/sub channel (low latency),
+    then deletes them. Return the number of events relayed"""
+
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for event in events:
+            message = _message(event)
+            pipe.xadd(
+                settings.OUTBOX_STREAM,
+                {"event": message},
+                maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                approximate=True,
+            )
+            pipe.publish(f"{settings.OUTBOX_CHANNEL_PREFIX}{event.event_type}", message)
+        # Si Redis falla la transaccion hace rollback y los eventos se reintentan
+        pipe.execute()
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+    return len(events)
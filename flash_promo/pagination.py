@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination by primary key: each page is an
+    index range scan, no OFFSET and no COUNT(*)"""
+
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class DistanceCursorPagination(CursorPagination):
+    """Cursor over the KNN distance: the next page
+    keeps scrolling outward from the point"""
+
+    ordering = "distance_m"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
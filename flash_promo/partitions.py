@@ -0,0 +1,147 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# parent table -> (partition column, retention setting)
+PARTITIONED_TABLES = {
+    "flash_promo_notificationlog": ("sent_date", "NOTIFICATION_LOG_RETENTION_DAYS"),
+    "flash_promo_reservation": ("created_at", "RESERVATION_RETENTION_DAYS"),
+}
+
+
+def partition_name(parent: str, day: date) -> str:
+    return f"{parent}_p{day:%Y%m%d}"
+
+
+def default_partition_name(parent: str) -> str:
+    # Recibe las filas de los dias sin particion (migracion 0011)
+    return f"{parent}_default"
+
+
+def _partition_day(parent: str, name: str) -> date | None:
+    suffix = name[len(parent) + 2:]
+    if not name.startswith(f"{parent}_p") or len(suffix) != 8 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:6]), int(suffix[6:]))
+
+
+def attached_partitions(parent: str, connection=None) -> dict[date, str]:
+    """Return the daily partitions attached
+    to the given parent table"""
+
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [parent],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        day = _partition_day(parent, name)
+        if day is not None:
+            partitions[day] = name
+    return partitions
+
+
+def ensure_partitions(parent: str, first_day: date, last_day: date, connection=None) -> list[str]:
+    """Creates the missing daily partitions
+    between first_day and last_day (both included).
+    Rows of those days that landed in the DEFAULT
+    partition are moved into the new partition"""
+
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    column = quote(PARTITIONED_TABLES[parent][0])
+    default = quote(default_partition_name(parent))
+    existing = attached_partitions(parent, connection)
+    created = []
+
+    day = first_day
+    while day <= last_day:
+        if day not in existing:
+            name = partition_name(parent, day)
+            # Para timestamptz los limites son medianoche en la zona de la conexion (UTC)
+            bounds = [day.isoformat(), (day + timedelta(days=1)).isoformat()]
+            # CREATE ... PARTITION OF falla si DEFAULT ya tiene filas del dia:
+            # se crea suelta, se mueven las filas y se adjunta
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(parent)})")
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {default} WHERE {column} >= %s AND {column} < %s "
+                    f"RETURNING *) INSERT INTO {quote(name)} SELECT * FROM moved",
+                    bounds,
+                )
+                moved = cursor.rowcount
+                cursor.execute(
+                    f"ALTER TABLE {quote(parent)} ATTACH PARTITION {quote(name)} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    bounds,
+                )
+            if moved:
+                logger.warning(
+                    "moved %s rows from %s to %s: partition maintenance was late",
+                    moved, default_partition_name(parent), name,
+                )
+            created.append(name)
+        day += timedelta(days=1)
+    return created
+
+
+def detach_expired_partitions(parent: str, retention_days: int, connection=None) -> list[str]:
+    """Detach the partitions older than the retention.
+    When PARTITION_DROP_DETACHED is True the detached
+    tables are dropped too"""
+
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    cutoff = timezone.localdate() - timedelta(days=retention_days)
+    # Sin CONCURRENTLY: Postgres no lo permite con particion DEFAULT. El lock
+    # exclusivo del padre solo dura el cambio de catalogo
+    detached = []
+
+    for day, name in sorted(attached_partitions(parent, connection).items()):
+        if day >= cutoff:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {quote(parent)} DETACH PARTITION {quote(name)}"
+            )
+            if settings.PARTITION_DROP_DETACHED:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+        detached.append(name)
+    return detached
+
+
+def maintain_partitions(connection=None) -> dict[str, dict[str, list[str]]]:
+    """Premake the upcoming partitions and apply
+    the retention for every partitioned table"""
+
+    today = timezone.localdate()
+    report = {}
+    for parent, (_column, retention_setting) in PARTITIONED_TABLES.items():
+        report[parent] = {
+            "created": ensure_partitions(
+                parent,
+                today - timedelta(days=1),
+                today + timedelta(days=settings.PARTITION_PREMAKE_DAYS),
+                connection,
+            ),
+            "detached": detach_expired_partitions(
+                parent, getattr(settings, retention_setting), connection
+            ),
+        }
+    return report
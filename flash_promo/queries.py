@@ -1,7 +1,13 @@
+import math
+
 from django.utils.timezone import now
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point, Polygon
 from django.contrib.gis.measure import D
+from django.db.models import Exists, FloatField, Func, OuterRef
 
-from flash_promo.models import FlashPromo, Store, Profile, User
+from flash_promo import metrics, tracing
+from flash_promo.models import FlashPromo, Store, StoreProduct, Profile, User
 from flash_promo.constants import MINIMUM_DISTANCE, FlashPromoStatus
 
 
@@ -49,9 +55,13 @@ def user_is_eligible_for_promo(
 
     store = promo.store_product.store
 
-    return Store.objects.filter(
-        pk=store.pk, geom__distance_lte=(profile.geom, D(m=radius_m))
-    ).exists()
+    with (
+        tracing.span("geo.eligibility", promo_id=promo.pk, store_id=store.pk),
+        metrics.GEO_QUERY_SECONDS.labels(query="eligibility").time(),
+    ):
+        return Store.objects.filter(
+            pk=store.pk, geom__distance_lte=(profile.geom, D(m=radius_m))
+        ).exists()
 
 
 def get_profile_by_user(user: User):
@@ -64,3 +74,86 @@ def get_profile_by_user(user: User):
         raise ProfileDoesNotExist(
             f"The user: {user.username} does not have a profile related"
         )
+
+
+def nearest_stores(point: Point, product_id: int | None = None, in_stock: bool = False):
+    """
+    Stores ordered by distance to the point using the KNN
+    operator (<->) over the Store.geom GiST index.
+    Optionally only stores that sell the product / have stock.
+    """
+
+    stores = Store.objects.annotate(distance_m=GeometryDistance("geom", point))
+
+    if product_id is not None or in_stock:
+        store_products = StoreProduct.objects.filter(store=OuterRef("pk"))
+        if product_id is not None:
+            store_products = store_products.filter(product_id=product_id)
+        if in_stock:
+            store_products = store_products.filter(stock__gt=0)
+        stores = stores.filter(Exists(store_products))
+
+    return stores.order_by("distance_m")
+
+
+def stores_covering_point(
+    point: Point,
+    product_id: int | None = None,
+    in_stock: bool = False,
+    radius_m: int = MINIMUM_DISTANCE,
+):
+    """Stores whose promo radius covers the point,
+    ordered by distance; same filters as nearest_stores"""
+
+    return nearest_stores(point, product_id=product_id, in_stock=in_stock).filter(
+        geom__dwithin=(point, D(m=radius_m))
+    )
+
+
+METERS_PER_DEGREE = 111_320
+
+
+class _GeographyCoord(Func):
+    # ST_X / ST_Y de una columna geography (lon / lat en grados)
+    output_field = FloatField()
+    template = "%(function)s(%(expressions)s::geometry)"
+
+
+def radius_tiles(center: Point, radius_m: int, per_side: int) -> list[tuple[float, float, float, float]]:
+    """
+    Splits the bounding box of the radius around center into
+    per_side x per_side tiles (xmin, ymin, xmax, ymax) in degrees.
+    The box is padded so every point of the radius falls inside.
+    Not meant for stores next to the poles or the antimeridian.
+    """
+    # 1% de margen: la conversion metros -> grados es aproximada
+    half_lat = radius_m * 1.01 / METERS_PER_DEGREE
+    half_lon = half_lat / max(math.cos(math.radians(center.y)), 0.01)
+    xmin, ymin = center.x - half_lon, center.y - half_lat
+    step_x, step_y = 2 * half_lon / per_side, 2 * half_lat / per_side
+
+    return [
+        (xmin + i * step_x, ymin + j * step_y, xmin + (i + 1) * step_x, ymin + (j + 1) * step_y)
+        for i in range(per_side)
+        for j in range(per_side)
+    ]
+
+
+def profiles_in_tile(profiles, tile: tuple[float, float, float, float]):
+    """Restricts a Profile queryset to a tile of radius_tiles.
+    Half-open bounds [min, max): a point on the edge between two
+    tiles belongs to exactly one of them"""
+
+    xmin, ymin, xmax, ymax = tile
+    box = Polygon.from_bbox(tile)
+    box.srid = 4326
+    return (
+        profiles
+        # && sobre el indice GiST: cada particion solo recorre su tile
+        .filter(geom__bboverlaps=box)
+        .annotate(
+            geom_x=_GeographyCoord("geom", function="ST_X"),
+            geom_y=_GeographyCoord("geom", function="ST_Y"),
+        )
+        .filter(geom_x__gte=xmin, geom_x__lt=xmax, geom_y__gte=ymin, geom_y__lt=ymax)
+    )
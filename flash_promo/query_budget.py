@@ -0,0 +1,144 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+
+from flash_promo import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block or view runs more queries than its budget"""
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_sql: str = ""
+    queries: list = field(default_factory=list)
+    keep_sql: bool = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: mide cada query de la conexion
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql
+            if self.keep_sql:
+                self.queries.append(sql)
+
+    @property
+    def time_ms(self) -> float:
+        return self.seconds * 1000
+
+    @property
+    def slowest_ms(self) -> float:
+        return self.slowest_seconds * 1000
+
+
+@contextmanager
+def collect_queries(keep_sql: bool = False):
+    """Records count, total time and slowest query of
+    every database connection used inside the block"""
+
+    stats = QueryStats(keep_sql=keep_sql)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def assert_query_budget(max_queries: int):
+    """Test helper: fails when the block runs
+    more than max_queries queries
+
+        with assert_query_budget(8):
+            client.post("/cart/reserve", {...})
+    """
+
+    with collect_queries(keep_sql=True) as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries, budget is {max_queries}:\n" + "\n".join(stats.queries)
+        )
+
+
+def view_query_budget(view_func) -> int | None:
+    """Budget declared on the view with `query_budget = N`
+    (class attribute for APIView/ViewSet, attribute for functions)"""
+
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    return getattr(view_class, "query_budget", getattr(view_func, "query_budget", None))
+
+
+def record_request_stats(endpoint: str, stats: QueryStats, budget: int | None) -> bool:
+    """Records the metrics and log line of a request;
+    returns whether it went over the budget"""
+
+    exceeded = budget is not None and stats.count > budget
+    metrics.REQUEST_DB_QUERIES.labels(endpoint=endpoint).observe(stats.count)
+    metrics.REQUEST_DB_SECONDS.labels(endpoint=endpoint).observe(stats.seconds)
+    if exceeded:
+        metrics.QUERY_BUDGET_EXCEEDED.labels(endpoint=endpoint).inc()
+    logger.info(
+        "db endpoint=%s queries=%d budget=%s db_ms=%.1f slowest_ms=%.1f",
+        endpoint, stats.count, budget, stats.time_ms, stats.slowest_ms,
+    )
+    return exceeded
+
+
+class QueryBudgetMiddleware:
+    """
+    Measures the queries of each request. With DEBUG adds the
+    X-DB-Query-Count, X-DB-Time-Ms and X-DB-Slowest-Ms headers.
+    When a view declares `query_budget` and goes over it, logs a
+    warning or raises QueryBudgetExceeded if QUERY_BUDGET_ENFORCE.
+    Must go before the session/auth middlewares so it sees their queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with collect_queries() as stats:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        # Ruta (no path) como label: cardinalidad acotada en las metricas
+        endpoint = (match.route or match.view_name) if match else "unmatched"
+        budget = request.query_budget
+        exceeded = record_request_stats(endpoint, stats, budget)
+
+        if settings.DEBUG:
+            response["X-DB-Query-Count"] = str(stats.count)
+            response["X-DB-Time-Ms"] = f"{stats.time_ms:.1f}"
+            response["X-DB-Slowest-Ms"] = f"{stats.slowest_ms:.1f}"
+
+        if exceeded:
+            message = (
+                f"{endpoint}: {stats.count} queries, budget is {budget} "
+                f"(slowest {stats.slowest_ms:.1f} ms: {stats.slowest_sql[:200]})"
+            )
+            if settings.QUERY_BUDGET_ENFORCE:
+                raise QueryBudgetExceeded(message)
+            logger.warning("query budget exceeded %s", message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = view_query_budget(view_func)
+        return None
@@ -0,0 +1,227 @@
+"""
+Stock reconciliation.
+
+Every unit of a StoreProduct is either in `stock` or held by a HOLD /
+CONFIRMED reservation, so per store product:
+
+    stock == supply - consumed_frozen - consuming reservations since frozen_until
+
+`supply` only changes with manual edits (admin, CRUD, catalog import),
+which rebaseline it. Reservations older than the watermark no longer
+change state, so each run folds them into `consumed_frozen` and only
+aggregates the recent partitions instead of rescanning every reservation.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from flash_promo import metrics, outbox
+from flash_promo.constants import ReservationStatus
+from flash_promo.models import Reservation, StockAudit, StoreProduct
+
+logger = logging.getLogger(__name__)
+
+CONSUMING = [ReservationStatus.HOLD.value, ReservationStatus.CONFIRMED.value]
+
+AUDIT = StockAudit._meta.db_table
+RESERVATION = Reservation._meta.db_table
+STORE_PRODUCT = StoreProduct._meta.db_table
+
+# Reservas que consumen stock por store product desde el watermark
+CONSUMED_SINCE = f"""
+    SELECT store_product_id, count(*) AS n
+    FROM {RESERVATION}
+    WHERE created_at >= %s AND status = ANY(%s)
+    GROUP BY store_product_id
+"""
+
+
+@dataclass
+class ReconcileReport:
+    watermark: datetime | None = None
+    audited: int = 0
+    created: int = 0
+    drifted: dict[int, int] = field(default_factory=dict)
+    repaired: int = 0
+
+
+def _next_watermark(now: datetime, previous: datetime | None) -> datetime:
+    # Hasta now - settle, pero nunca despues de un HOLD pendiente: todavia puede expirar
+    watermark = now - settings.STOCK_RECONCILE_SETTLE
+    oldest_hold = (
+        Reservation.objects
+        .filter(
+            status=ReservationStatus.HOLD,
+            created_at__gte=previous or now - settings.HOLD_SWEEP_WINDOW,
+            created_at__lt=watermark,
+        )
+        .aggregate(oldest=Min("created_at"))["oldest"]
+    )
+    if oldest_hold is not None:
+        watermark = oldest_hold
+    if previous is not None:
+        watermark = max(watermark, previous)
+    return watermark
+
+
+def _advance(previous: datetime, watermark: datetime):
+    # Las reservas de [previous, watermark) ya no cambian: se suman al acumulado
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {AUDIT} AS a
+            SET consumed_frozen = a.consumed_frozen + COALESCE(r.n, 0), frozen_until = %s
+            FROM {AUDIT} AS a2
+            LEFT JOIN (
+                SELECT store_product_id, count(*) AS n
+                FROM {RESERVATION}
+                WHERE created_at >= %s AND created_at < %s AND status = ANY(%s)
+                GROUP BY store_product_id
+            ) AS r ON r.store_product_id = a2.store_product_id
+            WHERE a.id = a2.id AND a.frozen_until = %s
+            """,
+            [watermark, previous, watermark, CONSUMING, previous],
+        )
+
+
+def _create_missing(watermark: datetime) -> int:
+    # Store products sin auditoria: el stock actual es la linea base
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {AUDIT} (store_product_id, supply, consumed_frozen, frozen_until, drift)
+            SELECT sp.id, sp.stock + COALESCE(r.n, 0), 0, %s, 0
+            FROM {STORE_PRODUCT} AS sp
+            LEFT JOIN ({CONSUMED_SINCE}) AS r ON r.store_product_id = sp.id
+            WHERE NOT EXISTS (SELECT 1 FROM {AUDIT} AS a WHERE a.store_product_id = sp.id)
+            ON CONFLICT (store_product_id) DO NOTHING
+            """,
+            [watermark, watermark, CONSUMING],
+        )
+        return cursor.rowcount
+
+
+def _measure_drift(watermark: datetime) -> dict[int, int]:
+    # Una sola sentencia: stock y reservas se leen del mismo snapshot.
+    # Solo se escriben las filas cuyo drift cambio
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {AUDIT} AS a
+            SET drift = sp.stock - (a.supply - a.consumed_frozen - COALESCE(r.n, 0))
+            FROM {STORE_PRODUCT} AS sp
+            LEFT JOIN ({CONSUMED_SINCE}) AS r ON r.store_product_id = sp.id
+            WHERE sp.id = a.store_product_id
+              AND a.drift IS DISTINCT FROM sp.stock - (a.supply - a.consumed_frozen - COALESCE(r.n, 0))
+            """,
+            [watermark, CONSUMING],
+        )
+    return dict(
+        StockAudit.objects.exclude(drift=0).values_list("store_product_id", "drift")
+    )
+
+
+def _repair(store_product_id: int) -> bool:
+    """Sets the stock of a drifted store product to the expected
+    value, under the row lock so no hold/release races the fix"""
+
+    with transaction.atomic():
+        store_product = StoreProduct.objects.select_for_update().get(pk=store_product_id)
+        audit = StockAudit.objects.get(store_product_id=store_product_id)
+        consumed = Reservation.objects.filter(
+            store_product_id=store_product_id,
+            created_at__gte=audit.frozen_until,
+            status__in=CONSUMING,
+        ).count()
+        expected = audit.supply - audit.consumed_frozen - consumed
+        if store_product.stock == expected:
+            audit.drift = 0
+            audit.save(update_fields=["drift"])
+            return False
+
+        previous_stock = store_product.stock
+        # PositiveIntegerField: un esperado negativo solo se acota (supply mal cargado)
+        store_product.stock = max(expected, 0)
+        store_product.save(update_fields=["stock"])
+        audit.drift = store_product.stock - expected
+        audit.save(update_fields=["drift"])
+        outbox.record(outbox.stock_event(
+            store_product.pk, store_product.stock - previous_stock, store_product.stock
+        ))
+    logger.warning(
+        "stock repaired store_product_id=%s from=%s to=%s expected=%s",
+        store_product_id, previous_stock, store_product.stock, expected,
+    )
+    return True
+
+
+def reconcile_stock(repair: bool = False) -> ReconcileReport:
+    """Advances the watermark, audits every store product and
+    reports (and with repair=True fixes) the ones whose stock
+    does not match their reservations"""
+
+    started = time.perf_counter()
+    now = timezone.now()
+    report = ReconcileReport()
+
+    previous = StockAudit.objects.aggregate(watermark=Min("frozen_until"))["watermark"]
+    watermark = _next_watermark(now, previous)
+    with transaction.atomic():
+        if previous is not None and watermark > previous:
+            _advance(previous, watermark)
+        report.created = _create_missing(watermark)
+    report.watermark = watermark
+
+    report.drifted = _measure_drift(watermark)
+    report.audited = StockAudit.objects.count()
+    for store_product_id, drift in report.drifted.items():
+        logger.warning("stock drift store_product_id=%s drift=%s", store_product_id, drift)
+
+    if repair:
+        for store_product_id in list(report.drifted):
+            if _repair(store_product_id):
+                report.repaired += 1
+                metrics.STOCK_REPAIRED.inc()
+        report.drifted = dict(
+            StockAudit.objects.exclude(drift=0).values_list("store_product_id", "drift")
+        )
+
+    metrics.SOLD_OUT_PRODUCTS.set(StoreProduct.objects.filter(stock=0).count())
+    metrics.STOCK_DRIFT_PRODUCTS.set(len(report.drifted))
+    metrics.STOCK_DRIFT_UNITS.set(sum(abs(drift) for drift in report.drifted.values()))
+    metrics.RECONCILE_SECONDS.observe(time.perf_counter() - started)
+    return report
+
+
+def rebaseline(store_product_ids):
+    """
+    After a manual stock edit (admin, CRUD, catalog import) the new
+    stock is the truth: recomputes supply so the drift is zero. Call it
+    in the transaction of the edit, after the UPDATE of the stock (the
+    row lock keeps holds out until the commit). Store products without
+    audit are left for the next run.
+    """
+    store_product_ids = list(store_product_ids)
+    if not store_product_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {AUDIT} AS a
+            SET drift = 0, supply = sp.stock + a.consumed_frozen + (
+                SELECT count(*) FROM {RESERVATION} AS r
+                WHERE r.store_product_id = a.store_product_id
+                  AND r.created_at >= a.frozen_until AND r.status = ANY(%s)
+            )
+            FROM {STORE_PRODUCT} AS sp
+            WHERE sp.id = a.store_product_id AND a.store_product_id = ANY(%s)
+            """,
+            [CONSUMING, store_product_ids],
+        )
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = "replica"
+
+# NULL (lag infinito) si no hay wal receiver o nunca se reprodujo nada: desconectada,
+# replay == receive no significa estar al dia. Con el receiver conectado, 0 si reprodujo
+# todo lo recibido: una replica al dia con un primario sin escrituras no debe verse atrasada
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver) THEN NULL
+        WHEN pg_last_xact_replay_timestamp() IS NULL THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_read_from_replica = ContextVar("flash_promo_read_from_replica", default=False)
+_pinned_to_primary = ContextVar("flash_promo_pinned_to_primary", default=False)
+
+_lag_lock = threading.Lock()
+_lag_cache = {"checked_at": float("-inf"), "lag": None}
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def replica_lag_seconds(force: bool = False) -> float | None:
+    """Replication lag of the replica, cached per process for
+    REPLICA_LAG_CHECK_SECONDS. Infinite when the replica is not
+    streaming from the primary; None when it can not be
+    reached (or is not configured)"""
+
+    if not replica_configured():
+        return None
+    now = time.monotonic()
+    with _lag_lock:
+        if not force and now - _lag_cache["checked_at"] < settings.REPLICA_LAG_CHECK_SECONDS:
+            return _lag_cache["lag"]
+        # Marca antes de consultar: los demas hilos usan el valor anterior
+        _lag_cache["checked_at"] = now
+
+    try:
+        with connections[REPLICA_DB_ALIAS].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+        lag = float("inf") if lag is None else float(lag)
+    except Exception:
+        logger.exception("replica lag check failed")
+        lag = None
+
+    with _lag_lock:
+        _lag_cache["lag"] = lag
+    return lag
+
+
+def replica_alias() -> str:
+    """Alias to read from when stale-by-seconds data is fine:
+    the replica if it is within REPLICA_MAX_LAG_SECONDS,
+    otherwise the primary"""
+
+    lag = replica_lag_seconds()
+    if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS:
+        return DEFAULT_DB_ALIAS
+    return REPLICA_DB_ALIAS
+
+
+@contextmanager
+def use_replica():
+    """Reads inside the block go to the replica (if healthy)
+    until the first write, which pins the block to the primary"""
+
+    read_token = _read_from_replica.set(True)
+    pin_token = _pinned_to_primary.set(False)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(pin_token)
+        _read_from_replica.reset(read_token)
+
+
+class ReplicaRouter:
+    """
+    Everything goes to the primary unless the code opts in with
+    use_replica() (or queryset.using(replica_alias())).
+    Cart writes and their follow-up reads never opt in.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _read_from_replica.get() or _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes: el resto del bloque lee del primario
+        if _read_from_replica.get():
+            _pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La replica es fisica (solo lectura): nunca se migra
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
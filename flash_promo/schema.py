@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_schema = None
+# media type -> (content, etag)
+_rendered = {}
+
+
+def generate_schema() -> dict:
+    return SchemaGenerator().get_schema(request=None, public=True)
+
+
+def render_json(schema: dict) -> bytes:
+    return OpenApiJsonRenderer().render(schema, renderer_context={})
+
+
+def load_schema() -> dict:
+    """
+    Schema of this process, built once: from the OPENAPI_SCHEMA_PATH
+    artifact (build_openapi_schema, generated on docker build) when
+    it exists and DEBUG is off, otherwise by introspecting the views.
+    Only a new deploy (new processes) invalidates it.
+    """
+    global _schema
+    if _schema is not None:
+        return _schema
+    with _lock:
+        if _schema is None:
+            path = Path(settings.OPENAPI_SCHEMA_PATH)
+            # Con DEBUG el artefacto puede estar desactualizado respecto del codigo
+            if not settings.DEBUG and path.exists():
+                _schema = json.loads(path.read_bytes())
+            else:
+                if not settings.DEBUG:
+                    logger.warning("%s not found, generating the schema", path)
+                _schema = generate_schema()
+    return _schema
+
+
+def _render(renderer, media_type: str, renderer_context: dict) -> tuple[bytes, str]:
+    cached = _rendered.get(media_type)
+    if cached is None:
+        content = renderer.render(load_schema(), media_type, renderer_context)
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        cached = _rendered.setdefault(media_type, (content, etag))
+    return cached
+
+
+def schema_filename(renderer) -> str:
+    # Mismo nombre que usa drf-spectacular ("<TITLE>.<formato>"), sin su API privada
+    title = settings.SPECTACULAR_SETTINGS.get("TITLE") or "schema"
+    return f"{title}.{renderer.format}"
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    SpectacularAPIView served from memory: the schema is built once
+    per process and each format rendered once. Answers with an ETag
+    and 304 on If-None-Match; clients revalidate on every fetch
+    (no-cache), so a deploy is visible right away.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        content, etag = _render(
+            request.accepted_renderer, request.accepted_media_type, self.get_renderer_context()
+        )
+        renderer = request.accepted_renderer
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        response["Content-Disposition"] = f'inline; filename="{schema_filename(renderer)}"'
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
+from django.conf import settings
 from django.contrib.gis.geos import Point
+from django.db import transaction
 
 from .models import (
     FlashPromo,
@@ -10,6 +12,9 @@ from .models import (
     Product,
 )
 from .constants import FlashPromoStatus
+from .services import drain_waitlist
+from .tasks import schedule_promo_events
+from . import outbox, reconciliation
 
 
 
@@ -40,6 +45,11 @@ class ReservationResponseSerializer(serializers.Serializer):
     expires_at = serializers.DateTimeField()
 
 
+class WaitlistResponseSerializer(serializers.Serializer):
+    detail = serializers.CharField()
+    position = serializers.IntegerField()
+
+
 class ReservationTokenSerializer(serializers.Serializer):
     reservation_token = serializers.CharField(required=True)
 
@@ -70,6 +80,12 @@ class StoreSerializer(serializers.ModelSerializer):
         model = Store
         fields = ("id", "name", "lat", "lon")
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["lat"] = instance.geom.y
+        data["lon"] = instance.geom.x
+        return data
+
     def create(self, validated_data):
         lat = validated_data.pop("lat")
         lon = validated_data.pop("lon")
@@ -86,6 +102,20 @@ class StoreSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class NearbyStoreSerializer(StoreSerializer):
+    distance_m = serializers.FloatField(read_only=True)
+
+    class Meta(StoreSerializer.Meta):
+        fields = StoreSerializer.Meta.fields + ("distance_m",)
+
+
+class NearbyStoresQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    product_id = serializers.IntegerField(required=False)
+    in_stock = serializers.BooleanField(required=False, default=False)
+
+
 # ---------- StoreProduct ----------
 class StoreProductSerializer(serializers.ModelSerializer):
     store_id = serializers.IntegerField(write_only=True)
@@ -120,19 +150,70 @@ class StoreProductSerializer(serializers.ModelSerializer):
         attrs["_product"] = product
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         store = validated_data.pop("_store")
         product = validated_data.pop("_product")
-        return StoreProduct.objects.create(store=store, product=product, **validated_data)
+        store_product = StoreProduct.objects.create(store=store, product=product, **validated_data)
+        outbox.record(outbox.stock_event(store_product.pk, store_product.stock, store_product.stock))
+        return store_product
 
+    @transaction.atomic
     def update(self, instance, validated_data):
 
         validated_data.pop("_store", None)
         validated_data.pop("_product", None)
         validated_data.pop("store_id", None)
         validated_data.pop("product_id", None)
-        return super().update(instance, validated_data)
+        previous_stock = instance.stock
+        store_product = super().update(instance, validated_data)
+        if store_product.stock != previous_stock:
+            outbox.record(outbox.stock_event(
+                store_product.pk, store_product.stock - previous_stock, store_product.stock
+            ))
+            reconciliation.rebaseline([store_product.pk])
+            # Las unidades repuestas van primero a la lista de espera
+            if drain_waitlist([store_product.pk]):
+                store_product.refresh_from_db(fields=["stock"])
+        return store_product
+
+
 
+# ---------- Bulk catalog import ----------
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=("csv", "ndjson"), required=False)
+
+
+class CatalogImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class CatalogImportReportSerializer(serializers.Serializer):
+    processed = serializers.IntegerField()
+    upserted = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    errors = CatalogImportErrorSerializer(many=True)
+
+
+# ---------- Streaming exports ----------
+class ExportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Inclusive")
+    promo_id = serializers.IntegerField(required=False, min_value=1)
+    # "format" lo reserva DRF para la negociacion de contenido
+    file_format = serializers.ChoiceField(choices=("csv", "ndjson"), default="csv")
+    gzip = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError({"end": "end must be on or after start."})
+        if (attrs["end"] - attrs["start"]).days >= settings.EXPORT_MAX_DAYS:
+            raise serializers.ValidationError(
+                {"end": f"The range can not exceed {settings.EXPORT_MAX_DAYS} days."}
+            )
+        return attrs
 
 
 class FlashPromoCreateSerializer(serializers.ModelSerializer):
@@ -183,4 +264,105 @@ class FlashPromoCreateSerializer(serializers.ModelSerializer):
             status=FlashPromoStatus.SCHEDULED,
             **validated_data
         )
+        # Activation / finish events at the exact starts_at / ends_at
+        transaction.on_commit(lambda: schedule_promo_events(promo))
         return promo
+
+
+# ---------- Bulk flash promo scheduling ----------
+class FlashPromoBatchItemSerializer(serializers.Serializer):
+    store_product_id = serializers.IntegerField()
+    promo_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+
+
+class FlashPromoBatchCreateSerializer(serializers.Serializer):
+    promos = FlashPromoBatchItemSerializer(
+        many=True, allow_empty=False, max_length=settings.PROMO_BATCH_MAX_SIZE
+    )
+
+    def validate(self, attrs):
+        items = attrs["promos"]
+        errors = [{} for _ in items]
+
+        # Una sola consulta de StoreProduct para todo el lote
+        store_products = StoreProduct.objects.in_bulk(
+            {item["store_product_id"] for item in items}
+        )
+
+        for item, item_errors in zip(items, errors):
+            sp = store_products.get(item["store_product_id"])
+            if sp is None:
+                item_errors["store_product_id"] = "StoreProduct does not exist."
+                continue
+            if item["starts_at"] >= item["ends_at"]:
+                item_errors["starts_at"] = "starts_at must be < ends_at."
+            elif (item["ends_at"] - item["starts_at"]).total_seconds() < 60:
+                item_errors["ends_at"] = "scheduled time have to be at least 1 min."
+            if item["promo_price"] >= sp.base_price:
+                item_errors["promo_price"] = "Promo price have to be less than base price."
+
+        self._detect_overlaps(items, errors)
+
+        if any(errors):
+            raise serializers.ValidationError({"promos": errors})
+        return attrs
+
+    def _detect_overlaps(self, items, errors):
+        """Marks the items whose window overlaps an existing
+        (not finished) promo or another item of the batch
+        for the same store product"""
+
+        candidates = [i for i, item_errors in enumerate(errors) if not item_errors]
+        if not candidates:
+            return
+
+        # Usa el indice (store_product, starts_at)
+        existing = (
+            FlashPromo.objects
+            .filter(
+                store_product_id__in={items[i]["store_product_id"] for i in candidates},
+                starts_at__lt=max(items[i]["ends_at"] for i in candidates),
+                ends_at__gt=min(items[i]["starts_at"] for i in candidates),
+            )
+            .exclude(status=FlashPromoStatus.FINISHED)
+            .values_list("id", "store_product_id", "starts_at", "ends_at")
+        )
+
+        windows = {}
+        for promo_id, sp_id, starts_at, ends_at in existing:
+            windows.setdefault(sp_id, []).append((starts_at, ends_at, f"promo {promo_id}"))
+        for i in candidates:
+            item = items[i]
+            windows.setdefault(item["store_product_id"], []).append(
+                (item["starts_at"], item["ends_at"], i)
+            )
+
+        # Barrido por store product: ventanas ordenadas por inicio
+        for sp_windows in windows.values():
+            sp_windows.sort(key=lambda window: window[0])
+            latest = None
+            for window in sp_windows:
+                if latest is not None and window[0] < latest[1]:
+                    for current, other in ((window, latest), (latest, window)):
+                        if isinstance(current[2], int):
+                            label = other[2] if isinstance(other[2], str) else f"item {other[2]}"
+                            errors[current[2]].setdefault(
+                                "starts_at", f"Overlaps with {label} for this store product."
+                            )
+                if latest is None or window[1] > latest[1]:
+                    latest = window
+
+    def create(self, validated_data):
+        promos = FlashPromo.objects.bulk_create([
+            FlashPromo(status=FlashPromoStatus.SCHEDULED, **item)
+            for item in validated_data["promos"]
+        ])
+        transaction.on_commit(lambda: schedule_promo_events(*promos))
+        return promos
+
+
+class FlashPromoBatchResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    ids = serializers.ListField(child=serializers.IntegerField())
@@ -1,6 +1,7 @@
+import time
 import uuid
-from datetime import timedelta
-from django.db import transaction, models
+from datetime import datetime, timedelta
+from django.db import connection, transaction, models
 from django.utils import timezone
 from django.contrib.gis.measure import D
 from flash_promo.models import (
@@ -8,9 +9,22 @@ from flash_promo.models import (
     FlashPromo,
     NotificationLog,
     Reservation,
-    StoreProduct
+    StoreProduct,
+    WaitlistEntry,
 )
-from flash_promo.constants import MINIMUM_DISTANCE, ReservationStatus
+from flash_promo.constants import (
+    MINIMUM_DISTANCE,
+    HOLD_DURATION,
+    FlashPromoStatus,
+    ReservationStatus,
+    WaitlistStatus,
+)
+from flash_promo import metrics, outbox
+
+
+class OutOfStock(ValueError):
+    """hold_store_product_db found no units left"""
+
 
 def eligible_profiles_for_promo(promo: FlashPromo) -> models.QuerySet[Profile]:
     """This function have the purpose
@@ -43,14 +57,92 @@ def profiles_to_notify_for_promo(promo: FlashPromo):
     return profiles.exclude(user_id__in=already_notified_ids)
 
 
+def activate_due_promos(
+    promo_id: int | None = None, promo_ids: list[int] | None = None
+) -> list[tuple[int, datetime, datetime]]:
+    """Set-based activation: UPDATE ... RETURNING of the
+    SCHEDULED promos whose window already started (only
+    promo_id / promo_ids when given, e.g. the admin action).
+    Return (id, starts_at, activated_at) for each activated promo"""
+
+    now = timezone.now()
+    sql = f"""
+        UPDATE {FlashPromo._meta.db_table}
+        SET status = %s, activated_at = %s
+        WHERE status = %s AND starts_at <= %s AND ends_at > %s
+    """
+    params = [FlashPromoStatus.ACTIVE, now, FlashPromoStatus.SCHEDULED, now, now]
+    if promo_id is not None:
+        sql += " AND id = %s"
+        params.append(promo_id)
+    if promo_ids is not None:
+        sql += " AND id = ANY(%s)"
+        params.append(list(promo_ids))
+    sql += " RETURNING id, starts_at, activated_at"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        activated = cursor.fetchall()
+        outbox.record(*[
+            outbox.promo_status_event(promo_id, FlashPromoStatus.ACTIVE)
+            for promo_id, _starts_at, _activated_at in activated
+        ])
+    return activated
+
+
+def finish_due_promos(
+    promo_id: int | None = None, promo_ids: list[int] | None = None
+) -> list[tuple[int, datetime]]:
+    """Set-based finish of the ACTIVE promos whose
+    window already ended. With promo_ids (admin action)
+    the given promos are finished right away, ended or
+    not. Return (id, ends_at)"""
+
+    now = timezone.now()
+    sql = f"""
+        UPDATE {FlashPromo._meta.db_table}
+        SET status = %s
+    """
+    params = [FlashPromoStatus.FINISHED]
+    if promo_ids is not None:
+        # Finalizacion manual: tambien las que todavia no terminaron (o no empezaron)
+        sql += " WHERE status <> %s AND id = ANY(%s)"
+        params += [FlashPromoStatus.FINISHED, list(promo_ids)]
+    else:
+        sql += " WHERE status = %s AND ends_at <= %s"
+        params += [FlashPromoStatus.ACTIVE, now]
+    if promo_id is not None:
+        sql += " AND id = %s"
+        params.append(promo_id)
+    sql += " RETURNING id, ends_at"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        finished = cursor.fetchall()
+        outbox.record(*[
+            outbox.promo_status_event(promo_id, FlashPromoStatus.FINISHED)
+            for promo_id, _ends_at in finished
+        ])
+        # Los que seguian esperando ya no van a recibir una unidad
+        if finished:
+            WaitlistEntry.objects.filter(
+                promo_id__in=[promo_id for promo_id, _ends_at in finished],
+                status=WaitlistStatus.WAITING,
+            ).update(status=WaitlistStatus.EXPIRED)
+    return finished
+
+
 @transaction.atomic
 def hold_store_product_db(user, promo: FlashPromo) -> Reservation:
     """This function initiates the process of
     reservation for a given store product promo"""
-    store_product = StoreProduct.objects.select_for_update().get(pk=promo.store_product_id)
+    started = time.perf_counter()
+    with metrics.STOCK_LOCK_WAIT_SECONDS.labels(operation="hold").time():
+        store_product = StoreProduct.objects.select_for_update().get(pk=promo.store_product_id)
 
     if store_product.stock <= 0:
-        raise ValueError("No stock for ")
+        metrics.RESERVATIONS.labels(outcome="no_stock").inc()
+        raise OutOfStock("No stock for ")
 
     store_product.stock -= 1
     store_product.save(update_fields=["stock"])
@@ -61,8 +153,25 @@ def hold_store_product_db(user, promo: FlashPromo) -> Reservation:
         user=user,
         status=ReservationStatus.HOLD,
         token=uuid.uuid4().hex,
-        expires_at=timezone.now() + timedelta(minutes=1),
+        expires_at=timezone.now() + HOLD_DURATION,
+    )
+    outbox.record(
+        outbox.stock_event(store_product.pk, -1, store_product.stock),
+        outbox.reservation_event(reservation),
     )
+    # Si estaba en la lista de espera y consiguio la unidad reintentando, sale de
+    # la cola: un handoff posterior le daria un segundo HOLD
+    WaitlistEntry.objects.filter(
+        promo=promo, user=user, status=WaitlistStatus.WAITING
+    ).update(
+        status=WaitlistStatus.SERVED,
+        served_at=reservation.created_at,
+        reservation_token=reservation.token,
+    )
+    if store_product.stock == 0:
+        metrics.SOLD_OUT.inc()
+    metrics.RESERVATIONS.labels(outcome="held").inc()
+    metrics.HOLD_SECONDS.observe(time.perf_counter() - started)
     return reservation
 
 
@@ -77,27 +186,38 @@ def confirm_reservation(token: str, user):
 
     with transaction.atomic():
         # Lock de la reserva para evitar carreras
-        reservation_promo = (
-            Reservation.objects
-            .select_for_update()
-            .select_related("store_product")
-            .get(token=token, user=user)
-        )
+        with metrics.STOCK_LOCK_WAIT_SECONDS.labels(operation="confirm").time():
+            # FOR UPDATE con select_related bloquea tambien el StoreProduct
+            reservation_promo = (
+                Reservation.objects
+                .select_for_update()
+                .select_related("store_product")
+                .get(token=token, user=user)
+            )
 
         # 1) Estado inválido (no confirmamos ni tocamos stock)
         if reservation_promo.status != ReservationStatus.HOLD:
             not_hold = True
         else:
             if reservation_promo.expires_at <= timezone.now():
-                StoreProduct.objects.filter(
-                    pk=reservation_promo.store_product_id
-                ).update(stock=models.F("stock") + 1)
                 reservation_promo.status = ReservationStatus.EXPIRED
                 reservation_promo.save(update_fields=["status"])
+                # El StoreProduct ya esta bloqueado (select_related + FOR UPDATE)
+                handoff_events = handoff_released_unit(
+                    reservation_promo.store_product, reservation_promo.promo_id
+                )
+                if not handoff_events:
+                    StoreProduct.objects.filter(
+                        pk=reservation_promo.store_product_id
+                    ).update(stock=models.F("stock") + 1)
+                    handoff_events = [outbox.stock_event(reservation_promo.store_product_id, 1)]
+                outbox.record(outbox.reservation_event(reservation_promo), *handoff_events)
                 expired = True
             else:
                 reservation_promo.status = ReservationStatus.CONFIRMED
                 reservation_promo.save(update_fields=["status"])
+                outbox.record(outbox.reservation_event(reservation_promo))
+            metrics.RESERVATIONS.labels(outcome=reservation_promo.status.lower()).inc()
 
 
     if not_hold:
@@ -110,18 +230,207 @@ def confirm_reservation(token: str, user):
 
 
 @transaction.atomic
-def cancel_or_expire_reservation(reservation: Reservation):
+def cancel_or_expire_reservation(reservation: Reservation, locked: bool = False):
     """This function cancel or expired
-    the given reservation promo"""
+    the given reservation promo. Unless the caller already
+    holds the row lock (locked=True), the reservation is
+    re-read FOR UPDATE: two concurrent cancels must not
+    both return the unit to the stock"""
 
+    if not locked:
+        reservation = Reservation.objects.select_for_update().get(
+            pk=reservation.pk, created_at=reservation.created_at
+        )
     if reservation.status != ReservationStatus.HOLD:
         return reservation
 
-    store_product = StoreProduct.objects.select_for_update().get(pk=reservation.store_product_id)
-    store_product.stock += 1
-    store_product.save(update_fields=["stock"])
+    with metrics.STOCK_LOCK_WAIT_SECONDS.labels(operation="release").time():
+        store_product = StoreProduct.objects.select_for_update().get(
+            pk=reservation.store_product_id
+        )
 
     reservation.status = ReservationStatus.EXPIRED
     reservation.save(update_fields=["status"])
+    metrics.RESERVATIONS.labels(outcome="expired").inc()
+
+    # La unidad liberada va primero al siguiente de la lista de espera
+    handoff_events = handoff_released_unit(store_product, reservation.promo_id)
+    if not handoff_events:
+        store_product.stock += 1
+        store_product.save(update_fields=["stock"])
+        handoff_events = [outbox.stock_event(store_product.pk, 1, store_product.stock)]
+    outbox.record(outbox.reservation_event(reservation), *handoff_events)
 
     return reservation
+
+
+def join_waitlist(user, promo: FlashPromo) -> int:
+    """This function adds the user to the waitlist
+    of a sold out promo (once while waiting) and
+    returns their position in it"""
+
+    # ON CONFLICT DO NOTHING: el indice unico parcial evita duplicados en WAITING.
+    # RETURNING solo trae fila si se inserto (un reintento no cuenta como alta)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {WaitlistEntry._meta.db_table}
+                (promo_id, user_id, status, created_at, reservation_token)
+            VALUES (%s, %s, %s, %s, '')
+            ON CONFLICT DO NOTHING
+            RETURNING id
+            """,
+            [promo.pk, user.pk, WaitlistStatus.WAITING, timezone.now()],
+        )
+        if cursor.fetchone() is not None:
+            metrics.WAITLIST.labels(event="joined").inc()
+    joined_at = (
+        WaitlistEntry.objects
+        .filter(promo=promo, user=user, status=WaitlistStatus.WAITING)
+        .values("created_at")[:1]
+    )
+    return WaitlistEntry.objects.filter(
+        promo=promo, status=WaitlistStatus.WAITING, created_at__lte=models.Subquery(joined_at)
+    ).count()
+
+
+def _waiting_entries(now: datetime) -> models.QuerySet[WaitlistEntry]:
+    # Solo esperan de verdad los de promos activas y dentro de su ventana
+    return WaitlistEntry.objects.filter(
+        status=WaitlistStatus.WAITING,
+        promo__status=FlashPromoStatus.ACTIVE,
+        promo__starts_at__lte=now,
+        promo__ends_at__gt=now,
+    )
+
+
+def handoff_released_unit(store_product: StoreProduct, promo_id: int | None = None) -> list:
+    """Gives a released unit straight to the oldest waiting
+    user of the promo (of any active promo of the store
+    product when promo_id is None) with a new HOLD. Must run
+    under the StoreProduct lock. Returns the outbox events of
+    the handoff (empty if nobody is waiting or the promo is
+    over: the caller keeps the unit in the stock)"""
+
+    now = timezone.now()
+    entries = _waiting_entries(now).filter(promo__store_product=store_product)
+    if promo_id is not None:
+        entries = entries.filter(promo_id=promo_id)
+    entry = (
+        entries
+        # skip_locked: otra liberacion concurrente toma al siguiente
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("created_at")
+        .first()
+    )
+    if entry is None:
+        return []
+
+    reservation = Reservation.objects.create(
+        promo_id=entry.promo_id,
+        store_product=store_product,
+        user_id=entry.user_id,
+        status=ReservationStatus.HOLD,
+        token=uuid.uuid4().hex,
+        expires_at=now + HOLD_DURATION,
+    )
+    entry.status = WaitlistStatus.SERVED
+    entry.served_at = now
+    entry.reservation_token = reservation.token
+    entry.save(update_fields=["status", "served_at", "reservation_token"])
+
+    # Import local: tasks importa este modulo
+    from flash_promo.tasks import notify_waitlist_handoff
+
+    transaction.on_commit(
+        lambda: notify_waitlist_handoff.delay(entry.promo_id, entry.user_id)
+    )
+    metrics.WAITLIST.labels(event="handed_off").inc()
+    metrics.RESERVATIONS.labels(outcome="held").inc()
+    return [
+        outbox.reservation_event(reservation),
+        outbox.waitlist_handoff_event(entry, reservation),
+    ]
+
+
+def drain_waitlist(store_product_ids) -> int:
+    """
+    After a manual restock (admin, CRUD, catalog import) hands the
+    new units to the users waiting for the store products, FIFO, the
+    same way a released hold does: otherwise a retrying client takes
+    them ahead of the users that got a 202. Call it in the transaction
+    of the edit, after the UPDATE of the stock. Returns the units
+    handed off.
+    """
+    store_product_ids = list(store_product_ids)
+    if not store_product_ids:
+        return 0
+    waiting = (
+        _waiting_entries(timezone.now())
+        .filter(promo__store_product_id__in=store_product_ids)
+        .values_list("promo__store_product_id", flat=True)
+        .distinct()
+    )
+    handed = 0
+    for store_product in (
+        StoreProduct.objects.select_for_update()
+        .filter(pk__in=list(waiting), stock__gt=0)
+        .order_by("pk")
+    ):
+        events, given = [], 0
+        while store_product.stock > 0:
+            handoff_events = handoff_released_unit(store_product)
+            if not handoff_events:
+                break
+            store_product.stock -= 1
+            events.extend(handoff_events)
+            given += 1
+        if not given:
+            continue
+        store_product.save(update_fields=["stock"])
+        outbox.record(
+            outbox.stock_event(store_product.pk, -given, store_product.stock), *events
+        )
+        if store_product.stock == 0:
+            metrics.SOLD_OUT.inc()
+        handed += given
+    return handed
+
+
+def expire_stale_holds(window: timedelta) -> int:
+    """This function expires the HOLD reservations
+    that already passed expires_at. Only looks at the
+    reservations created inside `window` so Postgres
+    prunes the old partitions"""
+
+    now = timezone.now()
+    stale = (
+        Reservation.objects
+        .filter(
+            status=ReservationStatus.HOLD,
+            expires_at__lte=now,
+            created_at__gte=now - window,
+        )
+        .values_list("pk", flat=True)
+    )
+
+    expired = 0
+    for reservation_id in list(stale):
+        with transaction.atomic():
+            # skip_locked: si un checkout la tiene bloqueada, la dejamos para la proxima
+            reservation = (
+                Reservation.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    pk=reservation_id,
+                    status=ReservationStatus.HOLD,
+                    created_at__gte=now - window,
+                )
+                .first()
+            )
+            if reservation is None:
+                continue
+            cancel_or_expire_reservation(reservation, locked=True)
+            expired += 1
+
+    return expired
@@ -1,59 +1,296 @@
-from celery import shared_task, group
+import logging
+import time
+
+from celery import chord, current_app, shared_task, group
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 
-from flash_promo.constants import FlashPromoStatus
+from flash_promo import metrics, reconciliation, tracing
+from flash_promo.bulk import write_notification_logs
+from flash_promo.codecs import pack_ids, unpack_ids
+from flash_promo.locks import lease, single_flight, mark_inflight, clear_inflight
+from flash_promo.constants import MINIMUM_DISTANCE, FlashPromoStatus
 from flash_promo.models import FlashPromo, NotificationLog
-from flash_promo.services import profiles_to_notify_for_promo
+from flash_promo.outbox import relay_batch
+from flash_promo.partitions import maintain_partitions
+from flash_promo.queries import profiles_in_tile, radius_tiles
+from flash_promo.routers import use_replica
+from flash_promo.services import (
+    profiles_to_notify_for_promo,
+    expire_stale_holds,
+    activate_due_promos,
+    finish_due_promos,
+)
+
+logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 1000
 
+# Contexto de traza propagado por los headers de las tareas
+before_task_publish.connect(tracing.on_before_task_publish, weak=False)
+task_prerun.connect(tracing.on_task_prerun, weak=False)
+task_failure.connect(tracing.on_task_failure, weak=False)
+task_postrun.connect(tracing.on_task_postrun, weak=False)
+
+
+def schedule_promo_events(*promos: FlashPromo):
+    """Schedules the activation and finish events
+    at the exact starts_at / ends_at of the promos, only
+    for the ones inside PROMO_EVENT_HORIZON: a far ETA
+    stays in the worker memory and Redis redelivers it every
+    visibility_timeout. schedule_upcoming_promo_events queues
+    the rest as they come into the horizon.
+    Events are idempotent, so rescheduling after an edit
+    only adds new events: the stale ones find nothing to update"""
+
+    horizon = timezone.now() + settings.PROMO_EVENT_HORIZON
+    # El marcador dura mas que el horizonte: el barrido no repite el mismo evento
+    marker_ttl = settings.PROMO_EVENT_HORIZON.total_seconds() * 2
+    # Un solo producer (una conexion al broker) para todo el lote
+    with current_app.producer_or_acquire() as producer:
+        for promo in promos:
+            for event, eta in ((activate_promo, promo.starts_at), (finish_promo, promo.ends_at)):
+                if eta > horizon:
+                    continue
+                if not mark_inflight(event.name, f"{promo.id}:{eta.timestamp()}", marker_ttl):
+                    continue
+                event.apply_async((promo.id,), eta=eta, producer=producer)
+
+
+def enqueue_notify_promo(promo_id: int) -> bool:
+    """Queues notify_promo unless there is already
+    one queued or running for the same promo"""
+
+    if not mark_inflight("notify_promo", promo_id):
+        return False
+    notify_promo.delay(promo_id)
+    return True
+
+
+def on_promos_activated(activated, source: str):
+    """Logs the activation latency and queues notify_promo
+    for each (id, starts_at, activated_at) of activate_due_promos"""
+
+    for promo_id, starts_at, activated_at in activated:
+        latency_ms = (activated_at - starts_at).total_seconds() * 1000
+        logger.info(
+            "promo activated promo_id=%s source=%s activation_latency_ms=%.0f",
+            promo_id, source, latency_ms,
+        )
+        enqueue_notify_promo(promo_id)
+
+
 @shared_task
-def activate_and_notify_promos():
+def activate_promo(promo_id: int):
+    # Evento a la hora exacta de starts_at
+    on_promos_activated(activate_due_promos(promo_id=promo_id), source="event")
+
+
+@shared_task
+def finish_promo(promo_id: int):
+    # Evento a la hora exacta de ends_at
+    finish_due_promos(promo_id=promo_id)
+
+
+@shared_task
+@single_flight()
+def schedule_upcoming_promo_events():
+    # Encola los eventos que entraron en el horizonte (ver schedule_promo_events)
     now = timezone.now()
-    # Here activate the flash promo for certain products
-    to_activate = FlashPromo.objects.filter(
-        status=FlashPromoStatus.SCHEDULED,
-        starts_at__lte=now,
-        ends_at__gt=now
-    )
-    for promo in to_activate:
-        promo.status = FlashPromoStatus.ACTIVE
-        promo.save(update_fields=["status"])
-        notify_promo.delay(promo.id)
+    horizon = now + settings.PROMO_EVENT_HORIZON
+    promos = FlashPromo.objects.filter(
+        Q(status=FlashPromoStatus.SCHEDULED, starts_at__gt=now, starts_at__lte=horizon)
+        | Q(
+            status__in=[FlashPromoStatus.SCHEDULED, FlashPromoStatus.ACTIVE],
+            ends_at__gt=now,
+            ends_at__lte=horizon,
+        )
+    ).only("id", "starts_at", "ends_at")
+    schedule_promo_events(*promos)
+
+
+@shared_task
+@single_flight()
+def activate_and_notify_promos():
+    # Fallback sweep for the events that were lost or delayed
+    with tracing.span("promos.activate_due"):
+        activated = activate_due_promos()
+    on_promos_activated(activated, source="sweep")
 
     # Here we FINISHED the promo that end_at is equal to now (Basically, expired)
-    FlashPromo.objects.filter(
-        status=FlashPromoStatus.ACTIVE,
-        ends_at__lt=now
-    ).update(status=FlashPromoStatus.FINISHED)
+    finish_due_promos()
 
 
 @shared_task
 def notify_promo(promo_id: int):
-    promo = FlashPromo.objects.get(pk=promo_id)
-    user_ids = list(profiles_to_notify_for_promo(promo).values_list("user_id", flat=True))
+    """Plans the fan-out of a promo: splits the radius around the store
+    into NOTIFY_TILES_PER_SIDE^2 tiles and computes each tile's audience
+    in parallel (chord). The in-flight marker is cleared by the callback
+    once every tile is done (or expires with TASK_INFLIGHT_SECONDS).
+    Without a result backend there is no chord: the tiles go out as a
+    plain group and the promo is released once they are dispatched"""
+
+    # Lease por promo: un solo fan-out a la vez aunque llegue un duplicado
+    with lease(f"notify_promo:{promo_id}") as acquired:
+        if not acquired:
+            return
+        try:
+            promo = FlashPromo.objects.select_related("store_product__store").get(pk=promo_id)
+            tiles = radius_tiles(
+                promo.store_product.store.geom, MINIMUM_DISTANCE, settings.NOTIFY_TILES_PER_SIDE
+            )
+            header = [notify_promo_partition.s(promo_id, tile) for tile in tiles]
+            with tracing.span("celery.fan_out", promo_id=promo_id, partitions=len(header)):
+                if current_app.conf.result_backend:
+                    chord(header)(finish_notify_promo.s(promo_id))
+                else:
+                    group(header).apply_async()
+                    clear_inflight("notify_promo", promo_id)
+        except Exception:
+            clear_inflight("notify_promo", promo_id)
+            raise
+
+
+@shared_task(ignore_result=False)
+def notify_promo_partition(promo_id: int, tile: list[float]) -> int:
+    # Audiencia de un tile + fan-out de sus batches; devuelve cuantos usuarios notifico
+    promo = FlashPromo.objects.select_related("store_product__store").get(pk=promo_id)
+    with (
+        tracing.span("geo.notify_audience", promo_id=promo_id, tile=str(tile)),
+        metrics.GEO_QUERY_SECONDS.labels(query="notify_audience").time(),
+    ):
+        # Audiencia desde la replica: el antispam final lo hace send_push_batch en el primario
+        with use_replica():
+            user_ids = list(
+                profiles_in_tile(profiles_to_notify_for_promo(promo), tile)
+                .values_list("user_id", flat=True)
+            )
+        tracing.set_attributes({"audience.size": len(user_ids)})
+
     jobs = []
     for i in range(0, len(user_ids), BATCH_SIZE):
-        jobs.append(send_push_batch.s(promo_id, user_ids[i:i+BATCH_SIZE]))
-
+        batch = user_ids[i:i+BATCH_SIZE]
+        metrics.NOTIFY_BATCH_SIZE.observe(len(batch))
+        if settings.NOTIFY_PACK_USER_IDS:
+            batch = pack_ids(batch)
+        jobs.append(send_push_batch.s(promo_id, batch))
     if jobs:
         group(jobs).apply_async()
+    return len(user_ids)
+
+
+@shared_task
+def finish_notify_promo(counts: list[int], promo_id: int):
+    # Callback del chord: junta el progreso de los tiles y libera la promo
+    clear_inflight("notify_promo", promo_id)
+    audience = sum(counts)
+    metrics.NOTIFY_AUDIENCE.observe(audience)
+    tracing.set_attributes({"audience.size": audience, "partitions": len(counts)})
+    logger.info(
+        "promo fan-out done promo_id=%s audience=%s partitions=%s busiest=%s",
+        promo_id, audience, len(counts), max(counts, default=0),
+    )
+
 
 @shared_task
-def send_push_batch(promo_id: int, user_ids: list[int]):
+def send_push_batch(promo_id: int, user_ids: list[int] | str):
     # Register those notification that already and avoid spam(anti spam strategy)
+    started = time.perf_counter()
+    # str = ids empaquetados con pack_ids; la lista JSON se sigue aceptando
+    if isinstance(user_ids, str):
+        user_ids = unpack_ids(user_ids)
+    tracing.set_attributes({"push.batch_size": len(user_ids)})
 
-    objs = [NotificationLog(user_id=uid, promo_id=promo_id) for uid in user_ids]
-    NotificationLog.objects.bulk_create(objs, ignore_conflicts=True)
+    # Antispam definitivo contra el primario: la audiencia sale de la replica, que puede
+    # no ver los NotificationLog recientes. Solo se notifica a los registrados aca
+    if settings.NOTIFICATION_LOG_COPY_ENABLED:
+        # COPY + ON CONFLICT DO NOTHING del batch, antes de que la tarea haga ack
+        user_ids = write_notification_logs(promo_id, user_ids)
+    else:
+        already_notified = set(
+            NotificationLog.objects
+            .filter(promo_id=promo_id, sent_date=timezone.localdate(), user_id__in=user_ids)
+            .values_list("user_id", flat=True)
+        )
+        user_ids = [uid for uid in user_ids if uid not in already_notified]
+        objs = [NotificationLog(user_id=uid, promo_id=promo_id) for uid in user_ids]
+        NotificationLog.objects.bulk_create(objs, ignore_conflicts=True)
+    tracing.set_attributes({"push.sent": len(user_ids)})
+
+    metrics.PUSH_SENT.inc(len(user_ids))
+    metrics.PUSH_BATCH_SECONDS.observe(time.perf_counter() - started)
 
 
 @shared_task
+def notify_waitlist_handoff(promo_id: int, user_id: int):
+    # Push al usuario de la lista de espera que recibio una reserva (simulado como send_push_batch)
+    logger.info("waitlist handoff push promo_id=%s user_id=%s", promo_id, user_id)
+    metrics.PUSH_SENT.inc()
+
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    # Exporter Prometheus del worker (proceso principal)
+    metrics.start_worker_exporter()
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    metrics.mark_process_dead(pid)
+
+
+@shared_task
+@single_flight()
 def notify_active_promos():
     now = timezone.now()
-    actives = FlashPromo.objects.filter(
+    active_ids = FlashPromo.objects.filter(
         status=FlashPromoStatus.ACTIVE,
         starts_at__lte=now,
         ends_at__gte=now
-    )
-    for promo in actives:
-        notify_promo.delay(promo.id)
+    ).values_list("id", flat=True)
+    for promo_id in active_ids:
+        enqueue_notify_promo(promo_id)
+
+
+@shared_task
+@single_flight()
+def expire_holds():
+    # Devuelve el stock de los HOLD vencidos; solo toca las particiones recientes
+    return expire_stale_holds(settings.HOLD_SWEEP_WINDOW)
+
+
+@shared_task
+@single_flight()
+def maintain_partitioned_tables():
+    # Crea las particiones de los proximos dias y aplica la retencion
+    return maintain_partitions()
+
+
+@shared_task
+@single_flight()
+def relay_outbox():
+    # Drena el outbox en batches (un solo relay a la vez mantiene el orden)
+    relayed = 0
+    for _ in range(settings.OUTBOX_RELAY_MAX_BATCHES):
+        count = relay_batch()
+        relayed += count
+        if count < settings.OUTBOX_RELAY_BATCH_SIZE:
+            break
+    return relayed
+
+
+@shared_task
+@single_flight()
+def reconcile_stock():
+    # Compara stock contra reservas y, con STOCK_RECONCILE_REPAIR, corrige el drift
+    report = reconciliation.reconcile_stock(repair=settings.STOCK_RECONCILE_REPAIR)
+    return {"drifted": len(report.drifted), "repaired": report.repaired}
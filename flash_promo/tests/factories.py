@@ -0,0 +1,46 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.utils import timezone
+
+from flash_promo.constants import FlashPromoStatus
+from flash_promo.models import FlashPromo, Product, Store, StoreProduct
+
+# Lejos de la tienda de 0003_initial_data: las consultas geo no la ven
+STORE_LOCATION = (-75.5636, 6.2518)
+
+
+def make_store(name: str = "Store", location: tuple[float, float] = STORE_LOCATION) -> Store:
+    return Store.objects.create(name=name, geom=Point(*location, srid=4326))
+
+
+def make_store_product(
+    stock: int = 10, store: Store | None = None, sku: str = "SKU-TEST-1", base_price: str = "100"
+) -> StoreProduct:
+    product = Product.objects.create(name=f"Product {sku}", sku=sku)
+    return StoreProduct.objects.create(
+        store=store or make_store(), product=product, stock=stock, base_price=Decimal(base_price)
+    )
+
+
+def make_promo(stock: int = 10, store_product: StoreProduct | None = None, **fields) -> FlashPromo:
+    """Active promo (window open now) unless fields say otherwise"""
+
+    now = timezone.now()
+    fields = {
+        "promo_price": Decimal("50"),
+        "starts_at": now - timedelta(minutes=5),
+        "ends_at": now + timedelta(hours=1),
+        "status": FlashPromoStatus.ACTIVE,
+        "activated_at": now,
+        **fields,
+    }
+    return FlashPromo.objects.create(
+        store_product=store_product or make_store_product(stock=stock), **fields
+    )
+
+
+def make_users(*names: str) -> list[User]:
+    return [User.objects.create_user(username=name) for name in names]
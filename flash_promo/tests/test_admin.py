@@ -0,0 +1,57 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from flash_promo.admin import make_active, make_finished
+from flash_promo.constants import FlashPromoStatus, OutboxEventType, WaitlistStatus
+from flash_promo.models import FlashPromo, OutboxEvent, WaitlistEntry
+from flash_promo.tests.factories import make_promo, make_store_product, make_users
+
+
+class PromoAdminActionTests(TestCase):
+    def setUp(self):
+        self.modeladmin = mock.Mock()
+        now = timezone.now()
+        self.due = make_promo(status=FlashPromoStatus.SCHEDULED, activated_at=None)
+        self.upcoming = make_promo(
+            store_product=make_store_product(sku="SKU-TEST-2"),
+            status=FlashPromoStatus.SCHEDULED,
+            activated_at=None,
+            starts_at=now + timedelta(hours=1),
+            ends_at=now + timedelta(hours=2),
+        )
+
+    def promo_events(self, promo):
+        return OutboxEvent.objects.filter(
+            event_type=OutboxEventType.PROMO_STATUS_CHANGED, aggregate_id=promo.pk
+        )
+
+    @mock.patch("flash_promo.tasks.enqueue_notify_promo")
+    def test_make_active_goes_through_the_activation_service(self, enqueue_notify_promo):
+        make_active(self.modeladmin, None, FlashPromo.objects.filter(
+            pk__in=[self.due.pk, self.upcoming.pk]
+        ))
+
+        self.due.refresh_from_db()
+        self.assertEqual(self.due.status, FlashPromoStatus.ACTIVE)
+        self.assertIsNotNone(self.due.activated_at)
+        self.assertEqual(self.promo_events(self.due).count(), 1)
+        enqueue_notify_promo.assert_called_once_with(self.due.pk)
+        # Fuera de su ventana: sigue agendada, sin evento ni notificacion
+        self.upcoming.refresh_from_db()
+        self.assertEqual(self.upcoming.status, FlashPromoStatus.SCHEDULED)
+        self.assertFalse(self.promo_events(self.upcoming).exists())
+
+    def test_make_finished_closes_the_promo_and_its_waitlist(self):
+        promo = make_promo(store_product=make_store_product(sku="SKU-TEST-3"))
+        [alice] = make_users("alice")
+        WaitlistEntry.objects.create(promo=promo, user=alice)
+
+        make_finished(self.modeladmin, None, FlashPromo.objects.filter(pk=promo.pk))
+
+        promo.refresh_from_db()
+        self.assertEqual(promo.status, FlashPromoStatus.FINISHED)
+        self.assertEqual(self.promo_events(promo).count(), 1)
+        self.assertEqual(WaitlistEntry.objects.get(promo=promo).status, WaitlistStatus.EXPIRED)
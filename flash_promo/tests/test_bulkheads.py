@@ -0,0 +1,70 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from flash_promo.bulkheads import BulkheadMiddleware, request_queue_ms
+
+NOW = 1_700_000_000.0
+
+
+def queue_ms(header):
+    request = RequestFactory().get("/cart/reserve", HTTP_X_REQUEST_START=header)
+    return request_queue_ms(request, now=NOW)
+
+
+class RequestQueueTests(SimpleTestCase):
+    def test_units(self):
+        # nginx: segundos con decimales; otros proxies ms o us
+        self.assertAlmostEqual(queue_ms(f"t={NOW - 0.25:.3f}"), 250, places=2)
+        self.assertAlmostEqual(queue_ms(str(int(NOW * 1000) - 250)), 250, places=2)
+        self.assertAlmostEqual(queue_ms(f"t={int(NOW * 1_000_000) - 250_000}"), 250, places=2)
+
+    def test_clock_skew_is_not_negative(self):
+        self.assertEqual(queue_ms(f"t={NOW + 5}"), 0.0)
+
+    def test_missing_or_garbage(self):
+        self.assertIsNone(request_queue_ms(RequestFactory().get("/cart/reserve"), now=NOW))
+        for header in ("", "t=", "garbage", "t=12abc", "t=nan", "t=inf"):
+            with self.subTest(header=header):
+                self.assertIsNone(queue_ms(header))
+
+
+BULKHEADS = {
+    "reserve": {"paths": ["/cart/reserve"], "limit": 1, "max_wait_ms": 0, "max_queue_ms": 500},
+}
+
+
+@override_settings(BULKHEADS_ENABLED=True, BULKHEADS=BULKHEADS, BULKHEAD_RETRY_AFTER_SECONDS=3)
+class BulkheadMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.inner = []
+        self.middleware = BulkheadMiddleware(self.get_response)
+
+    def get_response(self, request):
+        # Una request concurrente mientras esta ocupa el unico lugar
+        if request.path == "/cart/reserve" and not self.inner:
+            self.inner.append(self.middleware(self.factory.post("/cart/reserve")))
+        return HttpResponse("ok")
+
+    def assertShed(self, response):
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+
+    def test_full_compartment_sheds_with_503(self):
+        response = self.middleware(self.factory.post("/cart/reserve"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertShed(self.inner[0])
+        # El lugar se libera al terminar la request
+        self.assertEqual(self.middleware(self.factory.post("/cart/reserve")).status_code, 200)
+
+    def test_queued_too_long_is_shed(self):
+        request = self.factory.post("/cart/reserve", HTTP_X_REQUEST_START="t=1000000000.000")
+        self.assertShed(self.middleware(request))
+        self.assertEqual(self.inner, [])
+
+    def test_paths_outside_the_compartments_are_not_limited(self):
+        self.middleware.compartments[0].acquire()
+        self.addCleanup(self.middleware.compartments[0].release)
+        self.assertEqual(self.middleware(self.factory.get("/metrics")).status_code, 200)
+        self.assertShed(self.middleware(self.factory.post("/cart/reserve")))
@@ -0,0 +1,107 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from flash_promo.catalog import import_products, import_store_products, read_rows
+from flash_promo.models import Product, StoreProduct
+from flash_promo.tests.factories import make_store
+
+
+class ReadRowsTests(SimpleTestCase):
+    def test_csv_rows_carry_the_file_line(self):
+        rows = list(read_rows(io.StringIO("sku,name\nA,Alpha\nB,Beta\n"), "csv"))
+        self.assertEqual(rows, [(2, {"sku": "A", "name": "Alpha"}), (3, {"sku": "B", "name": "Beta"})])
+
+    def test_bad_ndjson_lines_are_yielded_as_errors(self):
+        stream = io.StringIO('{"sku": "A"}\n\nnot json\n[1, 2]\n')
+        rows = list(read_rows(stream, "ndjson"))
+
+        self.assertEqual([line for line, _ in rows], [1, 3, 4])
+        self.assertEqual(rows[0][1], {"sku": "A"})
+        self.assertIsInstance(rows[1][1], ValueError)
+        self.assertEqual(str(rows[2][1]), "Each line must be a JSON object.")
+
+
+class CatalogImportTests(TestCase):
+    def test_products_report_errors_by_line(self):
+        stream = io.StringIO(
+            '{"sku": "SKU-IMP-1", "name": "First"}\n'
+            '{"sku": "SKU-IMP-2"}\n'
+            "broken\n"
+            '{"sku": "SKU-IMP-1", "name": "First again"}\n'
+        )
+        report = import_products(stream, "ndjson")
+
+        self.assertEqual((report.processed, report.upserted, report.failed), (4, 1, 2))
+        self.assertEqual(report.errors[0], {"line": 2, "errors": {"name": "This field is required."}})
+        self.assertEqual(report.errors[1]["line"], 3)
+        self.assertIn("row", report.errors[1]["errors"])
+        # Repetido en el mismo batch: gana la ultima fila
+        self.assertEqual(Product.objects.get(sku="SKU-IMP-1").name, "First again")
+
+    def test_store_products_validate_foreign_keys(self):
+        store = make_store()
+        product = Product.objects.create(name="Known", sku="SKU-KNOWN")
+        missing = Product.objects.order_by("-pk").first().pk + 1000
+        stream = io.StringIO(
+            "store_id,product_id,sku,stock,base_price\n"
+            f"{store.pk},{product.pk},,5,10\n"
+            f"{store.pk},,SKU-KNOWN,6,10\n"
+            f"{store.pk + 1000},{product.pk},,1,10\n"
+            f"{store.pk},{missing},,1,10\n"
+            f"{store.pk},,SKU-UNKNOWN,1,10\n"
+            f"{store.pk},,,abc,10\n"
+        )
+        report = import_store_products(stream, "csv")
+
+        self.assertEqual((report.processed, report.upserted, report.failed), (6, 1, 4))
+        self.assertEqual(
+            report.errors,
+            [
+                {"line": 4, "errors": {"store_id": "Store does not exist."}},
+                {"line": 5, "errors": {"product_id": "Product does not exist."}},
+                {"line": 6, "errors": {"sku": "Product does not exist."}},
+                {
+                    "line": 7,
+                    "errors": {
+                        "stock": "A valid integer is required.",
+                        "product_id": "product_id or sku is required.",
+                    },
+                },
+            ],
+        )
+        # Misma (store, product) por id y por sku: queda la ultima fila
+        self.assertEqual(StoreProduct.objects.get(store=store, product=product).stock, 6)
+
+    def test_zero_max_errors_only_counts(self):
+        stream = io.StringIO('{"sku": "SKU-IMP-3"}\n{"name": "No sku"}\n')
+        report = import_products(stream, "ndjson", max_errors=0)
+
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.errors, [])
+
+
+class CatalogImportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+
+    @override_settings(CATALOG_IMPORT_MAX_BYTES=16)
+    def test_large_file_is_rejected(self):
+        upload = SimpleUploadedFile("products.csv", b"sku,name\nSKU-BIG,Too big for the cap\n")
+        response = self.client.post("/api/products/import/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(Product.objects.filter(sku="SKU-BIG").exists())
+
+    def test_file_is_imported(self):
+        upload = SimpleUploadedFile("products.ndjson", b'{"sku": "SKU-HTTP", "name": "Http"}\n')
+        response = self.client.post("/api/products/import/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["upserted"], 1)
+        self.assertTrue(Product.objects.filter(sku="SKU-HTTP").exists())
@@ -0,0 +1,45 @@
+import base64
+
+from django.test import SimpleTestCase
+
+from flash_promo import codecs
+
+
+def payload_format(packed: str) -> int:
+    return base64.b64decode(packed)[0]
+
+
+class PackIdsTests(SimpleTestCase):
+    def test_empty(self):
+        self.assertEqual(codecs.unpack_ids(codecs.pack_ids([])), [])
+
+    def test_sorts_and_drops_duplicates(self):
+        self.assertEqual(codecs.unpack_ids(codecs.pack_ids([9, 3, 3, 1])), [1, 3, 9])
+
+    def test_large_gaps(self):
+        ids = [1, 2, 300, 2**31, 2**40 + 7, 2**62]
+        self.assertEqual(codecs.unpack_ids(codecs.pack_ids(ids)), ids)
+
+    def test_zlib_branch(self):
+        ids = list(range(1, 5001))
+        packed = codecs.pack_ids(ids)
+        self.assertEqual(payload_format(packed), codecs.FORMAT_VARINT_ZLIB)
+        self.assertEqual(codecs.unpack_ids(packed), ids)
+
+    def test_small_or_uncompressed_payload_is_plain_varint(self):
+        ids = list(range(1, 5001))
+        self.assertEqual(payload_format(codecs.pack_ids([1, 2, 3])), codecs.FORMAT_VARINT)
+        packed = codecs.pack_ids(ids, compress=False)
+        self.assertEqual(payload_format(packed), codecs.FORMAT_VARINT)
+        self.assertEqual(codecs.unpack_ids(packed), ids)
+
+    def test_rejects_negative_and_broken_payloads(self):
+        with self.assertRaises(ValueError):
+            codecs.pack_ids([1, -2])
+        with self.assertRaises(ValueError):
+            codecs.unpack_ids("")
+        with self.assertRaises(ValueError):
+            codecs.unpack_ids(base64.b64encode(bytes([0x7F, 1])).decode())
+        # Varint cortado: el ultimo byte tiene el bit de continuacion
+        with self.assertRaises(ValueError):
+            codecs.unpack_ids(base64.b64encode(bytes([codecs.FORMAT_VARINT, 0x80])).decode())
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from flash_promo.exports import RESERVATION_COLUMNS
+from flash_promo.models import NotificationLog, Reservation
+from flash_promo.tests.factories import make_promo, make_store_product, make_users
+
+
+@override_settings(EXPORT_CHUNK_SIZE=1)  # varios fetch del cursor por exportacion
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        self.promo = make_promo()
+        self.other_promo = make_promo(store_product=make_store_product(sku="SKU-TEST-2"))
+        self.alice, self.bob = make_users("alice", "bob")
+        self.today = timezone.localdate()
+
+        self.reservations = [
+            Reservation.objects.create(
+                promo=promo,
+                store_product=promo.store_product,
+                user=user,
+                token=f"export-{user.username}-{promo.pk}",
+                expires_at=timezone.now(),
+            )
+            for promo, user in (
+                (self.promo, self.alice), (self.promo, self.bob), (self.other_promo, self.alice)
+            )
+        ]
+        for user in (self.alice, self.bob):
+            NotificationLog.objects.create(user=user, promo=self.promo, sent_date=self.today)
+
+    def export(self, path, **params):
+        response = self.client.get(path, {"start": self.today, "end": self.today, **params})
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_reservations_csv(self):
+        response, body = self.export("/exports/reservations", promo_id=self.promo.pk)
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(tuple(rows[0]), RESERVATION_COLUMNS)
+        self.assertEqual(
+            sorted(row[1] for row in rows[1:]),
+            sorted(reservation.token for reservation in self.reservations[:2]),
+        )
+
+    def test_notifications_ndjson(self):
+        response, body = self.export("/exports/notifications", file_format="ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(
+            sorted(line["user_id"] for line in lines), sorted([self.alice.pk, self.bob.pk])
+        )
+        self.assertEqual({line["sent_date"] for line in lines}, {self.today.isoformat()})
+
+    def test_gzip(self):
+        response, body = self.export("/exports/reservations", gzip="true")
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertTrue(response["Content-Disposition"].endswith('.csv.gz"'))
+        rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode())))
+        self.assertEqual(tuple(rows[0]), RESERVATION_COLUMNS)
+        self.assertEqual(len(rows), 1 + len(self.reservations))
+
+    def test_only_staff(self):
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(
+            "/exports/reservations", {"start": self.today, "end": self.today}
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,73 @@
+import json
+import uuid
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django_redis import get_redis_connection
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from flash_promo import outbox
+from flash_promo.constants import FlashPromoStatus, OutboxEventType
+from flash_promo.models import OutboxEvent
+
+PREFIX = f"flash_promo:test:{uuid.uuid4().hex[:8]}:"
+
+
+@override_settings(OUTBOX_STREAM=f"{PREFIX}events", OUTBOX_CHANNEL_PREFIX=f"{PREFIX}events:")
+class OutboxRelayTests(TestCase):
+    def setUp(self):
+        self.redis = get_redis_connection("default")
+        self.addCleanup(self.redis.delete, f"{PREFIX}events")
+
+    def record_events(self):
+        outbox.record(
+            outbox.promo_status_event(1, FlashPromoStatus.ACTIVE),
+            outbox.stock_event(2, -1, 9),
+        )
+        return list(OutboxEvent.objects.order_by("id"))
+
+    def test_relay_publishes_in_order_and_deletes_the_rows(self):
+        events = self.record_events()
+        pubsub = self.redis.pubsub()
+        self.addCleanup(pubsub.close)
+        channel = f"{PREFIX}events:{OutboxEventType.STOCK_CHANGED}"
+        pubsub.subscribe(channel)
+        pubsub.get_message(timeout=1)  # confirmacion del subscribe
+
+        self.assertEqual(outbox.relay_batch(), 2)
+
+        stream = [
+            json.loads(fields[b"event"]) for _id, fields in self.redis.xrange(f"{PREFIX}events")
+        ]
+        self.assertEqual([message["id"] for message in stream], [event.pk for event in events])
+        self.assertEqual(stream[0]["type"], OutboxEventType.PROMO_STATUS_CHANGED)
+        self.assertEqual(stream[1]["payload"], {"store_product_id": 2, "delta": -1, "stock": 9})
+
+        published = pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+        self.assertEqual(published["channel"].decode(), channel)
+        self.assertEqual(json.loads(published["data"])["id"], events[1].pk)
+
+        # Publicados: salen del outbox y el siguiente relay no tiene nada
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(outbox.relay_batch(), 0)
+
+    def test_relay_respects_the_batch_size(self):
+        events = self.record_events()
+        self.assertEqual(outbox.relay_batch(batch_size=1), 1)
+        self.assertEqual(list(OutboxEvent.objects.values_list("pk", flat=True)), [events[1].pk])
+
+    def test_redis_failure_keeps_the_rows(self):
+        events = self.record_events()
+        connection = mock.Mock()
+        connection.pipeline.return_value.execute.side_effect = RedisConnectionError("down")
+
+        with mock.patch("flash_promo.outbox.get_redis_connection", return_value=connection):
+            with self.assertRaises(RedisConnectionError):
+                outbox.relay_batch()
+
+        # Rollback: los eventos siguen ahi para el proximo relay
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by("id").values_list("pk", flat=True)),
+            [event.pk for event in events],
+        )
+        self.assertEqual(self.redis.xlen(f"{PREFIX}events"), 0)
@@ -0,0 +1,104 @@
+from datetime import UTC, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from flash_promo.models import NotificationLog, Reservation
+from flash_promo.partitions import (
+    attached_partitions,
+    default_partition_name,
+    ensure_partitions,
+    maintain_partitions,
+    partition_name,
+)
+from flash_promo.tests.factories import make_promo, make_users
+
+NOTIFICATION_LOG = NotificationLog._meta.db_table
+RESERVATION = Reservation._meta.db_table
+
+
+def partition_of(model, pk) -> str:
+    # Particion fisica donde quedo la fila
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT tableoid::regclass::text FROM {model._meta.db_table} WHERE id = %s", [pk]
+        )
+        return cursor.fetchone()[0]
+
+
+def table_exists(name: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        return cursor.fetchone()[0]
+
+
+class PartitionMaintenanceTests(TestCase):
+    def setUp(self):
+        self.promo = make_promo()
+        [self.user] = make_users("alice")
+        self.today = timezone.localdate()
+
+    def test_rows_in_default_move_to_the_new_partition(self):
+        # Mas alla de lo que premakea la migracion: ese dia todavia no tiene particion
+        day = self.today + timedelta(days=30)
+        self.assertNotIn(day, attached_partitions(RESERVATION))
+
+        log = NotificationLog.objects.create(user=self.user, promo=self.promo, sent_date=day)
+        reservation = Reservation.objects.create(
+            promo=self.promo,
+            store_product=self.promo.store_product,
+            user=self.user,
+            token="late-maintenance",
+            expires_at=timezone.now(),
+        )
+        Reservation.objects.filter(pk=reservation.pk).update(
+            created_at=datetime.combine(day, time(12), tzinfo=UTC)
+        )
+        self.assertEqual(
+            partition_of(NotificationLog, log.pk), default_partition_name(NOTIFICATION_LOG)
+        )
+        self.assertEqual(
+            partition_of(Reservation, reservation.pk), default_partition_name(RESERVATION)
+        )
+
+        with override_settings(PARTITION_PREMAKE_DAYS=30):
+            with self.assertLogs("flash_promo.partitions", "WARNING"):
+                report = maintain_partitions()
+
+        self.assertIn(partition_name(NOTIFICATION_LOG, day), report[NOTIFICATION_LOG]["created"])
+        self.assertIn(partition_name(RESERVATION, day), report[RESERVATION]["created"])
+        self.assertEqual(partition_of(NotificationLog, log.pk), partition_name(NOTIFICATION_LOG, day))
+        self.assertEqual(partition_of(Reservation, reservation.pk), partition_name(RESERVATION, day))
+
+    def test_existing_partitions_are_kept(self):
+        day = self.today + timedelta(days=1)
+        ensure_partitions(RESERVATION, day, day)
+        self.assertEqual(ensure_partitions(RESERVATION, day, day), [])
+
+    def test_expired_partitions_are_detached(self):
+        day = self.today - timedelta(days=settings.RESERVATION_RETENTION_DAYS + 5)
+        name = partition_name(RESERVATION, day)
+        ensure_partitions(RESERVATION, day, day)
+
+        with override_settings(PARTITION_DROP_DETACHED=False):
+            report = maintain_partitions()
+
+        self.assertIn(name, report[RESERVATION]["detached"])
+        self.assertNotIn(day, attached_partitions(RESERVATION))
+        self.assertTrue(table_exists(name))
+        self.assertIn(
+            partition_name(RESERVATION, self.today), attached_partitions(RESERVATION).values()
+        )
+
+    @override_settings(PARTITION_DROP_DETACHED=True)
+    def test_expired_partitions_are_dropped(self):
+        day = self.today - timedelta(days=settings.NOTIFICATION_LOG_RETENTION_DAYS + 5)
+        name = partition_name(NOTIFICATION_LOG, day)
+        ensure_partitions(NOTIFICATION_LOG, day, day)
+
+        report = maintain_partitions()
+
+        self.assertIn(name, report[NOTIFICATION_LOG]["detached"])
+        self.assertFalse(table_exists(name))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from flash_promo.constants import FlashPromoStatus
+from flash_promo.models import FlashPromo
+from flash_promo.tests.factories import make_promo, make_store_product
+
+
+class FlashPromoBatchCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        self.store_product = make_store_product()
+        self.start = timezone.now() + timedelta(days=1)
+
+    def item(self, starts_after: int, ends_after: int, store_product_id: int | None = None):
+        # Ventana en horas desde self.start
+        return {
+            "store_product_id": store_product_id or self.store_product.pk,
+            "promo_price": "50",
+            "starts_at": (self.start + timedelta(hours=starts_after)).isoformat(),
+            "ends_at": (self.start + timedelta(hours=ends_after)).isoformat(),
+        }
+
+    def post(self, *items):
+        return self.client.post("/promos/batch", {"promos": list(items)}, format="json")
+
+    def test_adjacent_windows_are_created(self):
+        response = self.post(self.item(0, 1), self.item(1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            FlashPromo.objects.filter(
+                store_product=self.store_product, status=FlashPromoStatus.SCHEDULED
+            ).count(),
+            2,
+        )
+
+    def test_overlapping_items_are_both_rejected(self):
+        other = make_store_product(sku="SKU-TEST-2")
+        response = self.post(self.item(0, 1, other.pk), self.item(0, 2), self.item(1, 3))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["promos"]
+        # El error queda en el indice de cada item; el de otro store product pasa
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]["starts_at"], "Overlaps with item 2 for this store product.")
+        self.assertEqual(errors[2]["starts_at"], "Overlaps with item 1 for this store product.")
+        self.assertFalse(
+            FlashPromo.objects.filter(store_product__in=[self.store_product, other]).exists()
+        )
+
+    def test_overlap_with_existing_promo(self):
+        promo = make_promo(
+            store_product=self.store_product,
+            status=FlashPromoStatus.SCHEDULED,
+            activated_at=None,
+            starts_at=self.start,
+            ends_at=self.start + timedelta(hours=2),
+        )
+        response = self.post(self.item(3, 4), self.item(1, 3))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["promos"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(
+            errors[1]["starts_at"], f"Overlaps with promo {promo.pk} for this store product."
+        )
+
+    def test_finished_promo_does_not_block(self):
+        make_promo(
+            store_product=self.store_product,
+            status=FlashPromoStatus.FINISHED,
+            starts_at=self.start,
+            ends_at=self.start + timedelta(hours=2),
+        )
+        response = self.post(self.item(1, 3))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_unknown_store_product(self):
+        missing = self.store_product.pk + 1000
+        response = self.post(self.item(0, 1), self.item(0, 1, missing))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["promos"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1], {"store_product_id": "StoreProduct does not exist."})
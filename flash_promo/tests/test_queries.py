@@ -0,0 +1,36 @@
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+
+from flash_promo.models import Profile
+from flash_promo.queries import profiles_in_tile, radius_tiles
+from flash_promo.tests.factories import STORE_LOCATION, make_users
+
+
+class RadiusTilesTests(TestCase):
+    def test_profiles_on_tile_edges_belong_to_exactly_one_tile(self):
+        tiles = radius_tiles(Point(*STORE_LOCATION, srid=4326), radius_m=2000, per_side=3)
+        # Bordes compartidos: los mismos floats que usan las tiles
+        xs = sorted({tile[0] for tile in tiles})
+        ys = sorted({tile[1] for tile in tiles})
+        mid_y = (ys[0] + ys[1]) / 2
+        locations = [
+            (xs[0], ys[0]),  # esquina exterior de la primera tile
+            (xs[1], ys[1]),  # esquina comun a cuatro tiles
+            (xs[2], ys[2]),
+            (xs[1], ys[2]),
+            (xs[1], mid_y),  # borde entre dos tiles
+            (xs[2], mid_y),
+            ((xs[0] + xs[1]) / 2, ys[1]),
+        ]
+        users = make_users(*(f"edge{i}" for i in range(len(locations))))
+        profiles = Profile.objects.filter(pk__in=[
+            Profile.objects.create(user=user, geom=Point(x, y, srid=4326)).pk
+            for user, (x, y) in zip(users, locations)
+        ])
+
+        seen = []
+        for tile in tiles:
+            seen.extend(profiles_in_tile(profiles, tile).values_list("pk", flat=True))
+
+        self.assertEqual(len(seen), len(locations))
+        self.assertEqual(set(seen), set(profiles.values_list("pk", flat=True)))
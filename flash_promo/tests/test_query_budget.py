@@ -0,0 +1,42 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from flash_promo import services
+from flash_promo.query_budget import (
+    QueryBudgetExceeded,
+    QueryStats,
+    assert_query_budget,
+    record_request_stats,
+)
+from flash_promo.tests.factories import make_promo, make_users
+
+
+class QueryBudgetTests(TestCase):
+    def test_hold_query_budget(self):
+        promo = make_promo(stock=1)
+        [alice] = make_users("alice")
+        # SAVEPOINT, FOR UPDATE, stock, reserva, outbox, lista de espera, RELEASE
+        with assert_query_budget(7):
+            services.hold_store_product_db(alice, promo)
+
+    def test_block_over_budget_fails(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                User.objects.count()
+                User.objects.exists()
+
+
+@mock.patch("flash_promo.query_budget.metrics")
+class RecordRequestStatsTests(SimpleTestCase):
+    def test_over_budget_is_counted(self, metrics):
+        self.assertTrue(record_request_stats("cart/reserve", QueryStats(count=10), 9))
+        metrics.QUERY_BUDGET_EXCEEDED.labels.assert_called_once_with(endpoint="cart/reserve")
+        metrics.QUERY_BUDGET_EXCEEDED.labels.return_value.inc.assert_called_once_with()
+
+    def test_within_or_without_budget(self, metrics):
+        self.assertFalse(record_request_stats("cart/reserve", QueryStats(count=9), 9))
+        self.assertFalse(record_request_stats("promos/active", QueryStats(count=50), None))
+        metrics.QUERY_BUDGET_EXCEEDED.labels.assert_not_called()
+        self.assertEqual(metrics.REQUEST_DB_QUERIES.labels.call_count, 2)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from flash_promo import reconciliation, services
+from flash_promo.admin import _record_stock_change
+from flash_promo.constants import ReservationStatus
+from flash_promo.models import Reservation, StockAudit, StoreProduct
+from flash_promo.tests.factories import make_promo, make_users
+
+
+class ReconciliationTests(TestCase):
+    # 0003_initial_data ya carga un StoreProduct: las aserciones solo miran el de la prueba
+
+    def setUp(self):
+        self.promo = make_promo(stock=3)
+        self.store_product = self.promo.store_product
+        self.alice, self.bob = make_users("alice", "bob")
+        # Primera corrida: el stock actual es la linea base
+        reconciliation.reconcile_stock()
+        self.assertEqual(self.audit().drift, 0)
+
+    def audit(self) -> StockAudit:
+        return StockAudit.objects.get(store_product=self.store_product)
+
+    def assertNoDrift(self):
+        report = reconciliation.reconcile_stock()
+        self.assertNotIn(self.store_product.pk, report.drifted)
+        self.assertEqual(self.audit().drift, 0)
+
+    def test_hold_keeps_drift_at_zero(self):
+        services.hold_store_product_db(self.alice, self.promo)
+        self.assertNoDrift()
+
+    def test_cancel_keeps_drift_at_zero(self):
+        reservation = services.hold_store_product_db(self.alice, self.promo)
+        services.cancel_or_expire_reservation(reservation)
+        self.store_product.refresh_from_db()
+        self.assertEqual(self.store_product.stock, 3)
+        self.assertNoDrift()
+
+    def test_handoff_keeps_drift_at_zero(self):
+        StoreProduct.objects.filter(pk=self.store_product.pk).update(stock=1)
+        reconciliation.rebaseline([self.store_product.pk])
+        reservation = services.hold_store_product_db(self.alice, self.promo)
+        services.join_waitlist(self.bob, self.promo)
+        services.cancel_or_expire_reservation(reservation)
+
+        self.assertTrue(
+            Reservation.objects.filter(user=self.bob, status=ReservationStatus.HOLD).exists()
+        )
+        self.assertNoDrift()
+
+    def test_manual_edit_is_rebaselined(self):
+        with transaction.atomic():
+            store_product = StoreProduct.objects.select_for_update().get(pk=self.store_product.pk)
+            previous_stock = store_product.stock
+            store_product.stock = 10
+            store_product.save(update_fields=["stock"])
+            _record_stock_change(store_product, previous_stock)
+        self.assertNoDrift()
+
+    def test_stock_change_without_rebaseline_drifts(self):
+        StoreProduct.objects.filter(pk=self.store_product.pk).update(stock=5)
+        report = reconciliation.reconcile_stock()
+        self.assertEqual(report.drifted.get(self.store_product.pk), 2)
+
+        report = reconciliation.reconcile_stock(repair=True)
+        self.assertNotIn(self.store_product.pk, report.drifted)
+        self.assertEqual(self.audit().drift, 0)
+        self.store_product.refresh_from_db()
+        self.assertEqual(self.store_product.stock, 3)
+
+    def test_watermark_stops_at_pending_hold(self):
+        now = timezone.now()
+        created_at = now - settings.STOCK_RECONCILE_SETTLE - timedelta(minutes=5)
+        reservation = services.hold_store_product_db(self.alice, self.promo)
+        Reservation.objects.filter(token=reservation.token).update(created_at=created_at)
+
+        self.assertEqual(reconciliation._next_watermark(now, None), created_at)
+
+        # Confirmada ya no cambia de estado: el watermark puede pasarla
+        Reservation.objects.filter(token=reservation.token).update(
+            status=ReservationStatus.CONFIRMED
+        )
+        self.assertEqual(
+            reconciliation._next_watermark(now, None), now - settings.STOCK_RECONCILE_SETTLE
+        )
+
+    def test_watermark_never_moves_back(self):
+        now = timezone.now()
+        previous = now - timedelta(minutes=1)
+        self.assertEqual(reconciliation._next_watermark(now, previous), previous)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase
+
+from flash_promo.models import Reservation
+from flash_promo.routers import (
+    REPLICA_DB_ALIAS,
+    ReplicaRouter,
+    replica_alias,
+    replica_lag_seconds,
+    use_replica,
+)
+
+
+def lag(seconds):
+    return mock.patch("flash_promo.routers.replica_lag_seconds", return_value=seconds)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_the_primary_outside_use_replica(self):
+        with lag(0):
+            self.assertEqual(self.router.db_for_read(Reservation), DEFAULT_DB_ALIAS)
+
+    def test_write_pins_the_block_to_the_primary(self):
+        with lag(0):
+            with use_replica():
+                self.assertEqual(self.router.db_for_read(Reservation), REPLICA_DB_ALIAS)
+                self.assertEqual(self.router.db_for_write(Reservation), DEFAULT_DB_ALIAS)
+                self.assertEqual(self.router.db_for_read(Reservation), DEFAULT_DB_ALIAS)
+
+            # El pin no sale del bloque
+            with use_replica():
+                self.assertEqual(self.router.db_for_read(Reservation), REPLICA_DB_ALIAS)
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        for seconds in (None, float("inf"), 60):
+            with self.subTest(lag=seconds), lag(seconds):
+                self.assertEqual(replica_alias(), DEFAULT_DB_ALIAS)
+
+
+@mock.patch("flash_promo.routers.replica_configured", return_value=True)
+class ReplicaLagTests(SimpleTestCase):
+    def lag_for(self, value):
+        connections = {REPLICA_DB_ALIAS: mock.MagicMock()}
+        cursor = connections[REPLICA_DB_ALIAS].cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (value,)
+        with mock.patch("flash_promo.routers.connections", connections):
+            return replica_lag_seconds(force=True)
+
+    def test_null_lag_is_infinite(self, _configured):
+        # Sin wal receiver o sin nada reproducido
+        self.assertEqual(self.lag_for(None), float("inf"))
+
+    def test_lag_in_seconds(self, _configured):
+        self.assertEqual(self.lag_for(0), 0.0)
+        self.assertEqual(self.lag_for(1.5), 1.5)
+
+    def test_unreachable_replica(self, _configured):
+        connections = {REPLICA_DB_ALIAS: mock.MagicMock()}
+        connections[REPLICA_DB_ALIAS].cursor.side_effect = OSError("down")
+        with mock.patch("flash_promo.routers.connections", connections):
+            with self.assertLogs("flash_promo.routers", "ERROR"):
+                self.assertIsNone(replica_lag_seconds(force=True))
@@ -0,0 +1,50 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from flash_promo.models import StoreProduct
+from flash_promo.tests.factories import STORE_LOCATION, make_store, make_store_product
+
+LON, LAT = STORE_LOCATION
+
+
+class StoreCoveringTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.in_stock = make_store_product(stock=5, store=make_store("In stock"))
+        self.out_of_stock = StoreProduct.objects.create(
+            store=make_store("Out of stock", (LON + 0.001, LAT)),
+            product=self.in_stock.product,
+            stock=0,
+            base_price=self.in_stock.base_price,
+        )
+        self.other_product = make_store_product(
+            store=make_store("Other product", (LON + 0.002, LAT)), sku="SKU-TEST-2"
+        )
+        # ~5.5 km: fuera del radio de promo
+        self.far = make_store_product(store=make_store("Far", (LON + 0.05, LAT)), sku="SKU-TEST-3")
+
+    def covering(self, **params):
+        response = self.client.get("/api/stores/covering/", {"lat": LAT, "lon": LON, **params})
+        self.assertEqual(response.status_code, 200)
+        return [store["id"] for store in response.data["results"]]
+
+    def test_covering_without_filters(self):
+        self.assertEqual(
+            self.covering(),
+            [self.in_stock.store_id, self.out_of_stock.store_id, self.other_product.store_id],
+        )
+
+    def test_covering_filters_by_product(self):
+        self.assertEqual(
+            self.covering(product_id=self.in_stock.product_id),
+            [self.in_stock.store_id, self.out_of_stock.store_id],
+        )
+
+    def test_covering_filters_by_stock(self):
+        self.assertEqual(
+            self.covering(product_id=self.in_stock.product_id, in_stock="true"),
+            [self.in_stock.store_id],
+        )
+        self.assertNotIn(
+            self.far.store_id, self.covering(product_id=self.far.product_id, in_stock="true")
+        )
@@ -0,0 +1,120 @@
+import random
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django_redis import get_redis_connection
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from flash_promo.throttling import CartRateLimitMixin, parse_rate
+
+# Identidades al azar: no chocan con las keys de otra corrida sobre el mismo Redis
+IP = f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+PROMO_ID = random.randint(10**8, 10**9)
+USER_ID = random.randint(10**8, 10**9)
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_valid_rates(self):
+        self.assertEqual(parse_rate("10/10s"), (10, 10_000))
+        self.assertEqual(parse_rate("60/m"), (60, 60_000))
+        self.assertEqual(parse_rate("1000/2h"), (1000, 7_200_000))
+
+    def test_invalid_rates(self):
+        invalid = ("", "10", "10/", "10/10", "10/d", "x/s", "10/1.5s", "0/s", "10/0s", "1/2/s", None)
+        for rate in invalid:
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                parse_rate(rate)
+
+
+class CountingAuthentication(BaseAuthentication):
+    calls = 0
+
+    def authenticate(self, request):
+        type(self).calls += 1
+        return User(pk=USER_ID, username="alice"), None
+
+
+class ReserveView(CartRateLimitMixin, APIView):
+    authentication_classes = [CountingAuthentication]
+    permission_classes = []
+    rate_limit_scope = "reserve"
+
+    def post(self, request):
+        return Response({"ok": True})
+
+
+def rate_limits(**limits):
+    return override_settings(CART_RATE_LIMITS={"reserve": limits})
+
+
+class CartRateLimitTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.redis = get_redis_connection("default")
+        CountingAuthentication.calls = 0
+        self.addCleanup(self.redis.delete, *self.keys().values())
+
+    def keys(self):
+        return {
+            "ip": f"flash_promo:ratelimit:reserve:ip:{IP}",
+            "promo": f"flash_promo:ratelimit:reserve:promo:{PROMO_ID}",
+            "user": f"flash_promo:ratelimit:reserve:user:{USER_ID}",
+        }
+
+    def reserve(self):
+        request = self.factory.post(
+            "/cart/reserve", {"promo_id": PROMO_ID}, format="json", REMOTE_ADDR=IP
+        )
+        return ReserveView.as_view()(request)
+
+    @rate_limits(ip="2/m", promo="100/m", user="100/m")
+    def test_over_the_limit_gets_429_with_retry_after(self):
+        self.assertEqual(self.reserve().status_code, 200)
+        self.assertEqual(self.reserve().status_code, 200)
+
+        response = self.reserve()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 60)
+        # Rechazada antes de autenticar, y sin consumir cupo de los demas scopes
+        self.assertEqual(CountingAuthentication.calls, 2)
+        self.assertEqual(self.redis.zcard(self.keys()["promo"]), 2)
+
+    @rate_limits(ip="100/m", promo="100/m", user="1/m")
+    def test_user_limit_runs_after_authentication(self):
+        self.assertEqual(self.reserve().status_code, 200)
+        self.assertEqual(self.reserve().status_code, 429)
+        self.assertEqual(CountingAuthentication.calls, 2)
+
+    @rate_limits(ip="100/m", promo="100/m", user="100/m")
+    def test_one_key_per_scope(self):
+        with mock.patch.object(
+            ReserveView, "check_rate_limits", autospec=True,
+            side_effect=CartRateLimitMixin.check_rate_limits,
+        ) as check:
+            self.reserve()
+
+        # IP y promo antes de autenticar, el usuario despues
+        self.assertEqual(
+            [call.args[1] for call in check.call_args_list],
+            [{"ip": IP, "promo": str(PROMO_ID)}, {"user": str(USER_ID)}],
+        )
+        for key in self.keys().values():
+            self.assertEqual(self.redis.zcard(key), 1)
+
+    @rate_limits(ip="1/m")
+    def test_scopes_without_limit_are_skipped(self):
+        self.assertEqual(self.reserve().status_code, 200)
+        self.assertEqual(self.redis.exists(self.keys()["promo"], self.keys()["user"]), 0)
+
+    @rate_limits(ip="1/m")
+    def test_fails_open_when_redis_is_down(self):
+        with mock.patch(
+            "flash_promo.throttling._sliding_window", side_effect=ConnectionError("down")
+        ):
+            with self.assertLogs("flash_promo.throttling", "ERROR"):
+                self.assertEqual(self.reserve().status_code, 200)
+                self.assertEqual(self.reserve().status_code, 200)
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.test import TestCase
+
+from flash_promo import services
+from flash_promo.constants import ReservationStatus, WaitlistStatus
+from flash_promo.models import Reservation, StoreProduct, WaitlistEntry
+from flash_promo.tests.factories import make_promo, make_users
+
+
+class WaitlistHandoffTests(TestCase):
+    def setUp(self):
+        self.promo = make_promo(stock=1)
+        self.store_product = self.promo.store_product
+        self.alice, self.bob, self.carol = make_users("alice", "bob", "carol")
+
+    def holds(self, user) -> int:
+        return Reservation.objects.filter(user=user, status=ReservationStatus.HOLD).count()
+
+    def stock(self) -> int:
+        self.store_product.refresh_from_db(fields=["stock"])
+        return self.store_product.stock
+
+    def test_released_unit_goes_to_the_oldest_waiting_user(self):
+        reservation = services.hold_store_product_db(self.alice, self.promo)
+        self.assertEqual(services.join_waitlist(self.bob, self.promo), 1)
+        self.assertEqual(services.join_waitlist(self.carol, self.promo), 2)
+
+        services.cancel_or_expire_reservation(reservation)
+
+        self.assertEqual(self.holds(self.bob), 1)
+        self.assertEqual(self.holds(self.carol), 0)
+        self.assertEqual(self.stock(), 0)
+        entry = WaitlistEntry.objects.get(user=self.bob)
+        self.assertEqual(entry.status, WaitlistStatus.SERVED)
+        self.assertTrue(Reservation.objects.filter(token=entry.reservation_token).exists())
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.carol).status, WaitlistStatus.WAITING
+        )
+
+    def test_join_twice_keeps_one_entry(self):
+        services.hold_store_product_db(self.alice, self.promo)
+        services.join_waitlist(self.bob, self.promo)
+        self.assertEqual(services.join_waitlist(self.bob, self.promo), 1)
+        self.assertEqual(WaitlistEntry.objects.filter(user=self.bob).count(), 1)
+
+    def test_user_served_by_a_retry_gets_no_second_hold(self):
+        reservation = services.hold_store_product_db(self.alice, self.promo)
+        services.join_waitlist(self.bob, self.promo)
+        # Reposicion sin drenar la lista: bob reintenta y consigue la unidad
+        StoreProduct.objects.filter(pk=self.store_product.pk).update(stock=1)
+        services.hold_store_product_db(self.bob, self.promo)
+        self.assertEqual(WaitlistEntry.objects.get(user=self.bob).status, WaitlistStatus.SERVED)
+
+        services.cancel_or_expire_reservation(reservation)
+
+        self.assertEqual(self.holds(self.bob), 1)
+        self.assertEqual(self.stock(), 1)
+
+    def test_restock_drains_the_waitlist_first(self):
+        services.hold_store_product_db(self.alice, self.promo)
+        services.join_waitlist(self.bob, self.promo)
+        services.join_waitlist(self.carol, self.promo)
+
+        with transaction.atomic():
+            StoreProduct.objects.filter(pk=self.store_product.pk).update(stock=1)
+            self.assertEqual(services.drain_waitlist([self.store_product.pk]), 1)
+
+        self.assertEqual(self.holds(self.bob), 1)
+        self.assertEqual(self.holds(self.carol), 0)
+        self.assertEqual(self.stock(), 0)
@@ -0,0 +1,135 @@
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from flash_promo import metrics
+
+logger = logging.getLogger(__name__)
+
+# Ventana deslizante sobre ZSETs (score = ms). Primero revisa todas las
+# ventanas y solo si todas tienen cupo registra la request en cada una:
+# una request rechazada no consume cupo.
+# KEYS: una por scope. ARGV: now_ms, member, y (window_ms, limit) por key.
+# Devuelve {indice del scope rechazado (0 = permitido), ms hasta que haya cupo}
+SLIDING_WINDOW = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[1 + i * 2])
+    local limit = tonumber(ARGV[2 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, tonumber(oldest[2]) + window - now}
+    end
+end
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[1 + i * 2])
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, window)
+end
+return {0, 0}
+"""
+
+UNITS = {"s": 1, "m": 60, "h": 3600}
+
+_script = None
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """'10/10s', '60/m' -> (limit, window in ms).
+    Raises ValueError for anything else"""
+
+    try:
+        limit, period = rate.split("/")
+        limit, amount = int(limit), int(period[:-1] or 1)
+        seconds = UNITS[period[-1]]
+    except (AttributeError, IndexError, KeyError, ValueError):
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '10/10s' or '60/m'.") from None
+    if limit < 1 or amount < 1:
+        raise ValueError(f"Invalid rate {rate!r}, limit and period must be positive.")
+    return limit, amount * seconds * 1000
+
+
+def _sliding_window():
+    global _script
+    if _script is None:
+        _script = get_redis_connection("default").register_script(SLIDING_WINDOW)
+    return _script
+
+
+class CartRateLimitMixin:
+    """
+    Sliding-window rate limits (Redis) per IP, per promo and per user.
+    IP and promo are evaluated in initial() before authentication, so a
+    throttled flood never reaches the ORM; the user limit is evaluated
+    with the throttles, once request.user is known (any authentication
+    class). Limits come from CART_RATE_LIMITS[rate_limit_scope];
+    fail-open if Redis is down.
+    """
+    rate_limit_scope = None
+
+    def rate_limit_keys(self, request) -> dict[str, str]:
+        # Solo lo que se conoce sin autenticar (request.user dispararia la autenticacion)
+        idents = {"ip": BaseThrottle().get_ident(request)}
+        promo_id = self.rate_limit_promo_id(request)
+        if promo_id is not None:
+            idents["promo"] = str(promo_id)
+        return idents
+
+    def rate_limit_promo_id(self, request):
+        if self.rate_limit_scope != "reserve":
+            return None
+        try:
+            return int(request.data.get("promo_id"))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def user_rate_limit_key(self, request) -> str | None:
+        user = request.user
+        if user is None or not user.is_authenticated:
+            return None
+        return str(user.pk)
+
+    def check_rate_limits(self, idents: dict[str, str]):
+        limits = settings.CART_RATE_LIMITS.get(self.rate_limit_scope) or {}
+        keys, args = [], []
+        scopes = []
+        for scope, ident in idents.items():
+            if scope not in limits:
+                continue
+            limit, window_ms = parse_rate(limits[scope])
+            scopes.append(scope)
+            keys.append(f"flash_promo:ratelimit:{self.rate_limit_scope}:{scope}:{ident}")
+            args.extend([window_ms, limit])
+        if not keys:
+            return
+
+        now_ms = int(time.time() * 1000)
+        try:
+            rejected, retry_ms = _sliding_window()(
+                keys=keys, args=[now_ms, f"{now_ms}:{uuid.uuid4().hex[:8]}", *args]
+            )
+        except Exception:
+            logger.exception("rate limit check failed, allowing the request")
+            return
+
+        if rejected:
+            scope = scopes[int(rejected) - 1]
+            metrics.THROTTLED.labels(endpoint=self.rate_limit_scope, scope=scope).inc()
+            raise Throttled(wait=max(1, -(-int(retry_ms) // 1000)))
+
+    def initial(self, request, *args, **kwargs):
+        self.check_rate_limits(self.rate_limit_keys(request))
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        super().check_throttles(request)
+        # Despues de autenticar: sesion, basic, token o force_authenticate
+        user = self.user_rate_limit_key(request)
+        if user is not None:
+            self.check_rate_limits({"user": user})
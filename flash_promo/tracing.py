@@ -0,0 +1,201 @@
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connections
+from opentelemetry import context, trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+tracer = trace.get_tracer("flash_promo")
+
+PUBLISHED_AT_HEADER = "x_flash_promo_published_at"
+MAX_STATEMENT_LENGTH = 500
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_tracing(service_name: str | None = None):
+    """Installs the tracer provider of this process (once).
+    With TRACING_ENABLED False nothing is installed and the
+    OpenTelemetry API hands out no-op spans"""
+
+    global _configured
+    if not settings.TRACING_ENABLED or _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        service_name = service_name or settings.TRACING_SERVICE_NAME
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            # Las tareas hijas heredan la decision de muestreo del padre
+            sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+        )
+        out = sys.stdout
+        if settings.TRACING_EXPORTER == "file":
+            # Un archivo por proceso: los workers no intercalan lineas
+            path = settings.TRACING_FILE_PATH.format(service=service_name, pid=os.getpid())
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            out = open(path, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(
+            service_name=service_name,
+            out=out,
+            # Una linea JSON por span
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+
+
+def span(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes):
+    """Child span of the current trace; a no-op when
+    there is no sampled trace in progress"""
+
+    if not trace.get_current_span().is_recording():
+        return nullcontext()
+    return tracer.start_as_current_span(name, kind=kind, attributes=attributes)
+
+
+def set_attributes(attributes: dict):
+    """Adds attributes to the current span (no-op when not sampled)"""
+
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(attributes)
+
+
+def db_span(execute, sql, params, many, context):
+    """execute_wrapper: one span per query of a sampled trace"""
+
+    if not trace.get_current_span().is_recording():
+        return execute(sql, params, many, context)
+    operation = sql.lstrip().split(" ", 1)[0].upper()
+    with tracer.start_as_current_span(
+        f"db {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.name": context["connection"].alias,
+            "db.statement": sql[:MAX_STATEMENT_LENGTH],
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def traced_queries():
+    with ExitStack() as stack:
+        if settings.TRACING_ENABLED:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(db_span))
+        yield
+
+
+# ---- Celery: propagacion del contexto por los headers de la tarea ----
+
+_task_spans = {}
+
+
+def on_before_task_publish(headers=None, **kwargs):
+    if not settings.TRACING_ENABLED or headers is None:
+        return
+    inject(headers)
+    headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+class _RequestGetter:
+    # Los headers propios del mensaje llegan como atributos de task.request
+    def get(self, carrier, key):
+        value = getattr(carrier, key, None)
+        return None if value is None else [value]
+
+    def keys(self, carrier):
+        return []
+
+
+_request_getter = _RequestGetter()
+
+
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    if not settings.TRACING_ENABLED:
+        return
+    # En el proceso que ejecuta (despues del fork de prefork)
+    configure_tracing()
+    parent = extract(task.request, getter=_request_getter)
+    task_span = tracer.start_span(
+        f"celery.task {task.name}",
+        context=parent,
+        kind=SpanKind.CONSUMER,
+        attributes={"celery.task_id": task_id, "celery.task_name": task.name},
+    )
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at and task_span.is_recording():
+        # Tiempo en cola (incluye el eta/countdown de las tareas programadas)
+        task_span.set_attribute("celery.queue_wait_ms", (time.time() - published_at) * 1000)
+    token = context.attach(trace.set_span_in_context(task_span))
+    queries = ExitStack()
+    queries.enter_context(traced_queries())
+    _task_spans[task_id] = (task_span, token, queries)
+
+
+def on_task_failure(task_id=None, exception=None, **kwargs):
+    entry = _task_spans.get(task_id)
+    if entry and exception is not None:
+        entry[0].record_exception(exception)
+        entry[0].set_status(Status(StatusCode.ERROR, str(exception)))
+
+
+def on_task_postrun(task_id=None, state=None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    task_span, token, queries = entry
+    queries.close()
+    if state:
+        task_span.set_attribute("celery.state", state)
+    task_span.end()
+    context.detach(token)
+
+
+class TracingMiddleware:
+    """
+    Server span per request (continues an incoming W3C traceparent)
+    and a child span per query. Goes first in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        configure_tracing()
+
+    def __call__(self, request):
+        if not settings.TRACING_ENABLED:
+            return self.get_response(request)
+
+        with tracer.start_as_current_span(
+            f"HTTP {request.method}",
+            context=extract(request.headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.method": request.method, "http.target": request.path},
+        ) as request_span, traced_queries():
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            if match and request_span.is_recording():
+                route = match.route or match.view_name
+                request_span.update_name(f"HTTP {request.method} {route}")
+                request_span.set_attribute("http.route", route)
+            request_span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                request_span.set_status(Status(StatusCode.ERROR))
+        return response
@@ -1,14 +1,25 @@
+import io
+
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.timezone import now
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.contrib.gis.geos import Point
 
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 
+from . import metrics, tracing
 from .permissions import IsAdminOrReadOnly
+from .pagination import IdCursorPagination, DistanceCursorPagination
 from .models import FlashPromo, Reservation, Product, StoreProduct, Store
 from .constants import FlashPromoStatus
 from .serializers import (
@@ -17,44 +28,80 @@ from .serializers import (
     ReservationResponseSerializer,
     ReservationTokenSerializer,
     ReservationStatusSerializer,
+    WaitlistResponseSerializer,
     ProductSerializer,
     StoreProductSerializer,
     StoreSerializer,
-    FlashPromoCreateSerializer
+    NearbyStoreSerializer,
+    NearbyStoresQuerySerializer,
+    FlashPromoCreateSerializer,
+    FlashPromoBatchCreateSerializer,
+    FlashPromoBatchResponseSerializer,
+    CatalogImportSerializer,
+    CatalogImportReportSerializer,
+    ExportQuerySerializer,
+)
+from .catalog import guess_format, import_products, import_store_products
+from .exports import STREAMERS, gzip_stream, notifications_export, reservations_export
+from .queries import (
+    active_promos_for_profile,
+    user_is_eligible_for_promo,
+    get_profile_by_user,
+    nearest_stores,
+    stores_covering_point,
 )
-from .queries import active_promos_for_profile, user_is_eligible_for_promo, get_profile_by_user
+from .routers import replica_alias, replica_configured, use_replica
 from .services import (
+    OutOfStock,
     hold_store_product_db,
+    join_waitlist,
     confirm_reservation,
     cancel_or_expire_reservation,
 )
+from .throttling import CartRateLimitMixin
 
 
 
 class ActivePromosView(APIView):
     permission_classes = [IsAuthenticated]
+    # auth + profile + promos (select_related, sin N+1)
+    query_budget = 3
 
     @extend_schema(
         responses={status.HTTP_200_OK: PromoListSerializer}
     )
     def get(self, request):
-        profile = get_profile_by_user(user=request.user)
-        active_promos_qs = active_promos_for_profile(profile)
-        print("active_promos:", active_promos_qs, flush=True)
-        data = PromoListSerializer(active_promos_qs, many=True).data
+        # Solo lectura: replica si esta al dia
+        with use_replica():
+            profile = get_profile_by_user(user=request.user)
+            active_promos_qs = active_promos_for_profile(profile)
+            with (
+                tracing.span("geo.active_promos", profile_id=profile.pk),
+                metrics.GEO_QUERY_SECONDS.labels(query="active_promos").time(),
+            ):
+                active_promos = list(active_promos_qs)
+        data = PromoListSerializer(active_promos, many=True).data
 
         return Response(data, status=status.HTTP_200_OK)
 
 
-class ReservePromoView(APIView):
+class ReservePromoView(CartRateLimitMixin, APIView):
     """
-    POST: Create the reservation for 60s if the profile meet both conditions
+    POST: Create the reservation for 60s if the profile meet both conditions.
+    Sin stock, el usuario queda en la lista de espera de la promo (202)
     """
     permission_classes = [IsAuthenticated]
+    rate_limit_scope = "reserve"
+    # auth + promo + profile + elegibilidad + lock + stock + reserva + outbox
+    # + salida de la lista de espera
+    query_budget = 9
 
     @extend_schema(
         request=ReservationCreateSerializer,
-        responses={status.HTTP_201_CREATED: ReservationResponseSerializer}
+        responses={
+            status.HTTP_201_CREATED: ReservationResponseSerializer,
+            status.HTTP_202_ACCEPTED: WaitlistResponseSerializer,
+        }
     )
     def post(self, request):
         serializer = ReservationCreateSerializer(data=request.data)
@@ -79,6 +126,15 @@ class ReservePromoView(APIView):
 
         try:
             hold_reservation = hold_store_product_db(request.user, promo)
+        except OutOfStock:
+            # La proxima unidad liberada se le asigna directamente (push con el aviso)
+            position = join_waitlist(request.user, promo)
+            return Response(
+                WaitlistResponseSerializer(
+                    {"detail": "Sold out, added to the waitlist", "position": position}
+                ).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -91,11 +147,14 @@ class ReservePromoView(APIView):
         return Response(reservation_serialized, status=status.HTTP_201_CREATED)
 
 
-class ConfirmReservationView(APIView):
+class ConfirmReservationView(CartRateLimitMixin, APIView):
     """
     PUT: Confirm a reservation. reservation_token is required
     """
     permission_classes = [IsAuthenticated]
+    rate_limit_scope = "checkout"
+    # auth + lock + estado + outbox; si expiro: lista de espera + reserva + entrada
+    query_budget = 7
 
     @extend_schema(
         request=ReservationTokenSerializer,
@@ -119,11 +178,15 @@ class ConfirmReservationView(APIView):
             status=status.HTTP_200_OK
         )
 
-class CancelReservationView(APIView):
+class CancelReservationView(CartRateLimitMixin, APIView):
     """
     PUT: cancela una reserva activa (o la marca expirada y devuelve stock).
     """
     permission_classes = [IsAuthenticated]
+    rate_limit_scope = "cancel"
+    # auth + reserva + lock de la reserva + lock + estado + lista de espera
+    # + (reserva + entrada del siguiente | stock) + outbox
+    query_budget = 9
 
     @extend_schema(
         request=ReservationTokenSerializer,
@@ -168,28 +231,214 @@ class FlashPromoCreateView(APIView):
         return Response(out, status=status.HTTP_201_CREATED)
 
 
+class FlashPromoBatchCreateView(APIView):
+    """
+    Create scheduled flash promos in batch.
+    One StoreProduct query and one INSERT for the whole batch.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    @extend_schema(
+        request=FlashPromoBatchCreateSerializer,
+        responses={status.HTTP_201_CREATED: FlashPromoBatchResponseSerializer},
+        summary="Create flash promos in batch"
+    )
+    def post(self, request):
+        ser = FlashPromoBatchCreateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        promos = ser.save()
+
+        out = FlashPromoBatchResponseSerializer(
+            {"created": len(promos), "ids": [promo.id for promo in promos]}
+        ).data
+        return Response(out, status=status.HTTP_201_CREATED)
+
+
+class ExportView(APIView):
+    """
+    GET: streams the rows of a date range as CSV or NDJSON (optionally gzip).
+    Rows are read with a server-side cursor, memory stays constant.
+    """
+    permission_classes = [IsAdminUser]
+    exporter = None
+    filename = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # Accept: text/csv no debe dar 406; los errores se siguen renderizando como JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        parameters=[ExportQuerySerializer],
+        responses={(status.HTTP_200_OK, "text/csv"): OpenApiTypes.BINARY},
+        summary="Streaming export (CSV / NDJSON)",
+    )
+    def get(self, request):
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        fmt = data["file_format"]
+
+        queryset, columns = type(self).exporter(
+            data["start"], data["end"], promo_id=data.get("promo_id")
+        )
+        streamer, content_type = STREAMERS[fmt]
+        chunks = streamer(queryset, columns)
+        filename = f"{self.filename}_{data['start']:%Y%m%d}_{data['end']:%Y%m%d}.{fmt}"
+        if data["gzip"]:
+            chunks = gzip_stream(chunks)
+            content_type, filename = "application/gzip", f"{filename}.gz"
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ReservationExportView(ExportView):
+    exporter = reservations_export
+    filename = "reservations"
+
+
+class NotificationExportView(ExportView):
+    exporter = notifications_export
+    filename = "notifications"
+
+
+class ReplicaReadMixin:
+    """
+    list/retrieve read from the replica (when healthy). A user that
+    just wrote through the API reads from the primary for
+    REPLICA_PIN_SECONDS, so they see their own changes.
+    """
+    replica_actions = ("list", "retrieve")
+
+    def _pin_key(self):
+        return f"flash_promo:primary_pin:{self.request.user.pk}"
+
+    def read_from_replica(self, queryset):
+        if replica_configured() and not cache.get(self._pin_key()):
+            queryset = queryset.using(replica_alias())
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.replica_actions:
+            queryset = self.read_from_replica(queryset)
+        return queryset
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            cache.set(self._pin_key(), 1, settings.REPLICA_PIN_SECONDS)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CatalogImportMixin:
+    """
+    POST {prefix}/import: streaming bulk upsert from a CSV/NDJSON file.
+    """
+    catalog_importer = None
+
+    @extend_schema(
+        request={"multipart/form-data": CatalogImportSerializer},
+        responses={
+            status.HTTP_200_OK: CatalogImportReportSerializer,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: OpenApiTypes.OBJECT,
+        },
+        summary="Bulk import (CSV / NDJSON)",
+    )
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        ser = CatalogImportSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        upload = ser.validated_data["file"]
+        fmt = ser.validated_data.get("format") or guess_format(upload.name)
+
+        # Se importa dentro del request: un archivo grande terminaria en el timeout del worker
+        if upload.size > settings.CATALOG_IMPORT_MAX_BYTES:
+            return Response(
+                {
+                    "detail": (
+                        f"File larger than {settings.CATALOG_IMPORT_MAX_BYTES} bytes, "
+                        "use the import_catalog management command."
+                    )
+                },
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        # El archivo se lee por lineas: memoria acotada aunque tenga cientos de miles de filas
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        report = type(self).catalog_importer(stream, fmt)
+
+        return Response(CatalogImportReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
 # ---- Products ----
 @extend_schema(tags=["Products"])
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, CatalogImportMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by("id")
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = IdCursorPagination
     search_fields = ("name", "sku", "brand", "category")
     filterset_fields = ("brand", "category")
+    catalog_importer = import_products
 
 
 # ---- Stores ----
 @extend_schema(tags=["Stores"])
-class StoreViewSet(viewsets.ModelViewSet):
+class StoreViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Store.objects.all().order_by("id")
     serializer_class = StoreSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = IdCursorPagination
     search_fields = ("name",)
 
+    def _paginated_stores(self, stores):
+        page = self.paginate_queryset(self.read_from_replica(stores))
+        return self.get_paginated_response(NearbyStoreSerializer(page, many=True).data)
+
+    @extend_schema(
+        parameters=[NearbyStoresQuerySerializer],
+        responses={status.HTTP_200_OK: NearbyStoreSerializer(many=True)},
+        summary="Nearest stores (KNN), scrolling outward with the cursor",
+    )
+    @action(detail=False, methods=["get"], pagination_class=DistanceCursorPagination)
+    def nearby(self, request):
+        params = NearbyStoresQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        point = Point(params.validated_data["lon"], params.validated_data["lat"], srid=4326)
+
+        return self._paginated_stores(nearest_stores(
+            point,
+            product_id=params.validated_data.get("product_id"),
+            in_stock=params.validated_data["in_stock"],
+        ))
+
+    @extend_schema(
+        parameters=[NearbyStoresQuerySerializer],
+        responses={status.HTTP_200_OK: NearbyStoreSerializer(many=True)},
+        summary="Stores whose promo radius (2 km) covers the point",
+    )
+    @action(detail=False, methods=["get"], pagination_class=DistanceCursorPagination)
+    def covering(self, request):
+        params = NearbyStoresQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        point = Point(params.validated_data["lon"], params.validated_data["lat"], srid=4326)
+
+        return self._paginated_stores(stores_covering_point(
+            point,
+            product_id=params.validated_data.get("product_id"),
+            in_stock=params.validated_data["in_stock"],
+        ))
+
 
 # ---- StoreProducts ----
 @extend_schema(tags=["StoreProducts"])
-class StoreProductViewSet(viewsets.ModelViewSet):
+class StoreProductViewSet(ReplicaReadMixin, CatalogImportMixin, viewsets.ModelViewSet):
     queryset = (
         StoreProduct.objects
         .select_related("store", "product")
@@ -197,5 +446,7 @@ class StoreProductViewSet(viewsets.ModelViewSet):
     )
     serializer_class = StoreProductSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = IdCursorPagination
     search_fields = ("store__name", "product__name", "product__sku")
     filterset_fields = ("store", "product")
+    catalog_importer = import_store_products
@@ -0,0 +1,42 @@
+# Configuracion de gunicorn para produccion (docker-compose.prod.yml)
+# Uso: gunicorn app.wsgi:application -c gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# gthread: cada worker atiende GUNICORN_THREADS requests a la vez; el pool de DB
+# de cada worker (DB_POOL_MAX_SIZE) debe ser >= threads para no esperar conexion
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recicla los workers de a poco para acotar fugas de memoria
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+# Sin preload: cada worker abre su propio pool despues del fork
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    # Carga el schema OpenAPI antes de la primera request
+    from flash_promo.schema import load_schema
+
+    load_schema()
+
+
+def child_exit(server, worker):
+    # Metricas multiproceso de Prometheus: descarta los archivos del worker muerto
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)